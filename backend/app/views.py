@@ -4,10 +4,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
-from django.conf import settings
-import os
+from mybookconnect.storage import get_image_storage
 
 from .serializers import UserSerializer, UserUpdateSerializer
 from .models import User
@@ -36,23 +33,9 @@ def update_profile(request):
     data = request.data.dict() if hasattr(request.data, 'dict') else request.data.copy()
     
     if avatar_file:
-        # Generar un nombre único para el archivo
-        filename = f"avatars/user_{request.user.id}_{avatar_file.name}"
-        
-        # Guardar el archivo usando el sistema de almacenamiento por defecto
-        file_path = default_storage.save(filename, ContentFile(avatar_file.read()))
-        
-        # Actualizar la ruta del avatar en los datos
-        data['avatar'] = file_path
-        
-        # Si el usuario ya tenía un avatar, eliminar el anterior
-        if request.user.avatar:
-            try:
-                old_avatar_path = os.path.join(settings.MEDIA_ROOT, request.user.avatar.name)
-                if os.path.isfile(old_avatar_path):
-                    os.remove(old_avatar_path)
-            except Exception as e:
-                print(f"Error eliminando avatar anterior: {e}")
+        # Almacenamiento por contenido: el mismo fichero siempre tiene el mismo nombre y no se duplica.
+        # El avatar anterior no se borra aquí (puede estar compartido); lo elimina `manage.py gc_images`.
+        data['avatar'] = get_image_storage().save(avatar_file.name, avatar_file)
 
     serializer = UserUpdateSerializer(request.user, data=data, partial=True)
     if serializer.is_valid():
@@ -0,0 +1,139 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from users.models import PrivacyChoices
+
+from .models import Activity, ActivityVerb, TimelineEntry
+from .queue import enqueue
+
+# cronologías escritas por INSERT al repartir una actividad
+FANOUT_BATCH_SIZE = 1000
+# actividades recientes que se copian a la cronología de quien empieza a seguir a alguien
+BACKFILL_SIZE = 50
+
+
+def audience(actor):
+    """Seguidores que pueden ver la actividad de `actor` según su `privacy_level` (él siempre ve la suya).
+
+    Público: todos sus seguidores. Solo amigos: los seguidores a los que también sigue. Privado: nadie.
+    """
+    User = get_user_model()
+    if actor.privacy_level == PrivacyChoices.PRIVATE:
+        return User.objects.none()
+    followers = User.objects.filter(following=actor)
+    if actor.privacy_level == PrivacyChoices.FRIENDS:
+        followers = followers.filter(followers=actor)
+    return followers
+
+
+def can_see(viewer, actor) -> bool:
+    return viewer.pk == actor.pk or audience(actor).filter(pk=viewer.pk).exists()
+
+
+def _entries(owner_ids, activities):
+    return [
+        TimelineEntry(owner_id=owner_id, activity=activity, created_at=activity.created_at)
+        for owner_id in owner_ids for activity in activities
+    ]
+
+
+def record(actor_id, verb: str, book_id, review=None, rating=None) -> Activity:
+    """Crea la actividad, la añade a la cronología del propio actor y encola el reparto a sus seguidores."""
+    with transaction.atomic():
+        activity = Activity.objects.create(actor_id=actor_id, verb=verb, book_id=book_id, review=review, rating=rating)
+        TimelineEntry.objects.create(owner_id=actor_id, activity=activity, created_at=activity.created_at)
+    enqueue('fan_out_activity', activity_id=activity.pk)
+    return activity
+
+
+def record_many(actor_id, items) -> list[Activity]:
+    """Como `record` para varias actividades [(verbo, libro, nota), ...] con un solo reparto (importación masiva)."""
+    if not items:
+        return []
+    with transaction.atomic():
+        activities = Activity.objects.bulk_create([
+            Activity(actor_id=actor_id, verb=verb, book_id=book_id, rating=rating) for verb, book_id, rating in items
+        ])
+        TimelineEntry.objects.bulk_create(_entries([actor_id], activities))
+    enqueue('fan_out_activities', actor_id=actor_id, activity_ids=[activity.pk for activity in activities])
+    return activities
+
+
+def fan_out(activity: Activity):
+    """Copia la actividad a la cronología de cada usuario que puede verla, por lotes de ids."""
+    fan_out_many(activity.actor, [activity])
+
+
+def fan_out_many(actor, activities):
+    owner_ids = audience(actor).order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        batch = list(owner_ids.filter(pk__gt=last)[:FANOUT_BATCH_SIZE])
+        if not batch:
+            break
+        # unas FANOUT_BATCH_SIZE filas por INSERT, también con muchas actividades
+        step = max(1, FANOUT_BATCH_SIZE // len(batch))
+        for start in range(0, len(activities), step):
+            TimelineEntry.objects.bulk_create(_entries(batch, activities[start:start + step]), ignore_conflicts=True)
+        last = batch[-1]
+
+
+def backfill(owner, actor, limit: int = BACKFILL_SIZE):
+    """Trae a la cronología de `owner` las últimas actividades de `actor`, si puede verlas."""
+    if not can_see(owner, actor):
+        return
+    recent = list(Activity.objects.filter(actor=actor).order_by('-created_at', '-id')[:limit])
+    TimelineEntry.objects.bulk_create(_entries([owner.pk], recent), ignore_conflicts=True)
+
+
+def hide(owner_ids, actor_id):
+    """Quita de esas cronologías la actividad de `actor_id` (deja de seguirlo o ya no puede verla)."""
+    TimelineEntry.objects.filter(owner_id__in=owner_ids, activity__actor_id=actor_id).exclude(owner_id=actor_id).delete()
+
+
+def follow_changed(follower, followed_ids, added: bool):
+    """`follower` empieza o deja de seguir a `followed_ids`: ajusta las cronologías de ambos lados.
+
+    Con privacidad "solo amigos" la visibilidad depende del seguimiento mutuo, así que también cambia
+    lo que los seguidos ven de `follower`.
+    """
+    User = get_user_model()
+    friends_only = follower.privacy_level == PrivacyChoices.FRIENDS
+    for followed in User.objects.filter(pk__in=followed_ids):
+        if added:
+            backfill(follower, followed)
+            if friends_only:
+                backfill(followed, follower)
+        else:
+            hide([follower.pk], followed.pk)
+            if friends_only:
+                hide([followed.pk], follower.pk)
+
+
+def privacy_changed(actor):
+    """Rehace el reparto de la actividad reciente de `actor` con su nueva privacidad."""
+    allowed = set(audience(actor).values_list('pk', flat=True))
+    owners = (
+        TimelineEntry.objects.filter(activity__actor=actor).exclude(owner=actor)
+        .values_list('owner_id', flat=True).distinct()
+    )
+    hide([pk for pk in owners if pk not in allowed], actor.pk)
+    recent = list(Activity.objects.filter(actor=actor).order_by('-created_at', '-id')[:BACKFILL_SIZE])
+    TimelineEntry.objects.bulk_create(
+        _entries(sorted(allowed), recent), ignore_conflicts=True, batch_size=FANOUT_BATCH_SIZE,
+    )
+
+
+def library_entry_verb(previous: dict | None, current: dict) -> str | None:
+    """Actividad que genera un cambio en la biblioteca (estados de books/reading_stats.py), o None."""
+    if previous is None:
+        if current['read']:
+            return ActivityVerb.READ
+        return ActivityVerb.WISHLISTED if current['wishlist'] else ActivityVerb.ADDED
+    if current['read'] and not previous['read']:
+        return ActivityVerb.READ
+    if current['rating'] is not None and current['rating'] != previous['rating']:
+        return ActivityVerb.RATED
+    if current['wishlist'] and not previous['wishlist']:
+        return ActivityVerb.WISHLISTED
+    return None
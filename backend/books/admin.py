@@ -1,16 +1,29 @@
 from django.contrib import admin
-from .models import Author, Book, Review, UserBook
+from .models import Activity, Author, Book, BookIdentifier, BookSimilarity, ImportJob, Review, UserBook, UserReadingStats
 
 
 @admin.register(Author)
 class AuthorAdmin(admin.ModelAdmin):
-    list_display = ('name',)
+    list_display = ('name', 'openlibrary_status', 'wikipedia_status', 'enrichment_next_retry_at')
+    list_filter = ('openlibrary_status', 'wikipedia_status')
+
+
+class BookIdentifierInline(admin.TabularInline):
+    model = BookIdentifier
+    extra = 0
 
 
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'isbn', 'average_rating')
-    search_fields = ('title', 'isbn')
+    search_fields = ('title', 'isbn', 'identifiers__value')
+    inlines = (BookIdentifierInline,)
+
+
+@admin.register(BookSimilarity)
+class BookSimilarityAdmin(admin.ModelAdmin):
+    list_display = ('book', 'rank', 'similar', 'score', 'computed_at')
+    raw_id_fields = ('book', 'similar')
 
 
 @admin.register(UserBook)
@@ -18,6 +31,23 @@ class UserBookAdmin(admin.ModelAdmin):
     list_display = ('user', 'book', 'is_read', 'rating', 'owned', 'wishlist')
 
 
+@admin.register(UserReadingStats)
+class UserReadingStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'total', 'read', 'owned', 'wishlist', 'updated_at')
+
+
+@admin.register(Activity)
+class ActivityAdmin(admin.ModelAdmin):
+    list_display = ('actor', 'verb', 'book', 'created_at')
+    list_filter = ('verb',)
+
+
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('user', 'book', 'rating', 'created_at')
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('user', 'isbn', 'title', 'status', 'progress', 'created_at')
+    list_filter = ('status',)
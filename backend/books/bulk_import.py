@@ -0,0 +1,277 @@
+import csv
+import io
+import logging
+import re
+import time
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+
+from .models import (
+    Book, IdentifierKind, ImportItemStatus, ImportJob, ImportJobItem, ImportKind, ImportStatus, UserBook,
+)
+from .ratings import apply_rating_delta
+from . import activity, identifiers, images, reading_stats, services, upstream
+
+# Filas procesadas por transacción; si el proceso se corta se retoma desde el primer lote sin terminar
+CHUNK_SIZE = 50
+MAX_ITEMS = 10_000
+# Con el circuito de Google Books abierto se espera (sondeando) antes de cada lote en vez de
+# dar por no encontradas todas sus filas
+UPSTREAM_WAIT = 120
+UPSTREAM_POLL_INTERVAL = 5
+
+# Estanterías de Goodreads (columna "Exclusive Shelf")
+READ_SHELVES = {'read', 'leído', 'leido'}
+WISHLIST_SHELVES = {'to-read', 'pendiente', 'wishlist'}
+
+
+class BulkImportError(ValueError):
+    pass
+
+
+def clean_isbn(value) -> str:
+    # Goodreads exporta los ISBN como fórmulas: ="9780439023481"
+    return re.sub(r'[^0-9Xx]', '', str(value or '')).upper()
+
+
+def parse_isbn_list(values) -> list[dict]:
+    """Acepta una lista de ISBN o un texto con un ISBN por línea (o separados por comas/espacios)."""
+    if isinstance(values, str):
+        values = re.split(r'[\s,;]+', values)
+    rows = []
+    for value in values or []:
+        isbn = clean_isbn(value)
+        if isbn:
+            rows.append({'isbn': isbn})
+    return rows
+
+
+def _column(row: dict, *names):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ''):
+            return value.strip()
+    return ''
+
+
+def _truthy(value: str) -> bool:
+    return value.strip().lower() in ('1', 'true', 'yes', 'si', 'sí', 'x')
+
+
+def parse_library_csv(fileobj) -> list[dict]:
+    """Lee un CSV exportado de Goodreads o una hoja de cálculo con columnas isbn/title/author/rating/shelf."""
+    data = fileobj.read()
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig', errors='replace')
+    reader = csv.DictReader(io.StringIO(data))
+    if not reader.fieldnames:
+        raise BulkImportError('El CSV está vacío')
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+
+    rows = []
+    for row in reader:
+        isbn = clean_isbn(_column(row, 'isbn13', 'isbn'))
+        title = _column(row, 'title', 'título', 'titulo')[:300]
+        if not isbn and not title:
+            continue
+        shelf = _column(row, 'exclusive shelf', 'shelf', 'estantería').lower()
+        rating = None
+        if 'my rating' in row:
+            # Goodreads puntúa de 0 (sin nota) a 5 estrellas
+            stars = _column(row, 'my rating')
+            rating = int(stars) * 2 if stars.isdigit() and 0 < int(stars) <= 5 else None
+        else:
+            value = _column(row, 'rating', 'nota')
+            rating = int(value) if value.isdigit() and 1 <= int(value) <= 10 else None
+        owned = _column(row, 'owned copies', 'owned')
+        rows.append({
+            'isbn': isbn,
+            'title': title,
+            'author_name': _column(row, 'author', 'autor')[:200],
+            'is_read': shelf in READ_SHELVES or _truthy(_column(row, 'is_read', 'leído', 'leido')),
+            'wishlist': shelf in WISHLIST_SHELVES or _truthy(_column(row, 'wishlist')),
+            'owned': (owned.isdigit() and int(owned) > 0) or _truthy(owned),
+            'rating': rating,
+        })
+    return rows
+
+
+def create_job(user, rows: list[dict], add_to_library: bool = True) -> ImportJob:
+    if not rows:
+        raise BulkImportError('No hay ningún ISBN o título que importar')
+    if len(rows) > MAX_ITEMS:
+        raise BulkImportError(f'Como máximo se pueden importar {MAX_ITEMS} libros a la vez')
+    with transaction.atomic():
+        job = ImportJob.objects.create(
+            user=user, kind=ImportKind.BULK, total=len(rows), add_to_library=add_to_library,
+        )
+        ImportJobItem.objects.bulk_create(
+            [ImportJobItem(job=job, position=position, **row) for position, row in enumerate(rows)],
+            batch_size=1000,
+        )
+    return job
+
+
+def _lookup(isbn: str, title: str, author_name: str):
+    if isbn:
+        params = services.isbn_search_params(isbn)
+    else:
+        query = f'intitle:{title}' + (f' inauthor:{author_name}' if author_name else '')
+        params = {'q': query, 'maxResults': 1, 'printType': 'books'}
+    items = services._google_books_search(params).get('items') or []
+    return items[0] if items else None
+
+
+def _lookup_key(item: ImportJobItem):
+    return item.isbn or (item.title.casefold(), item.author_name.casefold())
+
+
+def _wait_for_google_books(max_wait: float = UPSTREAM_WAIT):
+    deadline = time.monotonic() + max_wait
+    while not upstream.available(services.GOOGLE_BOOKS_API_URL) and time.monotonic() < deadline:
+        time.sleep(UPSTREAM_POLL_INTERVAL)
+
+
+def run_job(job: ImportJob, chunk_size: int = CHUNK_SIZE, progress=None):
+    """Procesa los elementos pendientes de una importación masiva por lotes.
+
+    Cada lote se confirma en su propia transacción junto con el estado de sus filas, así que
+    volver a ejecutarlo tras una interrupción continúa donde se quedó.
+    """
+    if job.status in (ImportStatus.DONE, ImportStatus.FAILED):
+        return job
+    job.status = ImportStatus.RUNNING
+    job.save(update_fields=['status', 'updated_at'])
+    while True:
+        items = list(job.items.filter(status=ImportItemStatus.PENDING).order_by('position')[:chunk_size])
+        if not items:
+            break
+        _wait_for_google_books()
+        _import_chunk(job, items)
+        if progress:
+            progress(job.processed, job.total)
+    job.status = ImportStatus.DONE
+    job.progress = 100
+    job.save(update_fields=['status', 'progress', 'updated_at'])
+    return job
+
+
+def _item_identifiers(item: ImportJobItem):
+    isbn = identifiers.normalize_isbn(item.isbn)
+    return [(IdentifierKind.ISBN13, isbn)] if isbn else []
+
+
+def _import_chunk(job: ImportJob, items: list[ImportJobItem]):
+    # 1. libros ya conocidos: una sola consulta por lote, antes de cualquier llamada externa
+    resolved = identifiers.resolve(i for item in items for i in _item_identifiers(item))
+    found = {item.pk: identifiers.first_match(_item_identifiers(item), resolved) for item in items}
+
+    # 2. consultas externas en paralelo (sin tocar la base de datos): los ISBN agrupados de varios en
+    # varios y lo que no se resuelva así, uno a uno
+    pending = {_lookup_key(item): item for item in items if found[item.pk] is None}
+    isbns = {key: identifiers.normalize_isbn(item.isbn) for key, item in pending.items()}
+    batched = services.lookup_isbns(isbn for isbn in isbns.values() if isbn)
+    volumes = {key: batched[isbn] for key, isbn in isbns.items() if isbn in batched}
+    volumes.update(services._run_concurrently({
+        key: (_lookup, (item.isbn, item.title, item.author_name))
+        for key, item in pending.items() if key not in volumes
+    }))
+    parsed = {key: services._parse_volume(volume) for key, volume in volumes.items() if volume}
+    # el volumen encontrado puede ser de un libro que ya está en el catálogo
+    resolved.update(identifiers.resolve(i for p in parsed.values() for i in p['identifiers']))
+    to_create = {
+        key: p for key, p in parsed.items() if identifiers.first_match(p['identifiers'], resolved) is None
+    }
+    covers = services._run_concurrently({
+        key: (services._fetch_best_cover, (p['info'], p['isbn'])) for key, p in to_create.items()
+    })
+
+    def build(key):
+        p = parsed[key]
+        book = Book(
+            title=p['title'], author=authors.get(p['author_name']), isbn=p['isbn'],
+            description=p['description'], published_date=p['published_date'],
+        )
+        if covers.get(key):
+            images.attach(book, 'cover', covers[key])
+        return book
+
+    with transaction.atomic():
+        # 3. autores y libros nuevos con INSERT ... ON CONFLICT (ver services.upsert_*)
+        authors = services.upsert_authors({p['author_name'] for p in to_create.values()} - {None})
+        keys = list(parsed)
+        books = services._resolve_or_create_books(
+            [(parsed[key]['identifiers'] + _item_identifiers(pending[key]), key) for key in keys], resolved, build,
+        )
+        created = dict(zip(keys, books))
+
+        # 4. estado de cada fila
+        for item in items:
+            key = _lookup_key(item)
+            if found[item.pk] is not None:
+                item.book, item.status = found[item.pk], ImportItemStatus.EXISTING
+            elif key in created:
+                item.book = created[key]
+                item.status = ImportItemStatus.IMPORTED if key in to_create else ImportItemStatus.EXISTING
+            else:
+                item.status = ImportItemStatus.NOT_FOUND
+        ImportJobItem.objects.bulk_update(items, ['book', 'status'])
+
+        if job.add_to_library:
+            _add_to_library(job.user, [item for item in items if item.book is not None])
+
+        job.processed += len(items)
+        job.progress = min(99, int(job.processed * 100 / max(job.total, 1)))
+        job.save(update_fields=['processed', 'progress', 'updated_at'])
+
+    for author in authors.values():
+        try:
+            services.schedule_author_enrichment(author)
+        except Exception as e:
+            logging.exception(e)
+
+
+def _add_to_library(user, items: list[ImportJobItem]):
+    existing = set(
+        UserBook.objects.filter(user=user, book__in=[item.book for item in items]).values_list('book_id', flat=True)
+    )
+    entries = {}
+    for item in items:
+        if item.book.pk in existing or item.book.pk in entries:
+            continue
+        entries[item.book.pk] = UserBook(
+            user=user, book=item.book, is_read=item.is_read, rating=item.rating,
+            owned=item.owned, wishlist=item.wishlist,
+        )
+    try:
+        with transaction.atomic():
+            UserBook.objects.bulk_create(entries.values())
+    except IntegrityError:
+        # el usuario ha añadido alguno a mano mientras tanto: se insertan de uno en uno saltando esos, y
+        # save() ya actualiza por señales el resumen, la actividad y la nota de cada libro añadido
+        for entry in entries.values():
+            try:
+                with transaction.atomic():
+                    UserBook.objects.create(
+                        user=user, book_id=entry.book_id, is_read=entry.is_read, rating=entry.rating,
+                        owned=entry.owned, wishlist=entry.wishlist,
+                    )
+            except IntegrityError:
+                pass
+        return
+
+    # bulk_create no lanza señales: el resumen de la biblioteca, la actividad y las notas de cada libro
+    # se actualizan aquí
+    states = {book_id: reading_stats.entry_state(entry) for book_id, entry in entries.items()}
+    reading_stats.entries_changed(user.pk, added=list(states.values()))
+    activity.record_many(user.pk, [
+        (activity.library_entry_verb(None, states[book_id]), book_id, entry.rating) for book_id, entry in entries.items()
+    ])
+    totals = defaultdict(lambda: [0, 0])
+    for entry in entries.values():
+        if entry.rating is not None:
+            totals[entry.book_id][0] += entry.rating
+            totals[entry.book_id][1] += 1
+    for book_id, (rating_sum, rating_count) in totals.items():
+        apply_rating_delta(book_id, rating_sum, rating_count)
@@ -0,0 +1,165 @@
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from rest_framework import serializers
+
+from . import sparse
+from .models import Author, Book
+
+# mismos formatos que los campos de DRF, para que la respuesta sea idéntica a la de los ModelSerializer
+_datetime = serializers.DateTimeField()
+_date = serializers.DateField()
+
+
+def enabled() -> bool:
+    return getattr(settings, 'BOOKS_FAST_RENDERING', {}).get('ENABLED', False)
+
+
+def _author_columns(prefix):
+    return [f'{prefix}author_id'] + [
+        f'{prefix}author__{name}' for name in ('name', 'biography', 'photo', 'photo_variants', 'updated_at')
+    ]
+
+
+def _book_columns(prefix=''):
+    return [
+        f'{prefix}{name}' for name in (
+            'id', 'title', 'isbn', 'cover', 'cover_variants', 'description', 'published_date',
+            'average_rating', 'rating_count', 'created_at', 'updated_at',
+        )
+    ] + _author_columns(prefix)
+
+
+class FlatSerializer(ABC):
+    """Serializador de solo lectura para listados: construye cada dict a partir de una fila de `.values()`.
+
+    Produce lo mismo que el ModelSerializer equivalente sin pasar por sus campos; lo usan las vistas con
+    FlatListMixin cuando BOOKS_FAST_RENDERING está activo.
+    """
+    columns = ()
+
+    def __init__(self, rows, context=None):
+        self.rows = rows
+        self.context = context or {}
+        request = self.context.get('request')
+        self._absolute = request.build_absolute_uri if request else (lambda url: url)
+        self._storages = {}
+
+    @classmethod
+    def values(cls, queryset, extra=()):
+        return queryset.values(*cls.columns, *[name for name in extra if name not in cls.columns])
+
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.rows]
+
+    def _url(self, model, field, name):
+        if not name:
+            return None
+        storage = self._storages.get((model, field))
+        if storage is None:
+            storage = self._storages[(model, field)] = model._meta.get_field(field).storage
+        return self._absolute(storage.url(name))
+
+    def _variants(self, model, field, variants):
+        return {key: self._url(model, field, name) for key, name in (variants or {}).items()}
+
+    def _author(self, row, prefix):
+        if row[f'{prefix}author_id'] is None:
+            return None
+        p = f'{prefix}author__'
+        return {
+            'id': row[f'{prefix}author_id'],
+            'name': row[f'{p}name'],
+            'biography': row[f'{p}biography'],
+            'photo': self._url(Author, 'photo', row[f'{p}photo']),
+            'photo_sizes': self._variants(Author, 'photo', row[f'{p}photo_variants']),
+        }
+
+    def _book(self, row, prefix=''):
+        published = row[f'{prefix}published_date']
+        average = row[f'{prefix}average_rating']
+        return {
+            'id': row[f'{prefix}id'],
+            'title': row[f'{prefix}title'],
+            'author': self._author(row, prefix),
+            'isbn': row[f'{prefix}isbn'],
+            'cover': self._url(Book, 'cover', row[f'{prefix}cover']),
+            'cover_sizes': self._variants(Book, 'cover', row[f'{prefix}cover_variants']),
+            'description': row[f'{prefix}description'],
+            'published_date': _date.to_representation(published) if published else None,
+            'average_rating': float(average) if average is not None else None,
+            'rating_count': row[f'{prefix}rating_count'],
+            'created_at': _datetime.to_representation(row[f'{prefix}created_at']),
+        }
+
+    @abstractmethod
+    def to_representation(self, row) -> dict:
+        """Representación de una fila de `values()`."""
+
+
+class FlatBookSerializer(FlatSerializer):
+    columns = _book_columns()
+
+    def to_representation(self, row):
+        return self._book(row)
+
+
+class FlatUserBookSerializer(FlatSerializer):
+    columns = [
+        'id', 'is_read', 'rating', 'is_digital', 'owned', 'wishlist', 'notes', 'updated_at',
+    ] + _book_columns('book__')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'book': self._book(row, 'book__'),
+            'is_read': row['is_read'],
+            'rating': row['rating'],
+            'is_digital': row['is_digital'],
+            'owned': row['owned'],
+            'wishlist': row['wishlist'],
+            'notes': row['notes'],
+            'updated_at': _datetime.to_representation(row['updated_at']),
+        }
+
+
+class FlatReviewSerializer(FlatSerializer):
+    columns = ['id', 'user__username', 'rating', 'text', 'created_at'] + _book_columns('book__')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'user': row['user__username'],
+            'book': self._book(row, 'book__'),
+            'rating': row['rating'],
+            'text': row['text'],
+            'created_at': _datetime.to_representation(row['created_at']),
+        }
+
+
+class FlatListMixin:
+    """Con BOOKS_FAST_RENDERING, los GET de listado leen filas con `.values()` y las serializa `flat_serializer_class`.
+
+    Las peticiones con fields=/expand= (books/sparse.py) siguen por los serializadores normales.
+    """
+    flat_serializer_class = None
+
+    def use_flat_serializer(self):
+        return (
+            self.flat_serializer_class is not None and self.request.method == 'GET' and enabled()
+            and sparse.requested(self.get_serializer_context()) is None
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not self.use_flat_serializer():
+            return queryset
+        # la paginación por cursor necesita en cada fila los campos de su clave (p. ej. `rank`)
+        keyset = [field.lstrip('-') for field in getattr(self, 'keyset_ordering', ())]
+        return self.flat_serializer_class.values(queryset, extra=keyset)
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and self.use_flat_serializer():
+            return self.flat_serializer_class(args[0], context=self.get_serializer_context())
+        return super().get_serializer(*args, **kwargs)
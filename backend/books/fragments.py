@@ -0,0 +1,141 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Manager
+from rest_framework import serializers
+
+from . import sparse
+
+DEFAULT_ALIAS = 'default'
+DEFAULT_TTL = 60 * 60 * 24
+
+# modelo -> nombres de los serializadores cacheados, para invalidar todas sus versiones
+_registry = {}
+
+
+def _config() -> dict:
+    return getattr(settings, 'BOOKS_FRAGMENT_CACHE', {})
+
+
+def _cache():
+    return caches[_config().get('ALIAS', DEFAULT_ALIAS)]
+
+
+def _key(name: str, pk) -> str:
+    return f'fragment:{name}:{pk}'
+
+
+def _base(context) -> str:
+    # las URLs de imágenes son absolutas: un fragmento solo vale para el mismo esquema y host
+    request = context.get('request')
+    return request.build_absolute_uri('/') if request else ''
+
+
+def _state(context) -> dict:
+    # el contexto lo comparten todos los serializadores anidados de una misma respuesta
+    return context.setdefault('_fragments', {'checked': set(), 'found': {}, 'pending': {}, 'batches': 0})
+
+
+def invalidate(model, pks):
+    keys = [_key(name, pk) for name in _registry.get(model, ()) for pk in pks]
+    if keys:
+        _cache().delete_many(keys)
+
+
+def _cached_serializers(serializer):
+    """El propio serializador (si es cacheable) y sus campos anidados cacheables: [(atributos, serializador)]."""
+    if isinstance(serializer, FragmentCacheMixin):
+        return [((), serializer)]
+    fields = getattr(serializer, 'fields', {})
+    return [
+        (field.source_attrs, field) for field in fields.values()
+        if isinstance(field, FragmentCacheMixin) and not field.write_only and field.source != '*'
+    ]
+
+
+def _resolve(instance, attrs):
+    for attr in attrs:
+        if instance is None:
+            break
+        instance = getattr(instance, attr, None)
+    return instance
+
+
+def prefetch(serializer, instances):
+    """Trae con un único get_many los fragmentos de todos los objetos que se van a serializar."""
+    state = _state(serializer.context)
+    wanted = {}
+    for attrs, child in _cached_serializers(serializer):
+        for instance in instances:
+            obj = _resolve(instance, attrs)
+            if obj is not None and obj.pk is not None:
+                wanted[_key(child.fragment_name, obj.pk)] = child.fragment_version(obj)
+    missing = [key for key in wanted if key not in state['checked']]
+    if not missing:
+        return
+    state['checked'].update(missing)
+    base = _base(serializer.context)
+    for key, entry in _cache().get_many(missing).items():
+        if entry.get('version') == wanted[key] and entry.get('base') == base:
+            state['found'][key] = entry['data']
+
+
+def flush(context):
+    """Guarda en una sola escritura los fragmentos que se han tenido que construir."""
+    state = _state(context)
+    if state['pending']:
+        _cache().set_many(state['pending'], _config().get('TTL', DEFAULT_TTL))
+        state['pending'] = {}
+
+
+class FragmentCacheMixin:
+    """Cachea la representación de cada objeto, con su versión (`updated_at`) y el host de la petición.
+
+    Los listados traen todos los fragmentos con un único get_many (ver FragmentListSerializer);
+    las señales de Book y Author borran los de los objetos guardados.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.fragment_name = cls.__name__
+        _registry.setdefault(cls.Meta.model, []).append(cls.fragment_name)
+
+    def fragment_version(self, instance):
+        return instance.updated_at.isoformat() if instance.updated_at else None
+
+    def to_representation(self, instance):
+        # anidado en otro fragmento (el autor dentro del libro) ya va incluido en el del padre;
+        # las respuestas recortadas con fields=/expand= no se cachean
+        if instance.pk is None or isinstance(self.parent, FragmentCacheMixin) or sparse.requested(self.context):
+            return super().to_representation(instance)
+        state = _state(self.context)
+        key = _key(self.fragment_name, instance.pk)
+        prefetch(self, [instance])
+        if key in state['found']:
+            return state['found'][key]
+        data = super().to_representation(instance)
+        state['found'][key] = data
+        state['pending'][key] = {
+            'version': self.fragment_version(instance), 'base': _base(self.context), 'data': data,
+        }
+        if not state['batches']:
+            flush(self.context)
+        return data
+
+
+class FragmentListSerializer(serializers.ListSerializer):
+    """Listado que precarga de golpe los fragmentos de sus elementos (o de sus objetos anidados)."""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, Manager) else data)
+        if sparse.requested(self.context):
+            return super().to_representation(items)
+        state = _state(self.context)
+        state['batches'] += 1
+        try:
+            prefetch(self.child, items)
+            result = super().to_representation(items)
+        finally:
+            state['batches'] -= 1
+        if not state['batches']:
+            flush(self.context)
+        return result
@@ -0,0 +1,75 @@
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+# Por defecto solo el navegador guarda las respuestas (van con el token del usuario) y las revalida
+# pasado un minuto con If-None-Match / If-Modified-Since
+DEFAULT_CACHE_CONTROL = {'private': True, 'max_age': 60}
+
+
+def _cache_control() -> dict:
+    return getattr(settings, 'BOOKS_HTTP_CACHE', {}).get('CACHE_CONTROL', DEFAULT_CACHE_CONTROL)
+
+
+class ConditionalGetMixin:
+    """GET condicional para vistas del catálogo.
+
+    El ETag y Last-Modified salen de `updated_at` de los objetos servidos (y de su autor, que va
+    anidado en la respuesta), así que un 304 se resuelve con la consulta de los objetos, sin serializar.
+    """
+
+    def object_versions(self, obj):
+        if isinstance(obj, dict):
+            # filas de .values() de los listados rápidos (books/flat.py)
+            yield obj['id'], obj['updated_at']
+            if obj.get('author_id') is not None:
+                yield obj['author_id'], obj['author__updated_at']
+            return
+        yield obj.pk, obj.updated_at
+        # solo si se ha cargado con la consulta (con expand= el autor puede ir solo como id)
+        descriptor = getattr(type(obj), 'author', None)
+        author = obj.author if descriptor is not None and descriptor.is_cached(obj) else None
+        if author is not None:
+            yield author.pk, author.updated_at
+
+    def conditional_response(self, request, objects, build, with_last_modified=True):
+        stamps = [version for obj in objects for version in self.object_versions(obj)]
+        digest = hashlib.sha1(repr((request.get_full_path(), stamps)).encode()).hexdigest()
+        etag = f'W/"{digest}"'
+        # en listados no: quitar un elemento no adelanta la fecha más reciente, solo cambia el ETag
+        last_modified = None
+        if with_last_modified and stamps:
+            last_modified = int(max(updated for _, updated in stamps).timestamp())
+
+        response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = build()
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, **_cache_control())
+        patch_vary_headers(response, ('Authorization', 'Accept'))
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.conditional_response(
+            request, [instance], lambda: Response(self.get_serializer(instance).data),
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            page = list(queryset)
+            return self.conditional_response(
+                request, page, lambda: Response(self.get_serializer(page, many=True).data),
+                with_last_modified=False,
+            )
+        return self.conditional_response(
+            request, page, lambda: self.get_paginated_response(self.get_serializer(page, many=True).data),
+            with_last_modified=False,
+        )
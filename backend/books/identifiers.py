@@ -0,0 +1,97 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from .models import BookIdentifier, IdentifierKind
+
+# Un mismo libro de Open Library puede listar cientos de ISBN (todas sus ediciones)
+MAX_OPENLIBRARY_ISBNS = 50
+
+
+def _isbn10_valid(digits: str) -> bool:
+    total = sum((10 - i) * (10 if c == 'X' else int(c)) for i, c in enumerate(digits))
+    return total % 11 == 0
+
+
+def _isbn13_check_digit(first12: str) -> str:
+    total = sum(int(c) * (1 if i % 2 == 0 else 3) for i, c in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def normalize_isbn(value) -> str | None:
+    """Devuelve el ISBN-13 canónico (sin guiones, convirtiendo los ISBN-10) o None si no es válido."""
+    digits = re.sub(r'[^0-9Xx]', '', str(value or '')).upper()
+    if len(digits) == 10 and re.fullmatch(r'\d{9}[\dX]', digits) and _isbn10_valid(digits):
+        first12 = '978' + digits[:9]
+        return first12 + _isbn13_check_digit(first12)
+    if len(digits) == 13 and digits.isdigit() and digits[:3] in ('978', '979') \
+            and _isbn13_check_digit(digits[:12]) == digits[12]:
+        return digits
+    return None
+
+
+def _olid(key) -> str | None:
+    # '/works/OL45883W' -> 'OL45883W'
+    return key.rstrip('/').rsplit('/', 1)[-1] if key else None
+
+
+def volume_identifiers(volume: dict) -> list[tuple[str, str]]:
+    """Identificadores de un volumen de Google Books."""
+    info = volume.get('volumeInfo', {})
+    found = []
+    if volume.get('id'):
+        found.append((IdentifierKind.GOOGLE_VOLUME, volume['id']))
+    for ident in info.get('industryIdentifiers', []) or []:
+        if ident.get('type') in ('ISBN_13', 'ISBN_10'):
+            isbn = normalize_isbn(ident.get('identifier'))
+            if isbn:
+                found.append((IdentifierKind.ISBN13, isbn))
+    return list(dict.fromkeys(found))
+
+
+def openlibrary_identifiers(doc: dict) -> list[tuple[str, str]]:
+    """Identificadores de un resultado de la búsqueda de Open Library (search.json)."""
+    found = []
+    work = _olid(doc.get('key'))
+    if work:
+        found.append((IdentifierKind.OL_WORK, work))
+    edition = doc.get('cover_edition_key') or (doc.get('edition_key') or [None])[0]
+    if edition:
+        found.append((IdentifierKind.OL_EDITION, edition))
+    for value in (doc.get('isbn') or [])[:MAX_OPENLIBRARY_ISBNS]:
+        isbn = normalize_isbn(value)
+        if isbn:
+            found.append((IdentifierKind.ISBN13, isbn))
+    return list(dict.fromkeys(found))
+
+
+def resolve(identifiers) -> dict:
+    """Busca en una sola consulta los libros ya registrados: {(tipo, valor): Book}."""
+    by_kind = {}
+    for kind, value in identifiers:
+        by_kind.setdefault(kind, set()).add(value)
+    if not by_kind:
+        return {}
+    condition = reduce(or_, (Q(kind=kind, value__in=values) for kind, values in by_kind.items()))
+    rows = BookIdentifier.objects.filter(condition).select_related('book__author')
+    return {(row.kind, row.value): row.book for row in rows}
+
+
+def first_match(identifiers, resolved: dict):
+    for identifier in identifiers:
+        if identifier in resolved:
+            return resolved[identifier]
+    return None
+
+
+def attach(pairs):
+    """Registra identificadores [(book, [(tipo, valor), ...]), ...]; los que ya tienen dueño se ignoran."""
+    rows = [
+        BookIdentifier(book=book, kind=kind, value=value)
+        for book, identifiers in pairs
+        for kind, value in identifiers
+    ]
+    if rows:
+        BookIdentifier.objects.bulk_create(rows, ignore_conflicts=True)
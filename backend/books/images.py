@@ -0,0 +1,137 @@
+import hashlib
+import io
+import logging
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from mybookconnect.storage import get_image_storage
+
+from . import upstream
+
+# Tamaños por defecto (caja máxima ancho x alto) de las versiones que se generan de cada imagen
+DEFAULT_SIZES = {'S': (80, 120), 'M': (200, 300), 'L': (400, 600)}
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_MAX_PIXELS = 40_000_000
+CHUNK_SIZE = 64 * 1024
+# a partir de este tamaño la descarga se vuelca a disco en lugar de quedarse en memoria
+SPOOL_SIZE = 512 * 1024
+# URL de origen -> versiones ya almacenadas, para no volver a descargar la misma imagen
+SOURCE_CACHE_TTL = 60 * 60 * 24 * 30
+
+
+class ImageRejected(Exception):
+    pass
+
+
+def _config() -> dict:
+    return getattr(settings, 'BOOKS_IMAGES', {})
+
+
+def sizes() -> dict:
+    return _config().get('SIZES', DEFAULT_SIZES)
+
+
+def download(url: str, max_bytes: int | None = None):
+    """Descarga la imagen por bloques a un fichero temporal, cortando si supera `max_bytes`."""
+    max_bytes = max_bytes or _config().get('MAX_BYTES', DEFAULT_MAX_BYTES)
+    with upstream.get(url, stream=True) as r:
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        content_type = r.headers.get('Content-Type', '')
+        if content_type and not content_type.startswith('image/'):
+            raise ImageRejected(f'Tipo de contenido no válido: {content_type}')
+        declared = r.headers.get('Content-Length')
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise ImageRejected(f'Imagen demasiado grande: {declared} bytes')
+
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        total = 0
+        try:
+            for chunk in r.iter_content(CHUNK_SIZE):
+                total += len(chunk)
+                if total > max_bytes:
+                    raise ImageRejected(f'Imagen demasiado grande: más de {max_bytes} bytes')
+                spool.write(chunk)
+        except BaseException:
+            # también si la conexión se corta a mitad de descarga
+            spool.close()
+            raise
+    if not total:
+        spool.close()
+        return None
+    spool.seek(0)
+    return spool
+
+
+def build_renditions(fileobj) -> dict:
+    """Decodifica y valida la imagen con Pillow y genera las versiones WebP {tamaño: bytes}."""
+    conf = _config()
+    quality = conf.get('QUALITY', 80)
+    max_pixels = conf.get('MAX_PIXELS', DEFAULT_MAX_PIXELS)
+    try:
+        with Image.open(fileobj) as img:
+            if img.width * img.height > max_pixels:
+                raise ImageRejected(f'Imagen con demasiados píxeles: {img.width}x{img.height}')
+            largest = max(sizes().values())
+            # en JPEG decodifica directamente a escala reducida, sin cargar el bitmap completo
+            img.draft('RGB', largest)
+            img = ImageOps.exif_transpose(img)
+            img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            renditions = {}
+            for key, box in sorted(sizes().items(), key=lambda item: item[1], reverse=True):
+                version = img.copy()
+                version.thumbnail(box, Image.LANCZOS)
+                out = io.BytesIO()
+                version.save(out, 'WEBP', quality=quality, method=4)
+                renditions[key] = out.getvalue()
+            return renditions
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ImageRejected(f'Imagen no válida: {e}') from e
+
+
+def _source_key(url: str) -> str:
+    return 'image-source:' + hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+def store_renditions(renditions: dict) -> dict:
+    """Guarda las versiones en el storage direccionado por contenido; devuelve {tamaño: nombre}."""
+    storage = get_image_storage()
+    return {key: storage.save(f'{key}.webp', ContentFile(data)) for key, data in renditions.items()}
+
+
+def fetch_renditions(url: str) -> dict | None:
+    """Descarga, procesa y almacena una imagen remota; devuelve {tamaño: nombre} o None.
+
+    No toca la base de datos, así que puede ejecutarse desde los hilos de importación.
+    """
+    storage = get_image_storage()
+    key = _source_key(url)
+    try:
+        known = cache.get(key)
+        if known and all(storage.exists(name) for name in known.values()):
+            return known
+        spool = download(url)
+        if spool is None:
+            return None
+        with spool:
+            stored = store_renditions(build_renditions(spool))
+        cache.set(key, stored, timeout=SOURCE_CACHE_TTL)
+        return stored
+    except ImageRejected as e:
+        logging.warning('Imagen descartada (%s): %s', url, e)
+    except Exception as e:
+        logging.exception(e)
+    return None
+
+
+def attach(instance, field_name: str, variants: dict):
+    """Asigna las versiones ya almacenadas: la mayor en el propio campo y todas en
+    `<campo>_variants`. No guarda la instancia."""
+    largest = max(sizes(), key=lambda key: sizes()[key])
+    setattr(instance, field_name, variants.get(largest) or next(iter(variants.values())))
+    setattr(instance, f'{field_name}_variants', variants)
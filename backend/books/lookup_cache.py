@@ -0,0 +1,187 @@
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+import uuid
+from concurrent.futures import Future
+
+import requests
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import upstream
+
+# TTL por fuente (segundos); se pueden sobrescribir en settings.BOOKS_LOOKUP_CACHE['TTLS']
+DEFAULT_TTLS = {
+    'google_books': 60 * 60 * 24 * 7,
+    'openlibrary_search': 60 * 60 * 24 * 7,
+    'openlibrary_authors': 60 * 60 * 24 * 30,
+    'wikipedia': 60 * 60 * 24 * 30,
+}
+DEFAULT_NEGATIVE_TTL = 60 * 60 * 24
+
+# Marca para los 404 cacheados (None no se puede distinguir de un fallo de caché)
+NOT_FOUND = '__not_found__'
+STATS_PREFIX = 'lookup:stats'
+
+# Consulta compartida entre procesos: el que obtiene el cerrojo llama a la API y el resto espera
+# a que aparezca la respuesta en la caché (segundos; se pueden sobrescribir en BOOKS_LOOKUP_CACHE)
+DEFAULT_LOCK_TIMEOUT = 30
+DEFAULT_LOCK_WAIT = 15
+LOCK_POLL_INTERVAL = 0.05
+LOCK_POLL_MAX_INTERVAL = 0.5
+
+# consultas en curso en este proceso: clave -> Future con la respuesta
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _config() -> dict:
+    return getattr(settings, 'BOOKS_LOOKUP_CACHE', {})
+
+
+def _cache():
+    return caches[_config().get('ALIAS', 'default')]
+
+
+def ttl_for(source: str, negative: bool = False) -> int:
+    conf = _config()
+    if negative:
+        return conf.get('NEGATIVE_TTL', DEFAULT_NEGATIVE_TTL)
+    return {**DEFAULT_TTLS, **conf.get('TTLS', {})}.get(source, DEFAULT_NEGATIVE_TTL)
+
+
+def normalize(value) -> str:
+    text = unicodedata.normalize('NFKC', str(value))
+    return ' '.join(text.casefold().split())
+
+
+def make_key(source: str, url: str, params: dict | None = None) -> str:
+    normalized = sorted((str(k), normalize(v)) for k, v in (params or {}).items())
+    digest = hashlib.sha1(json.dumps([url, normalized], ensure_ascii=False).encode('utf-8')).hexdigest()
+    return f'lookup:{source}:{digest}'
+
+
+def _count(source: str, outcome: str):
+    cache = _cache()
+    key = f'{STATS_PREFIX}:{source}:{outcome}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # la clave pudo ser expulsada entre add() e incr()
+        cache.set(key, 1, timeout=None)
+
+
+def get_json(source: str, url: str, params: dict | None = None, headers: dict | None = None,
+             is_negative=None, raise_errors: bool = False):
+    """GET de una API externa con caché persistente de la respuesta JSON.
+
+    Las respuestas vacías (según `is_negative`) y los 404 se cachean con el TTL negativo.
+    Otros errores (HTTP, de red o proveedor no disponible, ver books/upstream_limits.py) no se cachean:
+    se propagan si `raise_errors` o se devuelve None.
+    Las consultas idénticas simultáneas (hilos o procesos) comparten una sola petición, ver `_single_flight`.
+    """
+    cache = _cache()
+    key = make_key(source, url, params)
+    cached = cache.get(key)
+    if cached is not None:
+        _count(source, 'hits')
+        return None if cached == NOT_FOUND else cached
+    _count(source, 'misses')
+
+    def fetch():
+        resp = upstream.get(url, params=params, headers=headers)
+        if resp.status_code == 404:
+            cache.set(key, NOT_FOUND, timeout=ttl_for(source, negative=True))
+            return NOT_FOUND
+        resp.raise_for_status()
+        data = resp.json()
+        negative = bool(is_negative and is_negative(data))
+        cache.set(key, data, timeout=ttl_for(source, negative=negative))
+        return data
+
+    try:
+        data = _single_flight(cache, key, fetch)
+    except requests.RequestException:
+        if raise_errors:
+            raise
+        return None
+    return None if data == NOT_FOUND else data
+
+
+def store_json(source: str, url: str, data, params: dict | None = None, negative: bool = False):
+    """Guarda una respuesta obtenida por otra vía (p. ej. una consulta agrupada) como si fuera la de esta URL."""
+    _cache().set(make_key(source, url, params), data, timeout=ttl_for(source, negative=negative))
+
+
+def _single_flight(cache, key: str, fetch):
+    """Ejecuta `fetch` una sola vez por clave: los hilos de este proceso que piden lo mismo a la vez
+    esperan su resultado (o su excepción) en vez de repetir la petición."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        return future.result()
+    try:
+        result = _locked_fetch(cache, key, fetch)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _locked_fetch(cache, key: str, fetch):
+    """Entre procesos: `cache.add` (SET NX en Redis) elige a uno que hace la petición; los demás sondean
+    la caché hasta que aparece la respuesta. Si el que la hacía falla o tarda demasiado, la hacen ellos."""
+    conf = _config()
+    lock = f'{key}:lock'
+    token = uuid.uuid4().hex
+    if cache.add(lock, token, timeout=conf.get('LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT)):
+        try:
+            return fetch()
+        finally:
+            # solo si sigue siendo nuestro: pudo caducar y tomarlo otro proceso
+            if cache.get(lock) == token:
+                cache.delete(lock)
+
+    deadline = time.monotonic() + conf.get('LOCK_WAIT', DEFAULT_LOCK_WAIT)
+    interval = LOCK_POLL_INTERVAL
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        if cache.get(lock) is None:
+            # terminó sin dejar respuesta (error no cacheable)
+            break
+        interval = min(interval * 2, LOCK_POLL_MAX_INTERVAL)
+    return fetch()
+
+
+def stats() -> dict:
+    cache = _cache()
+    sources = {**DEFAULT_TTLS, **_config().get('TTLS', {})}
+    keys = [f'{STATS_PREFIX}:{source}:{outcome}' for source in sources for outcome in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    result = {}
+    for source in sources:
+        hits = values.get(f'{STATS_PREFIX}:{source}:hits', 0)
+        misses = values.get(f'{STATS_PREFIX}:{source}:misses', 0)
+        total = hits + misses
+        result[source] = {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 3) if total else None}
+    return result
+
+
+def reset_stats():
+    sources = {**DEFAULT_TTLS, **_config().get('TTLS', {})}
+    _cache().delete_many([f'{STATS_PREFIX}:{source}:{outcome}' for source in sources for outcome in ('hits', 'misses')])
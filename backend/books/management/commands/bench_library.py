@@ -0,0 +1,110 @@
+import itertools
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from books.models import Book, UserBook
+from books.views import UserBookListCreateView
+
+FILTERS = {
+    'sin filtro': {},
+    'is_read': {'is_read': 'true'},
+    'no leídos': {'is_read': 'false'},
+    'wishlist': {'wishlist': 'true'},
+    'owned': {'owned': 'true'},
+    'is_digital': {'is_digital': 'true'},
+    'min_rating': {'min_rating': '8'},
+}
+ORDERINGS = ('-updated_at', '-rating', 'rating', 'book__title')
+
+
+class Rollback(Exception):
+    pass
+
+
+def _request(user, query):
+    # host permitido para que la paginación pueda construir los enlaces absolutos
+    host = next((h for h in settings.ALLOWED_HOSTS if h and '*' not in h and not h.startswith('.')), 'localhost')
+    request = APIRequestFactory().get('/api/v1/books/user/books/', query, HTTP_HOST=host)
+    force_authenticate(request, user=user)
+    return request
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia (p50/p99) del listado de la biblioteca con una biblioteca grande de prueba'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=50_000, help='Libros en la biblioteca de prueba')
+        parser.add_argument('--repeat', type=int, default=30, help='Peticiones por combinación')
+        parser.add_argument('--explain', action='store_true', help='Muestra el plan de cada consulta')
+        parser.add_argument('--keep', action='store_true', help='Conserva los datos generados (por defecto se deshacen)')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = self.seed(options['entries'])
+                self.run(user, options['repeat'], options['explain'])
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write('Datos de prueba descartados')
+
+    def seed(self, entries):
+        User = get_user_model()
+        user = User.objects.create_user(f'bench-{random.getrandbits(32):x}', password=None)
+        rng = random.Random(42)
+        books = Book.objects.bulk_create(
+            [Book(title=f'Libro de prueba {i:06d}') for i in range(entries)], batch_size=2000,
+        )
+        UserBook.objects.bulk_create([
+            UserBook(
+                user=user,
+                book=book,
+                is_read=rng.random() < 0.6,
+                rating=rng.randint(1, 10) if rng.random() < 0.5 else None,
+                is_digital=rng.random() < 0.3,
+                owned=rng.random() < 0.4,
+                wishlist=rng.random() < 0.1,
+            )
+            for book in books
+        ], batch_size=2000)
+        if connection.vendor == 'postgresql':
+            # estadísticas al día para que el planificador vea la biblioteca recién creada
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE books_book, books_userbook')
+        self.stdout.write(f'Biblioteca de prueba con {entries} libros para {user.username}')
+        return user
+
+    def run(self, user, repeat, explain):
+        view = UserBookListCreateView.as_view()
+        self.stdout.write(f"{'filtro':<12} {'orden':<14} {'p50 ms':>8} {'p99 ms':>8}")
+        for (label, params), ordering in itertools.product(FILTERS.items(), ORDERINGS):
+            query = {**params, 'ordering': ordering}
+            view(_request(user, query)).render()  # calentamiento: cachés y planes fuera de la medida
+            timings = []
+            for _ in range(repeat):
+                request = _request(user, query)
+                start = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append((time.perf_counter() - start) * 1000)
+            p50 = statistics.median(timings)
+            p99 = statistics.quantiles(timings, n=100)[98] if len(timings) > 1 else timings[0]
+            self.stdout.write(f'{label:<12} {ordering:<14} {p50:>8.1f} {p99:>8.1f}')
+            if explain:
+                self.stdout.write(self.explain(user, query))
+
+    @staticmethod
+    def explain(user, query):
+        request = _request(user, query)
+        view = UserBookListCreateView()
+        view.setup(request)
+        view.request = view.initialize_request(request)
+        view.format_kwarg = None
+        return view.get_queryset()[:10].explain()
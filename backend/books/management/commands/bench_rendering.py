@@ -0,0 +1,100 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from books.models import Author, Book, Review, UserBook
+from books.renderers import ORJSONRenderer
+from books.views import BookListCreateView, ReviewListCreateView, UserBookListCreateView
+
+ENDPOINTS = {
+    'catálogo': (BookListCreateView, '/api/v1/books/books/'),
+    'biblioteca': (UserBookListCreateView, '/api/v1/books/user/books/'),
+    'reseñas': (ReviewListCreateView, '/api/v1/books/reviews/'),
+}
+# (serializadores planos, renderizador)
+MODES = {
+    'serializers': (False, JSONRenderer),
+    'serializers+orjson': (False, ORJSONRenderer),
+    'flat+orjson': (True, ORJSONRenderer),
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def _request(user, path, page_size):
+    host = next((h for h in settings.ALLOWED_HOSTS if h and '*' not in h and not h.startswith('.')), 'localhost')
+    request = APIRequestFactory().get(path, {'page_size': page_size}, HTTP_HOST=host)
+    force_authenticate(request, user=user)
+    return request
+
+
+class Command(BaseCommand):
+    help = 'Compara las peticiones por segundo de los listados con los serializadores de DRF y con el modo rápido'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=2000, help='Libros de prueba')
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=30, help='Peticiones por combinación')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = self.seed(options['books'])
+                self.run(user, options['page_size'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Datos de prueba descartados')
+
+    def seed(self, count):
+        User = get_user_model()
+        user = User.objects.create_user(f'bench-{random.getrandbits(32):x}', password=None)
+        rng = random.Random(42)
+        tag = f'{random.getrandbits(32):x}'
+        authors = Author.objects.bulk_create([
+            Author(name=f'Autor {tag} {i}', name_key=f'autor {tag} {i}', biography='Biografía de prueba ' * 20)
+            for i in range(max(count // 10, 1))
+        ])
+        books = Book.objects.bulk_create([
+            Book(
+                title=f'Libro de prueba {i:06d}', author=rng.choice(authors), isbn=f'{i:013d}',
+                description='Descripción de prueba ' * 30, rating_count=1, average_rating=rng.randint(1, 10),
+            )
+            for i in range(count)
+        ], batch_size=2000)
+        UserBook.objects.bulk_create(
+            [UserBook(user=user, book=book, rating=rng.randint(1, 10)) for book in books], batch_size=2000,
+        )
+        Review.objects.bulk_create(
+            [Review(user=user, book=book, rating=rng.randint(1, 10), text='Reseña de prueba') for book in books],
+            batch_size=2000,
+        )
+        self.stdout.write(f'{count} libros, entradas de biblioteca y reseñas de prueba')
+        return user
+
+    def run(self, user, page_size, repeat):
+        self.stdout.write(f"{'listado':<12} {'modo':<20} {'p50 ms':>8} {'pet/s':>8}")
+        for label, (view_class, path) in ENDPOINTS.items():
+            for mode, (flat, renderer) in MODES.items():
+                view = view_class.as_view(renderer_classes=[renderer])
+                with override_settings(BOOKS_FAST_RENDERING={'ENABLED': flat}):
+                    # calentamiento: cachés (incluidos los fragmentos serializados) y planes fuera de la medida
+                    view(_request(user, path, page_size)).render()
+                    timings = []
+                    for _ in range(repeat):
+                        request = _request(user, path, page_size)
+                        start = time.perf_counter()
+                        view(request).render()
+                        timings.append(time.perf_counter() - start)
+                p50 = statistics.median(timings) * 1000
+                throughput = len(timings) / sum(timings)
+                self.stdout.write(f'{label:<12} {mode:<20} {p50:>8.1f} {throughput:>8.0f}')
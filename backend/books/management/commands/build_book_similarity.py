@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from books import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Calcula los libros más parecidos de cada libro a partir de las bibliotecas y reseñas (necesita numpy y scipy)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=recommendations.TOP_K, help='Vecinos guardados por libro')
+        parser.add_argument(
+            '--min-co-readers', type=int, default=recommendations.MIN_CO_READERS,
+            help='Lectores en común mínimos entre dos libros',
+        )
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Solo los libros de los lectores con cambios desde el último cálculo (los borrados no se detectan)',
+        )
+
+    def handle(self, *args, **options):
+        book_ids = None
+        if options['incremental']:
+            since = recommendations.last_build()
+            if since is not None:
+                book_ids = recommendations.changed_books(since)
+                if not book_ids:
+                    self.stdout.write('Sin cambios desde el último cálculo')
+                    return
+        total = recommendations.build_similarities(
+            book_ids, top_k=options['top_k'], min_co_readers=options['min_co_readers'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Vecinos calculados para {total} libros'))
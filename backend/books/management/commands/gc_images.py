@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from books.models import Author, Book
+from mybookconnect.storage import CAS_PREFIX, get_image_storage
+
+# Directorios donde se guardaban las imágenes antes del almacenamiento por contenido
+LEGACY_DIRS = ('covers', 'author_photos', 'avatars')
+
+
+class Command(BaseCommand):
+    help = 'Elimina del storage las imágenes que ya no referencia ninguna portada, foto de autor o avatar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24,
+                            help='No borra ficheros más recientes (pueden estar en una importación en curso)')
+        parser.add_argument('--legacy', action='store_true',
+                            help=f'Incluye también los directorios antiguos: {", ".join(LEGACY_DIRS)}')
+        parser.add_argument('--dry-run', action='store_true', help='Solo muestra lo que se borraría')
+
+    def referenced_names(self):
+        names = set()
+        for model, field in ((Book, 'cover'), (Author, 'photo')):
+            for name, variants in model.objects.values_list(field, f'{field}_variants').iterator():
+                names.add(name)
+                names.update((variants or {}).values())
+        names.update(get_user_model().objects.values_list('avatar', flat=True).iterator())
+        names.discard(None)
+        names.discard('')
+        return names
+
+    def walk(self, storage, path):
+        if not storage.exists(path):
+            return
+        dirs, files = storage.listdir(path)
+        for name in files:
+            yield f'{path}/{name}'
+        for directory in dirs:
+            yield from self.walk(storage, f'{path}/{directory}')
+
+    def handle(self, *args, **options):
+        storage = get_image_storage()
+        referenced = self.referenced_names()
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        roots = [CAS_PREFIX] + (list(LEGACY_DIRS) if options['legacy'] else [])
+
+        removed = freed = 0
+        for root in roots:
+            for name in self.walk(storage, root):
+                if name in referenced or storage.get_modified_time(name) > cutoff:
+                    continue
+                size = storage.size(name)
+                if not options['dry_run']:
+                    storage.delete(name)
+                removed += 1
+                freed += size
+                self.stdout.write(f'{"[dry-run] " if options["dry_run"] else ""}{name}')
+
+        self.stdout.write(self.style.SUCCESS(f'{removed} ficheros huérfanos, {freed / 1024:.1f} KiB liberados'))
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from books import bulk_import
+from books.models import ImportJob, ImportKind
+
+
+class Command(BaseCommand):
+    help = 'Importa una lista de ISBN o un CSV de Goodreads a la biblioteca de un usuario, o retoma una importación'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='Fichero .csv o de texto con un ISBN por línea')
+        parser.add_argument('--user', help='Usuario al que pertenece la importación')
+        parser.add_argument('--catalog-only', action='store_true', help='Solo añade los libros al catálogo')
+        parser.add_argument('--resume', metavar='JOB_ID', help='Retoma una importación masiva interrumpida')
+        parser.add_argument('--chunk-size', type=int, default=bulk_import.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            job = ImportJob.objects.filter(pk=options['resume'], kind=ImportKind.BULK).first()
+            if job is None:
+                raise CommandError('No existe esa importación masiva')
+        else:
+            job = self.create_job(options)
+            self.stdout.write(f'Importación {job.id}: {job.total} filas')
+
+        def report(done, total):
+            self.stdout.write(f'{done}/{total}')
+
+        bulk_import.run_job(job, chunk_size=options['chunk_size'], progress=report)
+        job.refresh_from_db()
+        summary = ', '.join(f'{status}: {count}' for status, count in self.summary(job).items())
+        self.stdout.write(self.style.SUCCESS(f'Importación {job.status} ({summary})'))
+
+    def create_job(self, options):
+        if not options['path'] or not options['user']:
+            raise CommandError('Indique el fichero y --user, o --resume JOB_ID')
+        user = get_user_model().objects.filter(username=options['user']).first()
+        if user is None:
+            raise CommandError(f"No existe el usuario {options['user']}")
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                if options['path'].lower().endswith('.csv'):
+                    rows = bulk_import.parse_library_csv(fileobj)
+                else:
+                    rows = bulk_import.parse_isbn_list(fileobj.read().decode('utf-8'))
+            return bulk_import.create_job(user, rows, add_to_library=not options['catalog_only'])
+        except (OSError, bulk_import.BulkImportError) as e:
+            raise CommandError(str(e))
+
+    @staticmethod
+    def summary(job):
+        return dict(job.items.order_by().values_list('status').annotate(n=Count('id')))
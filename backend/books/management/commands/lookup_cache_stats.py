@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from books import lookup_cache
+
+
+class Command(BaseCommand):
+    help = 'Muestra los aciertos/fallos de la caché de consultas a Google Books, Open Library y Wikipedia'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Pone a cero los contadores tras mostrarlos')
+
+    def handle(self, *args, **options):
+        for source, counters in lookup_cache.stats().items():
+            ratio = counters['hit_ratio']
+            self.stdout.write(
+                f"{source}: {counters['hits']} aciertos, {counters['misses']} fallos"
+                + (f" ({ratio:.1%})" if ratio is not None else '')
+            )
+        if options['reset']:
+            lookup_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Contadores reiniciados'))
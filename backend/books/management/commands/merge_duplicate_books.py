@@ -0,0 +1,103 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from books import recommendations
+from books.identifiers import normalize_isbn
+from books.models import Activity, Book, BookIdentifier, BookSimilarity, ImportJobItem, Review, UserBook, normalize_name
+from books.ratings import rebuild_book_ratings
+from books.reading_stats import rebuild_reading_stats
+
+# campos que el libro conservado toma de un duplicado si él no los tiene
+FILLABLE_FIELDS = ('author', 'isbn', 'description', 'published_date', 'cover', 'cover_variants')
+
+
+class Command(BaseCommand):
+    help = 'Fusiona los libros duplicados (mismo ISBN-13 canónico o mismo título y autor sin ISBN)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--by-title', action='store_true',
+                            help='Fusiona también libros sin ISBN con el mismo título y autor (importaciones de Open Library)')
+        parser.add_argument('--dry-run', action='store_true', help='Solo muestra los grupos que se fusionarían')
+
+    def handle(self, *args, **options):
+        groups = self.isbn_groups()
+        if options['by_title']:
+            groups += self.title_groups(groups)
+
+        merged = 0
+        similarities_built = recommendations.last_build() is not None
+        stale = set()
+        for books in groups:
+            survivor, duplicates = books[0], books[1:]
+            self.stdout.write(f'{survivor.pk} "{survivor.title}" <- {[book.pk for book in duplicates]}')
+            if not options['dry_run']:
+                stale = (stale | self.merge(survivor, duplicates)) - {book.pk for book in duplicates}
+            merged += len(duplicates)
+        if stale and similarities_built:
+            # vecinos del libro conservado (con los lectores de los duplicados) y de los que apuntaban a ellos
+            recommendations.build_similarities(stale)
+        verb = 'se fusionarían' if options['dry_run'] else 'fusionados'
+        self.stdout.write(self.style.SUCCESS(f'{merged} libros duplicados {verb} en {len(groups)} grupos'))
+
+    def isbn_groups(self):
+        by_isbn = defaultdict(list)
+        for book in Book.objects.exclude(isbn=None).exclude(isbn='').order_by('id').iterator():
+            isbn = normalize_isbn(book.isbn)
+            if isbn:
+                by_isbn[isbn].append(book)
+        return [books for books in by_isbn.values() if len(books) > 1]
+
+    def title_groups(self, isbn_groups):
+        # ya agrupados por ISBN: no se vuelven a considerar
+        taken = {book.pk for books in isbn_groups for book in books[1:]}
+        by_title = defaultdict(list)
+        for book in Book.objects.order_by('id').iterator():
+            if book.pk not in taken:
+                by_title[(normalize_name(book.title), book.author_id)].append(book)
+        groups = []
+        for books in by_title.values():
+            isbns = {normalize_isbn(book.isbn) for book in books} - {None}
+            # ediciones distintas (varios ISBN) no se mezclan; solo se absorben los libros sin ISBN
+            if len(isbns) > 1:
+                continue
+            if len(books) > 1:
+                books.sort(key=lambda book: (normalize_isbn(book.isbn) is None, book.pk))
+                groups.append(books)
+        return groups
+
+    @transaction.atomic
+    def merge(self, survivor, duplicates) -> set:
+        """Fusiona los duplicados en `survivor`; devuelve los libros cuyos vecinos hay que recalcular."""
+        # puede haberse completado al fusionar un grupo anterior
+        survivor.refresh_from_db()
+        ids = [book.pk for book in duplicates]
+        # las filas de BookSimilarity de los duplicados se borran en cascada con ellos
+        neighbours = BookSimilarity.objects.filter(similar_id__in=[survivor.pk, *ids])
+        stale = {survivor.pk, *neighbours.values_list('book_id', flat=True)}
+        # una entrada por usuario y libro: si el usuario ya tenía el libro conservado, sobra la del duplicado
+        readers = set(UserBook.objects.filter(book=survivor).values_list('user_id', flat=True))
+        for entry in UserBook.objects.filter(book_id__in=ids).order_by('-updated_at'):
+            if entry.user_id in readers:
+                UserBook.objects.filter(pk=entry.pk).delete()
+            else:
+                UserBook.objects.filter(pk=entry.pk).update(book=survivor)
+                readers.add(entry.user_id)
+        Review.objects.filter(book_id__in=ids).update(book=survivor)
+        # la actividad se conserva en las cronologías, ahora apuntando al libro conservado
+        Activity.objects.filter(book_id__in=ids).update(book=survivor)
+        ImportJobItem.objects.filter(book_id__in=ids).update(book=survivor)
+        BookIdentifier.objects.filter(book_id__in=ids).update(book=survivor)
+
+        for book in duplicates:
+            for field in FILLABLE_FIELDS:
+                if not getattr(survivor, field) and getattr(book, field):
+                    setattr(survivor, field, getattr(book, field))
+        Book.objects.filter(pk__in=ids).delete()
+        # save() actualiza el vector de búsqueda e identificadores; luego las notas desde cero
+        survivor.save()
+        rebuild_book_ratings(book_ids=[survivor.pk])
+        # las entradas movidas con update() pueden cambiar de autor o año en el resumen de sus usuarios
+        rebuild_reading_stats(user_ids=readers)
+        return stale
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from books.ratings import rebuild_book_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la nota media y el número de notas de todos los libros a partir de reseñas y bibliotecas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Libros actualizados por transacción')
+
+    def handle(self, *args, **options):
+        total = rebuild_book_ratings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Notas recalculadas para {total} libros'))
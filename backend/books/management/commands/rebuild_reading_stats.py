@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from books.reading_stats import rebuild_reading_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde las bibliotecas el resumen de estadísticas de lectura de cada usuario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Solo este usuario (id); se puede repetir')
+        parser.add_argument('--batch-size', type=int, default=500, help='Usuarios actualizados por transacción')
+
+    def handle(self, *args, **options):
+        total = rebuild_reading_stats(user_ids=options['users'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Estadísticas recalculadas para {total} usuarios'))
@@ -0,0 +1,32 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.queue import RedisQueue, get_queue
+
+
+class Command(BaseCommand):
+    help = 'Consume las tareas en segundo plano (importaciones de libros) desde la cola de Redis'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Número de hilos consumidores')
+
+    def handle(self, *args, **options):
+        queue = get_queue()
+        if not isinstance(queue, RedisQueue):
+            raise CommandError('BOOKS_TASK_QUEUE no usa el backend redis; las tareas se ejecutan en el proceso web')
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+        threads = [
+            threading.Thread(target=queue.work, kwargs={'stop_event': stop}, name=f'books-worker-{i}')
+            for i in range(max(options['concurrency'], 1))
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(self.style.SUCCESS(f'Worker iniciado con {len(threads)} hilos'))
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,38 @@
+# Generated by Django 5.0 on 2026-10-18 07:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='enrichment_attempted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='enrichment_failures',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='enrichment_next_retry_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='openlibrary_status',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('found', 'Encontrado'), ('not_found', 'Sin resultados'), ('error', 'Error')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='wikipedia_status',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('found', 'Encontrado'), ('not_found', 'Sin resultados'), ('error', 'Error')], default='pending', max_length=10),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0 on 2026-10-18 07:30
+
+import mybookconnect.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='author',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=mybookconnect.storage.get_image_storage, upload_to='author_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='cover',
+            field=models.ImageField(blank=True, null=True, storage=mybookconnect.storage.get_image_storage, upload_to='covers/'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.0 on 2026-10-18 07:34
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Configuraciones de búsqueda: copia de spanish/english que ignora acentos cuando `unaccent` está disponible
+SEARCH_CONFIGS = (('books_es', 'spanish'), ('books_en', 'english'))
+
+POPULATE_SQL = """
+UPDATE books_book b SET search_vector =
+    setweight(to_tsvector('books_es', coalesce(b.title, '')), 'A')
+    || setweight(to_tsvector('books_es', coalesce(a.name, '')), 'B')
+    || setweight(to_tsvector('books_en', coalesce(b.title, '')), 'A')
+    || setweight(to_tsvector('books_en', coalesce(a.name, '')), 'B')
+    || setweight(to_tsvector('books_es', coalesce(b.description, '')), 'D')
+FROM books_book b2 LEFT JOIN books_author a ON a.id = b2.author_id
+WHERE b.id = b2.id
+"""
+
+
+def setup_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT name FROM pg_available_extensions')
+        available = {row[0] for row in cursor.fetchall()}
+        for extension in ('unaccent', 'pg_trgm'):
+            if extension in available:
+                cursor.execute(f'CREATE EXTENSION IF NOT EXISTS {extension}')
+
+        for name, base in SEARCH_CONFIGS:
+            cursor.execute('SELECT 1 FROM pg_ts_config WHERE cfgname = %s', [name])
+            if cursor.fetchone() is None:
+                cursor.execute(f'CREATE TEXT SEARCH CONFIGURATION {name} (COPY = {base})')
+                if 'unaccent' in available:
+                    cursor.execute(
+                        f'ALTER TEXT SEARCH CONFIGURATION {name} '
+                        f'ALTER MAPPING FOR hword, hword_part, word WITH unaccent, {base}_stem'
+                    )
+
+        cursor.execute('CREATE INDEX IF NOT EXISTS book_search_vector_gin ON books_book USING GIN (search_vector)')
+        if 'pg_trgm' in available:
+            cursor.execute('CREATE INDEX IF NOT EXISTS book_title_trgm ON books_book USING GIN (title gin_trgm_ops)')
+        cursor.execute(POPULATE_SQL)
+
+
+def teardown_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP INDEX IF EXISTS book_title_trgm')
+        cursor.execute('DROP INDEX IF EXISTS book_search_vector_gin')
+        for name, _ in SEARCH_CONFIGS:
+            cursor.execute(f'DROP TEXT SEARCH CONFIGURATION IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(setup_search, teardown_search),
+    ]
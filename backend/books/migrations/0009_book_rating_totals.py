@@ -0,0 +1,54 @@
+# Generated by Django 5.0 on 2026-10-18 07:37
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_rating_totals(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    totals = defaultdict(lambda: [0, 0])
+    for model_name in ('Review', 'UserBook'):
+        model = apps.get_model('books', model_name)
+        rows = (
+            model.objects.filter(rating__isnull=False).order_by().values('book')
+            .annotate(total=Sum('rating'), count=Count('id'))
+        )
+        for row in rows:
+            totals[row['book']][0] += row['total']
+            totals[row['book']][1] += row['count']
+    for book_id, (rating_sum, rating_count) in totals.items():
+        Book.objects.filter(pk=book_id).update(
+            rating_sum=rating_sum, rating_count=rating_count, average_rating=rating_sum / rating_count,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_book_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='average_rating',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-average_rating', '-id'], name='book_rating_id_idx'),
+        ),
+        migrations.RunPython(populate_rating_totals, migrations.RunPython.noop),
+    ]
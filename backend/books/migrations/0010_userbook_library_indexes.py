@@ -0,0 +1,39 @@
+# Generated by Django 5.0 on 2026-10-18 07:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0009_book_rating_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userbook',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='userbook_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbook',
+            index=models.Index(fields=['user', 'rating', 'id'], name='userbook_user_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbook',
+            index=models.Index(condition=models.Q(('wishlist', True)), fields=['user', '-updated_at', '-id'], name='userbook_wishlist_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbook',
+            index=models.Index(condition=models.Q(('is_read', True)), fields=['user', '-updated_at', '-id'], name='userbook_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbook',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', '-updated_at', '-id'], name='userbook_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbook',
+            index=models.Index(condition=models.Q(('owned', True)), fields=['user', '-updated_at', '-id'], name='userbook_owned_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0 on 2026-10-18 07:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0010_userbook_library_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='add_to_library',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='kind',
+            field=models.CharField(choices=[('search', 'Búsqueda'), ('bulk', 'Lista de ISBN o CSV')], default='search', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='processed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ImportJobItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('isbn', models.CharField(blank=True, max_length=30)),
+                ('title', models.CharField(blank=True, max_length=300)),
+                ('author_name', models.CharField(blank=True, max_length=200)),
+                ('is_read', models.BooleanField(default=False)),
+                ('rating', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('owned', models.BooleanField(default=False)),
+                ('wishlist', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('imported', 'Importado'), ('existing', 'Ya existía'), ('not_found', 'Sin resultados')], default='pending', max_length=10)),
+                ('book', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='books.book')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='books.importjob')),
+            ],
+            options={
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['job', 'status', 'position'], name='importitem_job_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.0 on 2026-10-18 07:46
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# copia de books.identifiers.normalize_isbn tal y como era al crear la migración
+def normalize_isbn(value):
+    digits = re.sub(r'[^0-9Xx]', '', str(value or '')).upper()
+    if len(digits) == 10 and re.fullmatch(r'\d{9}[\dX]', digits):
+        if sum((10 - i) * (10 if c == 'X' else int(c)) for i, c in enumerate(digits)) % 11 == 0:
+            digits = '978' + digits[:9]
+            return digits + _isbn13_check_digit(digits)
+    if len(digits) == 13 and digits.isdigit() and digits[:3] in ('978', '979') \
+            and _isbn13_check_digit(digits[:12]) == digits[12]:
+        return digits
+    return None
+
+
+def _isbn13_check_digit(first12):
+    total = sum(int(c) * (1 if i % 2 == 0 else 3) for i, c in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def register_isbns(apps, schema_editor):
+    # el libro más antiguo se queda el ISBN; los duplicados se fusionan con `merge_duplicate_books`
+    Book = apps.get_model('books', 'Book')
+    BookIdentifier = apps.get_model('books', 'BookIdentifier')
+    seen = set()
+    rows = []
+    for book_id, isbn in Book.objects.exclude(isbn=None).order_by('id').values_list('id', 'isbn').iterator():
+        value = normalize_isbn(isbn)
+        if value and value not in seen:
+            seen.add(value)
+            rows.append(BookIdentifier(book_id=book_id, kind='isbn13', value=value))
+    BookIdentifier.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0011_bulk_import'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookIdentifier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('isbn13', 'ISBN-13'), ('ol_work', 'Obra de Open Library'), ('ol_edition', 'Edición de Open Library'), ('google_volume', 'Volumen de Google Books')], max_length=15)),
+                ('value', models.CharField(max_length=64)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='identifiers', to='books.book')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='bookidentifier',
+            constraint=models.UniqueConstraint(fields=('kind', 'value'), name='book_identifier_unique'),
+        ),
+        migrations.RunPython(register_isbns, migrations.RunPython.noop),
+    ]
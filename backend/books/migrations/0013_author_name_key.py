@@ -0,0 +1,55 @@
+# Generated by Django 5.0 on 2026-10-18 08:02
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+# copia de books.models.normalize_name tal y como era al crear la migración
+def normalize_name(name):
+    name = ''.join(c for c in unicodedata.normalize('NFD', name or '') if unicodedata.category(c) != 'Mn')
+    return ' '.join(name.casefold().split())
+
+
+def merge_duplicate_authors(apps, schema_editor):
+    # los autores con el mismo nombre normalizado se funden en el más antiguo antes de la restricción única
+    Author = apps.get_model('books', 'Author')
+    Book = apps.get_model('books', 'Book')
+    survivors = {}
+    for author in Author.objects.order_by('id').iterator():
+        key = normalize_name(author.name)[:200]
+        survivor = survivors.get(key)
+        if survivor is None:
+            author.name_key = key
+            author.save(update_fields=['name_key'])
+            survivors[key] = author
+            continue
+        Book.objects.filter(author_id=author.pk).update(author_id=survivor.pk)
+        if not survivor.biography and author.biography:
+            survivor.biography = author.biography
+            survivor.save(update_fields=['biography'])
+        author.delete()
+
+
+class Migration(migrations.Migration):
+    # en PostgreSQL el ALTER de la restricción única no puede ir en la misma transacción que la fusión:
+    # quedarían pendientes los triggers de las claves foráneas de los libros movidos
+    atomic = False
+
+    dependencies = [
+        ('books', '0012_book_identifiers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='name_key',
+            field=models.CharField(editable=False, max_length=200, null=True),
+        ),
+        migrations.RunPython(merge_duplicate_authors, migrations.RunPython.noop, atomic=True),
+        migrations.AlterField(
+            model_name='author',
+            name='name_key',
+            field=models.CharField(editable=False, max_length=200, unique=True),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.0 on 2026-10-18 08:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractYear
+
+FLAGS = {'read': 'is_read', 'owned': 'owned', 'digital': 'is_digital', 'wishlist': 'wishlist'}
+
+
+def compute_summaries(UserBook, user_ids):
+    # copia de books.reading_stats.compute_summaries tal y como era al crear la migración
+    summaries = {
+        pk: {
+            'total': 0, **{field: 0 for field in FLAGS}, 'rated': 0, 'rating_sum': 0,
+            'rating_histogram': {}, 'books_per_year': {}, 'books_per_author': {},
+        }
+        for pk in user_ids
+    }
+    entries = UserBook.objects.filter(user_id__in=user_ids).order_by()
+    counts = entries.values('user_id').annotate(
+        total=Count('id'),
+        **{field: Count('id', filter=Q(**{flag: True})) for field, flag in FLAGS.items()},
+        rated=Count('rating'),
+        rating_sum=Sum('rating'),
+    )
+    for row in counts:
+        user_id = row.pop('user_id')
+        summaries[user_id].update(row, rating_sum=row['rating_sum'] or 0)
+    groups = {
+        'rating_histogram': entries.filter(rating__isnull=False).values('user_id', key=F('rating')),
+        'books_per_year': entries.filter(book__published_date__isnull=False).values(
+            'user_id', key=ExtractYear('book__published_date'),
+        ),
+        'books_per_author': entries.filter(book__author__isnull=False).values('user_id', key=F('book__author_id')),
+    }
+    for field, rows in groups.items():
+        for row in rows.annotate(n=Count('id')):
+            summaries[row['user_id']][field][str(row['key'])] = row['n']
+    return summaries
+
+
+def populate_reading_stats(apps, schema_editor):
+    UserBook = apps.get_model('books', 'UserBook')
+    UserReadingStats = apps.get_model('books', 'UserReadingStats')
+    user_ids = list(UserBook.objects.order_by().values_list('user_id', flat=True).distinct())
+    for start in range(0, len(user_ids), 500):
+        summaries = compute_summaries(UserBook, user_ids[start:start + 500])
+        UserReadingStats.objects.bulk_create(
+            [UserReadingStats(user_id=pk, **summary) for pk, summary in summaries.items()],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0014_catalogue_updated_at'),
+        ('users', '0004_alter_user_avatar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserReadingStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reading_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('read', models.PositiveIntegerField(default=0)),
+                ('owned', models.PositiveIntegerField(default=0)),
+                ('digital', models.PositiveIntegerField(default=0)),
+                ('wishlist', models.PositiveIntegerField(default=0)),
+                ('rated', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_histogram', models.JSONField(blank=True, default=dict)),
+                ('books_per_year', models.JSONField(blank=True, default=dict)),
+                ('books_per_author', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_reading_stats, migrations.RunPython.noop),
+    ]
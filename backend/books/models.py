@@ -1,32 +1,119 @@
+import unicodedata
+import uuid
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from datetime import datetime
 
+from mybookconnect.storage import get_image_storage
+
+
+def normalize_name(name: str) -> str:
+    """Clave de comparación de nombres: sin acentos, sin distinguir mayúsculas y con los espacios colapsados."""
+    name = ''.join(c for c in unicodedata.normalize('NFD', name or '') if unicodedata.category(c) != 'Mn')
+    return ' '.join(name.casefold().split())
+
+
+# la normalización puede alargar el nombre ('ß' -> 'ss'), así que la clave se recorta al tamaño del campo
+AUTHOR_NAME_KEY_LENGTH = 200
+
+
+def author_name_key(name: str) -> str:
+    """Valor de Author.name_key para `name`."""
+    return normalize_name(name)[:AUTHOR_NAME_KEY_LENGTH]
+
+
+class EnrichmentStatus(models.TextChoices):
+    PENDING = 'pending', 'Pendiente'
+    FOUND = 'found', 'Encontrado'
+    NOT_FOUND = 'not_found', 'Sin resultados'
+    ERROR = 'error', 'Error'
+
 
 class Author(models.Model):
     name = models.CharField(max_length=200)
+    # nombre normalizado y único: las importaciones concurrentes insertan con ON CONFLICT sobre él
+    name_key = models.CharField(max_length=AUTHOR_NAME_KEY_LENGTH, unique=True, editable=False)
     biography = models.TextField(blank=True, null=True)
-    photo = models.ImageField(upload_to='author_photos/', null=True, blank=True)
+    photo = models.ImageField(upload_to='author_photos/', storage=get_image_storage, null=True, blank=True)
+    # versiones WebP pregeneradas {'S'|'M'|'L': ruta en el storage}
+    photo_variants = models.JSONField(default=dict, blank=True)
+    # estado del enriquecimiento desde Open Library / Wikipedia, para no repetirlo en cada lectura
+    enrichment_attempted_at = models.DateTimeField(null=True, blank=True)
+    openlibrary_status = models.CharField(max_length=10, choices=EnrichmentStatus.choices, default=EnrichmentStatus.PENDING)
+    wikipedia_status = models.CharField(max_length=10, choices=EnrichmentStatus.choices, default=EnrichmentStatus.PENDING)
+    enrichment_failures = models.PositiveSmallIntegerField(default=0)
+    enrichment_next_retry_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # versión de los datos publicados (ETag/Last-Modified de la API, ver books/http_cache.py)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.name_key = author_name_key(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_key'}
+        super().save(*args, **kwargs)
+
+    @property
+    def needs_enrichment(self):
+        return not self.biography or not self.photo
+
 
 class Book(models.Model):
     title = models.CharField(max_length=300)
     author = models.ForeignKey(Author, null=True, blank=True, on_delete=models.SET_NULL, related_name='books')
     isbn = models.CharField(max_length=30, blank=True, null=True, db_index=True)
-    cover = models.ImageField(upload_to='covers/', null=True, blank=True)
+    cover = models.ImageField(upload_to='covers/', storage=get_image_storage, null=True, blank=True)
+    cover_variants = models.JSONField(default=dict, blank=True)
     description = models.TextField(blank=True, null=True)
     published_date = models.DateField(blank=True, null=True)
     created_at = models.DateTimeField(default=datetime.utcnow)
-    # puntuación media o agregada (opcional, puede calcularse desde reseñas)
-    average_rating = models.FloatField(null=True, blank=True)
+    # notas (1-10) de reseñas y bibliotecas de usuarios, mantenidas al guardar cada una (ver books/ratings.py)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    average_rating = models.FloatField(null=True, blank=True, editable=False)
+    # título, autor y descripción para la búsqueda full-text (índice GIN en PostgreSQL, ver books/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # clave de la paginación por cursor del catálogo
+            models.Index(fields=['-created_at', '-id'], name='book_created_id_idx'),
+            # ordenación y filtro por nota media del catálogo
+            models.Index(fields=['-average_rating', '-id'], name='book_rating_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title}"
 
 
+class IdentifierKind(models.TextChoices):
+    ISBN13 = 'isbn13', 'ISBN-13'
+    OL_WORK = 'ol_work', 'Obra de Open Library'
+    OL_EDITION = 'ol_edition', 'Edición de Open Library'
+    GOOGLE_VOLUME = 'google_volume', 'Volumen de Google Books'
+
+
+class BookIdentifier(models.Model):
+    # identificadores canónicos (ISBN-13 normalizado, claves externas) con los que se resuelven duplicados
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='identifiers')
+    kind = models.CharField(max_length=15, choices=IdentifierKind.choices)
+    value = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'value'], name='book_identifier_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.value}"
+
+
 class UserBook(models.Model):
     # metadatos por usuario sobre un libro
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='user_books')
@@ -41,6 +128,15 @@ class UserBook(models.Model):
 
     class Meta:
         unique_together = ('user', 'book')
+        # accesos de la biblioteca (UserBookListCreateView): siempre por usuario, con filtros y orden opcionales
+        indexes = [
+            models.Index(fields=['user', '-updated_at', '-id'], name='userbook_user_updated_idx'),
+            models.Index(fields=['user', 'rating', 'id'], name='userbook_user_rating_idx'),
+            models.Index(fields=['user', '-updated_at', '-id'], name='userbook_wishlist_idx', condition=models.Q(wishlist=True)),
+            models.Index(fields=['user', '-updated_at', '-id'], name='userbook_read_idx', condition=models.Q(is_read=True)),
+            models.Index(fields=['user', '-updated_at', '-id'], name='userbook_unread_idx', condition=models.Q(is_read=False)),
+            models.Index(fields=['user', '-updated_at', '-id'], name='userbook_owned_idx', condition=models.Q(owned=True)),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.book.title}"
@@ -55,6 +151,166 @@ class Review(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='review_created_id_idx'),
+            models.Index(fields=['book', '-created_at', '-id'], name='review_book_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Reseña {self.user.username} - {self.book.title}"
+
+
+class BookSimilarity(models.Model):
+    # vecinos más parecidos de cada libro según quién los lee y cómo los puntúa (books/recommendations.py)
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='neighbours')
+    similar = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'similar'], name='book_similarity_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['book', 'rank'], name='book_similarity_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.book_id} ~ {self.similar_id} ({self.score:.3f})"
+
+
+class UserReadingStats(models.Model):
+    # resumen de la biblioteca de cada usuario, mantenido al guardar o borrar sus UserBook (ver books/reading_stats.py)
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='reading_stats')
+    total = models.PositiveIntegerField(default=0)
+    read = models.PositiveIntegerField(default=0)
+    owned = models.PositiveIntegerField(default=0)
+    digital = models.PositiveIntegerField(default=0)
+    wishlist = models.PositiveIntegerField(default=0)
+    rated = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    # {'1'..'10': libros}, {'año de publicación': libros}, {'id de autor': libros}
+    rating_histogram = models.JSONField(default=dict, blank=True)
+    books_per_year = models.JSONField(default=dict, blank=True)
+    books_per_author = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Estadísticas de {self.user_id}"
+
+
+class ActivityVerb(models.TextChoices):
+    ADDED = 'added', 'Ha añadido a su biblioteca'
+    WISHLISTED = 'wishlisted', 'Quiere leer'
+    READ = 'read', 'Ha leído'
+    RATED = 'rated', 'Ha puntuado'
+    REVIEWED = 'reviewed', 'Ha reseñado'
+
+
+class Activity(models.Model):
+    # algo que ha hecho un usuario con un libro; se reparte a las cronologías de sus seguidores (books/activity.py)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='activities')
+    verb = models.CharField(max_length=12, choices=ActivityVerb.choices)
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='activities')
+    review = models.ForeignKey(Review, null=True, blank=True, on_delete=models.CASCADE, related_name='activities')
+    rating = models.PositiveSmallIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # actividad reciente de un usuario, para rellenar la cronología de un nuevo seguidor
+            models.Index(fields=['actor', '-created_at', '-id'], name='activity_actor_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.actor_id} {self.verb} {self.book_id}"
+
+
+class TimelineEntry(models.Model):
+    # copia de una actividad en la cronología de quien puede verla: leer el feed es leer una página de aquí
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline')
+    activity = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name='timeline_entries')
+    # la fecha de la actividad, repetida para paginar por cursor sobre el índice (owner, -created_at, -id)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'activity'], name='timeline_owner_activity_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-id'], name='timeline_owner_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner_id} <- {self.activity_id}"
+
+
+class ImportStatus(models.TextChoices):
+    PENDING = 'pending', 'Pendiente'
+    RUNNING = 'running', 'En curso'
+    DONE = 'done', 'Completado'
+    FAILED = 'failed', 'Fallido'
+
+
+class ImportKind(models.TextChoices):
+    SEARCH = 'search', 'Búsqueda'
+    BULK = 'bulk', 'Lista de ISBN o CSV'
+
+
+class ImportJob(models.Model):
+    # importación de libros desde APIs externas ejecutada fuera del ciclo de petición
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='import_jobs')
+    kind = models.CharField(max_length=10, choices=ImportKind.choices, default=ImportKind.SEARCH)
+    isbn = models.CharField(max_length=30, blank=True)
+    title = models.CharField(max_length=300, blank=True)
+    offset = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=ImportStatus.choices, default=ImportStatus.PENDING)
+    progress = models.PositiveSmallIntegerField(default=0)  # 0-100
+    # importaciones masivas: filas totales y procesadas, y si se añaden a la biblioteca del usuario
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    add_to_library = models.BooleanField(default=False)
+    book_ids = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Importación {self.isbn or self.title} ({self.status})"
+
+
+class ImportItemStatus(models.TextChoices):
+    PENDING = 'pending', 'Pendiente'
+    IMPORTED = 'imported', 'Importado'
+    EXISTING = 'existing', 'Ya existía'
+    NOT_FOUND = 'not_found', 'Sin resultados'
+
+
+class ImportJobItem(models.Model):
+    # fila de una importación masiva; las pendientes son las que quedan si el proceso se interrumpe
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name='items')
+    position = models.PositiveIntegerField()
+    isbn = models.CharField(max_length=30, blank=True)
+    title = models.CharField(max_length=300, blank=True)
+    author_name = models.CharField(max_length=200, blank=True)
+    # datos de la biblioteca de origen (p. ej. estanterías y notas de Goodreads)
+    is_read = models.BooleanField(default=False)
+    rating = models.PositiveSmallIntegerField(null=True, blank=True)  # 1-10
+    owned = models.BooleanField(default=False)
+    wishlist = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=ImportItemStatus.choices, default=ImportItemStatus.PENDING)
+    book = models.ForeignKey(Book, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+
+    class Meta:
+        ordering = ['position']
+        indexes = [
+            models.Index(fields=['job', 'status', 'position'], name='importitem_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.isbn or self.title} ({self.status})"
@@ -0,0 +1,107 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+
+# Registro nombre -> función de las tareas que pueden ejecutarse en segundo plano
+_TASKS = {}
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def task(name: str):
+    def decorator(func):
+        _TASKS[name] = func
+        return func
+    return decorator
+
+
+def run_task(name: str, kwargs: dict):
+    func = _TASKS.get(name)
+    if func is None:
+        logging.error('Tarea desconocida: %s', name)
+        return
+    close_old_connections()
+    try:
+        func(**kwargs)
+    except Exception as e:
+        logging.exception(e)
+    finally:
+        close_old_connections()
+
+
+class InlineQueue:
+    """Ejecuta la tarea en el propio proceso y de forma síncrona (tests)."""
+
+    def push(self, name: str, kwargs: dict):
+        func = _TASKS[name]
+        func(**kwargs)
+
+
+class ThreadQueue:
+    """Pool de hilos dentro del proceso web, para entornos sin Redis."""
+
+    def __init__(self, workers: int = 4):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='books-task')
+
+    def push(self, name: str, kwargs: dict):
+        self.executor.submit(run_task, name, kwargs)
+
+
+class RedisQueue:
+    """Lista de Redis compartida; `manage.py run_task_worker` consume las tareas."""
+
+    def __init__(self, url: str, queue_name: str = 'books:tasks'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.queue_name = queue_name
+
+    def push(self, name: str, kwargs: dict):
+        self.client.rpush(self.queue_name, json.dumps({'task': name, 'kwargs': kwargs}))
+
+    def work(self, stop_event: threading.Event | None = None, poll_timeout: int = 5):
+        while not (stop_event and stop_event.is_set()):
+            item = self.client.blpop(self.queue_name, timeout=poll_timeout)
+            if not item:
+                continue
+            try:
+                message = json.loads(item[1])
+            except ValueError:
+                logging.error('Mensaje de tarea inválido: %r', item[1])
+                continue
+            run_task(message.get('task'), message.get('kwargs') or {})
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                conf = getattr(settings, 'BOOKS_TASK_QUEUE', {})
+                backend = conf.get('BACKEND', 'thread')
+                if backend == 'redis':
+                    _queue = RedisQueue(conf.get('URL', settings.REDIS_URL), conf.get('QUEUE_NAME', 'books:tasks'))
+                elif backend == 'inline':
+                    _queue = InlineQueue()
+                else:
+                    _queue = ThreadQueue(conf.get('WORKERS', 4))
+    return _queue
+
+
+def enqueue(name: str, **kwargs):
+    # Se encola tras el commit para que el worker vea las filas ya creadas
+    transaction.on_commit(lambda: get_queue().push(name, kwargs))
+
+
+@receiver(setting_changed)
+def _reset_queue(setting, **kwargs):
+    global _queue
+    if setting in ('BOOKS_TASK_QUEUE', 'REDIS_URL'):
+        _queue = None
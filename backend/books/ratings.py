@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Now
+from django.db.models.lookups import GreaterThan
+
+from .models import Book, Review, UserBook
+
+
+def _average(rating_sum, rating_count):
+    # se evalúa en la misma sentencia UPDATE que los totales, así que recibe las expresiones nuevas
+    return Case(
+        When(GreaterThan(rating_count, 0), then=Cast(rating_sum, FloatField()) / Cast(rating_count, FloatField())),
+        default=Value(None),
+        output_field=FloatField(),
+    )
+
+
+def apply_rating_delta(book_id, delta_sum: int, delta_count: int):
+    """Suma (o resta) notas a los totales del libro con un único UPDATE atómico."""
+    if not book_id or (not delta_sum and not delta_count):
+        return
+    rating_sum = F('rating_sum') + delta_sum
+    rating_count = F('rating_count') + delta_count
+    Book.objects.filter(pk=book_id).update(
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        average_rating=_average(rating_sum, rating_count),
+        updated_at=Now(),
+    )
+
+
+def rating_changed(old, new):
+    """Aplica el cambio de una nota: `old` y `new` son tuplas (book_id, rating) o None."""
+    old_book, old_rating = old or (None, None)
+    new_book, new_rating = new or (None, None)
+    if old_book == new_book:
+        delta_sum = (new_rating or 0) - (old_rating or 0)
+        delta_count = (new_rating is not None) - (old_rating is not None)
+        apply_rating_delta(new_book, delta_sum, delta_count)
+        return
+    if old_rating is not None:
+        apply_rating_delta(old_book, -old_rating, -1)
+    if new_rating is not None:
+        apply_rating_delta(new_book, new_rating, 1)
+
+
+def _totals(model, aggregate):
+    rows = (
+        model.objects.filter(book=OuterRef('pk'), rating__isnull=False)
+        .order_by().values('book').annotate(total=aggregate).values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def rebuild_book_ratings(book_ids=None, batch_size: int = 1000) -> int:
+    """Recalcula desde cero los totales de los libros (todos por defecto), por lotes de ids; devuelve cuántos."""
+    rating_sum = _totals(Review, Sum('rating')) + _totals(UserBook, Sum('rating'))
+    rating_count = _totals(Review, Count('id')) + _totals(UserBook, Count('id'))
+    queryset = Book.objects.order_by('pk')
+    if book_ids is not None:
+        queryset = queryset.filter(pk__in=book_ids)
+    ids = list(queryset.values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        with transaction.atomic():
+            Book.objects.filter(pk__in=batch).update(
+                rating_sum=rating_sum,
+                rating_count=rating_count,
+                average_rating=_average(rating_sum, rating_count),
+                updated_at=Now(),
+            )
+    return len(ids)
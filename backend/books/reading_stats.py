@@ -0,0 +1,134 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractYear
+
+from .models import Book, UserBook, UserReadingStats
+
+# campo del resumen -> marca de UserBook que cuenta
+FLAGS = {'read': 'is_read', 'owned': 'owned', 'digital': 'is_digital', 'wishlist': 'wishlist'}
+ENTRY_FIELDS = ('book_id', 'rating', *FLAGS.values(), 'book__published_date', 'book__author_id')
+SUMMARY_FIELDS = (
+    'total', *FLAGS, 'rated', 'rating_sum', 'rating_histogram', 'books_per_year', 'books_per_author',
+)
+
+
+def _state(row: dict) -> dict:
+    # en una instancia recién asignada puede ser todavía el texto 'AAAA-MM-DD'
+    published = Book._meta.get_field('published_date').to_python(row['book__published_date'])
+    return {
+        'rating': row['rating'],
+        **{field: row[flag] for field, flag in FLAGS.items()},
+        'year': published.year if published else None,
+        'author': row['book__author_id'],
+    }
+
+
+def entry_state(entry: UserBook) -> dict:
+    """Lo que aporta una entrada de la biblioteca al resumen de su usuario."""
+    book = entry.book
+    return _state({
+        'rating': entry.rating,
+        **{flag: getattr(entry, flag) for flag in FLAGS.values()},
+        'book__published_date': book.published_date,
+        'book__author_id': book.author_id,
+    })
+
+
+def stored_entry(pk) -> dict | None:
+    """Valores guardados de una entrada (ENTRY_FIELDS), antes de que se modifique."""
+    return UserBook.objects.filter(pk=pk).values(*ENTRY_FIELDS).first()
+
+
+def stored_state(row: dict | None) -> dict | None:
+    return _state(row) if row else None
+
+
+def _bump(counts: dict, key, sign: int):
+    key = str(key)
+    value = counts.get(key, 0) + sign
+    if value > 0:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+def _apply(stats: UserReadingStats, state: dict, sign: int):
+    stats.total = max(stats.total + sign, 0)
+    for field in FLAGS:
+        if state[field]:
+            setattr(stats, field, max(getattr(stats, field) + sign, 0))
+    if state['rating'] is not None:
+        stats.rated = max(stats.rated + sign, 0)
+        stats.rating_sum = max(stats.rating_sum + sign * state['rating'], 0)
+        _bump(stats.rating_histogram, state['rating'], sign)
+    if state['year']:
+        _bump(stats.books_per_year, state['year'], sign)
+    if state['author']:
+        _bump(stats.books_per_author, state['author'], sign)
+
+
+def entries_changed(user_id, removed=(), added=()):
+    """Resta las entradas `removed` y suma las `added` (estados de entry_state) al resumen del usuario."""
+    removed, added = [s for s in removed if s], [s for s in added if s]
+    if removed == added:
+        return
+    with transaction.atomic():
+        UserReadingStats.objects.bulk_create([UserReadingStats(user_id=user_id)], ignore_conflicts=True)
+        # la fila bloqueada serializa los cambios concurrentes de la misma biblioteca
+        stats = UserReadingStats.objects.select_for_update().get(user_id=user_id)
+        for state in removed:
+            _apply(stats, state, -1)
+        for state in added:
+            _apply(stats, state, 1)
+        stats.save()
+
+
+def _empty_summary() -> dict:
+    return {
+        'total': 0, **{field: 0 for field in FLAGS}, 'rated': 0, 'rating_sum': 0,
+        'rating_histogram': {}, 'books_per_year': {}, 'books_per_author': {},
+    }
+
+
+def compute_summaries(user_ids) -> dict:
+    """Resúmenes calculados desde cero para `user_ids`: {user_id: {campo: valor}}."""
+    summaries = {pk: _empty_summary() for pk in user_ids}
+    entries = UserBook.objects.filter(user_id__in=user_ids).order_by()
+    counts = entries.values('user_id').annotate(
+        total=Count('id'),
+        **{field: Count('id', filter=Q(**{flag: True})) for field, flag in FLAGS.items()},
+        rated=Count('rating'),
+        rating_sum=Sum('rating'),
+    )
+    for row in counts:
+        user_id = row.pop('user_id')
+        summaries[user_id].update(row, rating_sum=row['rating_sum'] or 0)
+
+    groups = {
+        'rating_histogram': entries.filter(rating__isnull=False).values('user_id', key=F('rating')),
+        'books_per_year': entries.filter(book__published_date__isnull=False).values(
+            'user_id', key=ExtractYear('book__published_date'),
+        ),
+        'books_per_author': entries.filter(book__author__isnull=False).values('user_id', key=F('book__author_id')),
+    }
+    for field, rows in groups.items():
+        for row in rows.annotate(n=Count('id')):
+            summaries[row['user_id']][field][str(row['key'])] = row['n']
+    return summaries
+
+
+def rebuild_reading_stats(user_ids=None, batch_size: int = 500) -> int:
+    """Recalcula desde cero los resúmenes (de todos los usuarios por defecto); devuelve cuántos."""
+    queryset = get_user_model().objects.order_by('pk')
+    if user_ids is not None:
+        queryset = queryset.filter(pk__in=user_ids)
+    ids = list(queryset.values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        summaries = compute_summaries(ids[start:start + batch_size])
+        with transaction.atomic():
+            UserReadingStats.objects.bulk_create(
+                [UserReadingStats(user_id=pk, **summary) for pk, summary in summaries.items()],
+                update_conflicts=True, unique_fields=['user'], update_fields=[*SUMMARY_FIELDS, 'updated_at'],
+            )
+    return len(ids)
@@ -0,0 +1,168 @@
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import Book, BookSimilarity, Review, UserBook
+
+# vecinos guardados por libro
+TOP_K = 20
+# lectores en común mínimos para que dos libros se consideren parecidos
+MIN_CO_READERS = 2
+# encoge la similitud de pares con pocos lectores en común: n / (n + SHRINKAGE)
+SHRINKAGE = 10
+# libros (filas de la matriz de similitud) calculados a la vez
+CHUNK_SIZE = 2000
+# preferencia de un lector por un libro sin nota
+READ_WEIGHT = 0.6
+WISHLIST_WEIGHT = 0.3
+OWNED_WEIGHT = 0.3
+# libros de la biblioteca del usuario de los que se parte para recomendarle otros
+SEED_LIMIT = 200
+MIN_SEED_RATING = 7
+
+
+def _preferences():
+    """Preferencia (0-1] de cada lector por cada libro: su nota (la mayor entre biblioteca y reseña) o una
+    señal implícita si no puntuó. Devuelve {(user_id, book_id): peso}."""
+    weights = {}
+    rows = UserBook.objects.order_by().values_list('user_id', 'book_id', 'rating', 'is_read', 'wishlist', 'owned')
+    for user_id, book_id, rating, is_read, wishlist, owned in rows.iterator(chunk_size=5000):
+        if rating is not None:
+            weight = rating / 10
+        elif is_read:
+            weight = READ_WEIGHT
+        elif wishlist:
+            weight = WISHLIST_WEIGHT
+        elif owned:
+            weight = OWNED_WEIGHT
+        else:
+            continue
+        weights[(user_id, book_id)] = weight
+    for user_id, book_id, rating in Review.objects.order_by().values_list('user_id', 'book_id', 'rating').iterator():
+        key = (user_id, book_id)
+        weights[key] = max(weights.get(key, 0), rating / 10)
+    return weights
+
+
+def _matrix(weights):
+    import numpy as np
+    from scipy import sparse
+
+    users = {user_id: i for i, user_id in enumerate(sorted({user_id for user_id, _ in weights}))}
+    book_ids = np.array(sorted({book_id for _, book_id in weights}), dtype=np.int64)
+    columns = {book_id: i for i, book_id in enumerate(book_ids.tolist())}
+    row = np.fromiter((users[u] for u, _ in weights), dtype=np.int64, count=len(weights))
+    col = np.fromiter((columns[b] for _, b in weights), dtype=np.int64, count=len(weights))
+    data = np.fromiter(weights.values(), dtype=np.float64, count=len(weights))
+    return sparse.csc_matrix((data, (row, col)), shape=(len(users), len(book_ids))), book_ids
+
+
+def _similarities(matrix, columns, top_k, min_co_readers):
+    """Top-K de similitud coseno (encogida por lectores en común) para las columnas `columns` de la matriz.
+
+    Devuelve [(índice de libro, [(índice de vecino, similitud), ...]), ...].
+    """
+    import numpy as np
+    from scipy import sparse
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+    norms[norms == 0] = 1
+    normalized = matrix @ sparse.diags(1 / norms)
+    binary = (matrix > 0).astype(np.float64)
+
+    results = []
+    for start in range(0, len(columns), CHUNK_SIZE):
+        chunk = columns[start:start + CHUNK_SIZE]
+        cosine = (normalized[:, chunk].T @ normalized).tocsr()
+        co_readers = (binary[:, chunk].T @ binary).tocsr()
+        for offset, column in enumerate(chunk):
+            begin, end = cosine.indptr[offset], cosine.indptr[offset + 1]
+            neighbours, scores = cosine.indices[begin:end], cosine.data[begin:end]
+            counts = np.asarray(co_readers[offset, neighbours].todense()).ravel()
+            scores = scores * counts / (counts + SHRINKAGE)
+            keep = (neighbours != column) & (counts >= min_co_readers) & (scores > 0)
+            neighbours, scores = neighbours[keep], scores[keep]
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k)[:top_k]
+                neighbours, scores = neighbours[best], scores[best]
+            order = np.argsort(-scores, kind='stable')
+            results.append((column, list(zip(neighbours[order].tolist(), scores[order].tolist()))))
+    return results
+
+
+def changed_books(since) -> set:
+    """Libros de las bibliotecas y reseñas de los lectores que han cambiado algo desde `since`."""
+    users = set(UserBook.objects.filter(updated_at__gt=since).values_list('user_id', flat=True))
+    users |= set(Review.objects.filter(created_at__gt=since).values_list('user_id', flat=True))
+    books = set(UserBook.objects.filter(user_id__in=users).values_list('book_id', flat=True))
+    books |= set(Review.objects.filter(user_id__in=users).values_list('book_id', flat=True))
+    return books
+
+
+def last_build():
+    return BookSimilarity.objects.aggregate(last=Max('computed_at'))['last']
+
+
+def build_similarities(book_ids=None, top_k: int = TOP_K, min_co_readers: int = MIN_CO_READERS) -> int:
+    """Recalcula los vecinos de `book_ids` (de todos los libros por defecto) contra todo el catálogo leído.
+
+    La matriz lectores x libros se construye entera; solo se calculan y reemplazan las filas pedidas.
+    Devuelve cuántos libros se han actualizado.
+    """
+    import numpy as np
+
+    computed_at = timezone.now()
+    weights = _preferences()
+    if not weights:
+        if book_ids is None:
+            BookSimilarity.objects.all().delete()
+        return 0
+    matrix, index = _matrix(weights)
+    if book_ids is None:
+        columns = np.arange(len(index))
+        targets = index.tolist()
+    else:
+        # los libros pedidos que ya nadie tiene se quedan sin vecinos
+        columns = np.flatnonzero(np.isin(index, list(book_ids)))
+        targets = sorted(book_ids)
+
+    rows = [
+        BookSimilarity(
+            book_id=int(index[column]), similar_id=int(index[neighbour]), score=score, rank=rank,
+            computed_at=computed_at,
+        )
+        for column, neighbours in _similarities(matrix, columns, top_k, min_co_readers)
+        for rank, (neighbour, score) in enumerate(neighbours)
+    ]
+    with transaction.atomic():
+        stale = BookSimilarity.objects.all() if book_ids is None else BookSimilarity.objects.filter(book_id__in=targets)
+        stale.delete()
+        BookSimilarity.objects.bulk_create(rows, batch_size=5000)
+    return len(targets)
+
+
+def similar_books(book_id, limit: int = TOP_K):
+    return (
+        BookSimilarity.objects.filter(book_id=book_id).select_related('similar__author').order_by('rank')[:limit]
+    )
+
+
+def recommendations(user, limit: int = TOP_K):
+    """Libros parecidos a los que el usuario ha leído o puntuado bien, que aún no están en su biblioteca.
+
+    Devuelve BookSimilarity sin guardar (`similar` es el libro recomendado) con la suma de la similitud
+    de cada candidato con cada libro de partida, para servirse con el mismo serializador que similar_books.
+    """
+    library = UserBook.objects.filter(user=user)
+    seeds = (
+        library.filter(rating__gte=MIN_SEED_RATING) | library.filter(rating__isnull=True, is_read=True)
+    ).order_by('-updated_at').values('book_id')[:SEED_LIMIT]
+    rows = list(
+        BookSimilarity.objects.filter(book_id__in=seeds).exclude(similar_id__in=library.values('book_id'))
+        .values('similar_id').annotate(total=Sum('score')).order_by('-total', 'similar_id')[:limit]
+    )
+    books = Book.objects.select_related('author').in_bulk([row['similar_id'] for row in rows])
+    return [
+        BookSimilarity(similar=books[row['similar_id']], score=row['total'], rank=rank)
+        for rank, row in enumerate(rows) if row['similar_id'] in books
+    ]
@@ -0,0 +1,23 @@
+import orjson
+from django.utils.http import parse_header_parameters
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# tipos que orjson no conoce (Decimal, textos traducibles, querysets...): los mismos que el encoder de DRF
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Renderizador JSON con orjson; se activa con BOOKS_FAST_RENDERING (ver settings)."""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        options = orjson.OPT_NON_STR_KEYS
+        _, params = parse_header_parameters(accepted_media_type or '')
+        if params.get('indent'):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_encoder.default, option=options)
@@ -0,0 +1,97 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce
+
+from .identifiers import normalize_isbn
+from .models import Author, Book, BookIdentifier, IdentifierKind
+
+# Configuraciones de búsqueda creadas en la migración 0008 (español/inglés sin acentos si hay `unaccent`)
+SEARCH_CONFIGS = ('books_es', 'books_en')
+TRIGRAM_THRESHOLD = 0.3
+ISBN_QUERY_RE = re.compile(r'^[\d\s-]{9,17}[\dXx]$')
+
+_trigram_enabled = {}
+
+
+def is_postgres() -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def trigram_enabled() -> bool:
+    key = connection.settings_dict['NAME']
+    if key not in _trigram_enabled:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_enabled[key] = cursor.fetchone() is not None
+    return _trigram_enabled[key]
+
+
+def search_vector():
+    author_name = Coalesce(Subquery(Author.objects.filter(pk=OuterRef('author_id')).values('name')[:1]), Value(''))
+    vector = None
+    for config in SEARCH_CONFIGS:
+        part = (
+            SearchVector('title', config=config, weight='A')
+            + SearchVector(author_name, config=config, weight='B')
+        )
+        vector = part if vector is None else vector + part
+    return vector + SearchVector('description', config=SEARCH_CONFIGS[0], weight='D')
+
+
+def update_search_vectors(book_ids=None, author_ids=None):
+    """Recalcula `Book.search_vector` (solo en PostgreSQL) de los libros indicados."""
+    if not is_postgres():
+        return
+    queryset = Book.objects.all()
+    if book_ids is not None:
+        queryset = queryset.filter(pk__in=book_ids)
+    if author_ids is not None:
+        queryset = queryset.filter(author_id__in=author_ids)
+    queryset.update(search_vector=search_vector())
+
+
+def _isbn_candidates(q: str):
+    compact = re.sub(r'[\s-]', '', q).upper()
+    return {q, compact}
+
+
+def _isbn_filter(q: str):
+    condition = Q(isbn__in=_isbn_candidates(q))
+    isbn = normalize_isbn(q)
+    if isbn:
+        # cualquier edición registrada del libro, también si se buscó con su ISBN-10
+        condition |= Q(pk__in=BookIdentifier.objects.filter(kind=IdentifierKind.ISBN13, value=isbn).values('book'))
+    return condition
+
+
+def search_books(queryset, q: str):
+    """Filtra y ordena por relevancia (anotación `rank`) los libros que coinciden con `q`.
+
+    En PostgreSQL usa el índice GIN de `search_vector` y, si no hay coincidencias, similitud
+    de trigramas sobre el título. En otros motores (tests con SQLite) recurre a `icontains`.
+    """
+    q = q.strip()
+    if ISBN_QUERY_RE.match(q):
+        return queryset.filter(_isbn_filter(q)).annotate(rank=Value(1.0, output_field=FloatField()))
+
+    if not is_postgres():
+        return queryset.filter(
+            Q(title__icontains=q) | Q(author__name__icontains=q) | Q(isbn__icontains=q)
+        ).annotate(rank=Value(1.0, output_field=FloatField()))
+
+    query = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(q, config=config, search_type='websearch')
+        query = part if query is None else query | part
+    # float8 para que el valor del cursor de paginación se compare sin pérdida de precisión
+    matches = queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+    )
+    if matches.exists() or not trigram_enabled():
+        return matches
+    return queryset.annotate(
+        rank=Cast(TrigramSimilarity('title', q), FloatField())
+    ).filter(rank__gt=TRIGRAM_THRESHOLD)
@@ -1,35 +1,81 @@
+from django.db.models import Count
 from rest_framework import serializers
-from .models import Author, Book, Review, UserBook
+from .fragments import FragmentCacheMixin, FragmentListSerializer
+from .sparse import SparseFieldsMixin
+from .models import (
+    Author, Book, BookSimilarity, ImportItemStatus, ImportJob, ImportKind, ImportStatus, Review, TimelineEntry, UserBook,
+    UserReadingStats, author_name_key,
+)
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class ImageVariantsField(serializers.Field):
+    """URLs absolutas de las versiones pregeneradas de una imagen ({'S': url, 'M': url, 'L': url})."""
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        # el storage del campo del modelo: no obliga a cargar la columna si la consulta la ha diferido
+        storage = instance._meta.get_field(self.image_field).storage
+        request = self.context.get('request')
+        urls = {}
+        for key, name in (getattr(instance, f'{self.image_field}_variants') or {}).items():
+            url = storage.url(name)
+            urls[key] = request.build_absolute_uri(url) if request else url
+        return urls
+
+
+class AuthorSerializer(SparseFieldsMixin, FragmentCacheMixin, serializers.ModelSerializer):
+    photo_sizes = ImageVariantsField('photo')
+
     class Meta:
         model = Author
-        fields = ('id', 'name', 'biography', 'photo')
+        fields = ('id', 'name', 'biography', 'photo', 'photo_sizes')
+        list_serializer_class = FragmentListSerializer
 
+    def validate_name(self, value):
+        # al crear, AuthorListCreateView devuelve el autor existente; al renombrar no se puede duplicar
+        if self.instance is not None and Author.objects.filter(
+            name_key=author_name_key(value),
+        ).exclude(pk=self.instance.pk).exists():
+            raise serializers.ValidationError('Ya existe un autor con ese nombre')
+        return value
 
-class BookSerializer(serializers.ModelSerializer):
+
+class BookSerializer(SparseFieldsMixin, FragmentCacheMixin, serializers.ModelSerializer):
     author = AuthorSerializer(read_only=True)
+    cover_sizes = ImageVariantsField('cover')
     author_id = serializers.PrimaryKeyRelatedField(queryset=Author.objects.all(), source='author', write_only=True, required=False, allow_null=True)
 
     class Meta:
         model = Book
         fields = (
-            'id', 'title', 'author', 'author_id', 'isbn', 'cover',
-            'description', 'published_date', 'average_rating', 'created_at'
+            'id', 'title', 'author', 'author_id', 'isbn', 'cover', 'cover_sizes',
+            'description', 'published_date', 'average_rating', 'rating_count', 'created_at'
         )
+        read_only_fields = ('average_rating', 'rating_count')
+        list_serializer_class = FragmentListSerializer
+
+    def fragment_version(self, instance):
+        # el autor va anidado: su versión también cuenta
+        author = instance.author
+        return super().fragment_version(instance), author and author.updated_at.isoformat()
 
 
-class UserBookSerializer(serializers.ModelSerializer):
+class UserBookSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     book = BookSerializer(read_only=True)
     book_id = serializers.PrimaryKeyRelatedField(queryset=Book.objects.all(), source='book', write_only=True)
 
     class Meta:
         model = UserBook
         fields = ('id', 'book', 'book_id', 'is_read', 'rating', 'is_digital', 'owned', 'wishlist', 'notes', 'updated_at')
+        list_serializer_class = FragmentListSerializer
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     book = BookSerializer(read_only=True)
     book_id = serializers.PrimaryKeyRelatedField(queryset=Book.objects.all(), source='book', write_only=True)
@@ -37,3 +83,100 @@ class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ('id', 'user', 'book', 'book_id', 'rating', 'text', 'created_at')
+        list_serializer_class = FragmentListSerializer
+
+
+class ActorSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    username = serializers.CharField()
+    avatar = serializers.ImageField()
+
+
+class TimelineEntrySerializer(serializers.ModelSerializer):
+    # la actividad aplanada: el id es el de la actividad, no el de la copia en la cronología
+    id = serializers.IntegerField(source='activity_id')
+    verb = serializers.CharField(source='activity.verb')
+    actor = ActorSerializer(source='activity.actor')
+    book = BookSerializer(source='activity.book')
+    rating = serializers.IntegerField(source='activity.rating')
+    review = serializers.CharField(source='activity.review.text', default=None)
+
+    class Meta:
+        model = TimelineEntry
+        fields = ('id', 'verb', 'actor', 'book', 'rating', 'review', 'created_at')
+        read_only_fields = fields
+        list_serializer_class = FragmentListSerializer
+
+
+class SimilarBookSerializer(serializers.ModelSerializer):
+    # libro vecino (o recomendado) y su puntuación de similitud (books/recommendations.py)
+    book = BookSerializer(source='similar', read_only=True)
+
+    class Meta:
+        model = BookSimilarity
+        fields = ('book', 'score')
+        read_only_fields = fields
+        list_serializer_class = FragmentListSerializer
+
+
+class UserReadingStatsSerializer(serializers.ModelSerializer):
+    unread = serializers.SerializerMethodField()
+    average_rating = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
+    books_per_year = serializers.SerializerMethodField()
+    top_authors = serializers.SerializerMethodField()
+
+    # autores con más libros que se devuelven (el resumen guarda todos)
+    TOP_AUTHORS = 10
+
+    class Meta:
+        model = UserReadingStats
+        fields = (
+            'total', 'read', 'unread', 'owned', 'digital', 'wishlist', 'rated', 'average_rating',
+            'rating_histogram', 'books_per_year', 'top_authors', 'updated_at',
+        )
+        read_only_fields = fields
+
+    def get_unread(self, obj):
+        return obj.total - obj.read
+
+    def get_average_rating(self, obj):
+        return round(obj.rating_sum / obj.rated, 2) if obj.rated else None
+
+    def get_rating_histogram(self, obj):
+        return {str(rating): obj.rating_histogram.get(str(rating), 0) for rating in range(1, 11)}
+
+    def get_books_per_year(self, obj):
+        return dict(sorted(obj.books_per_year.items()))
+
+    def get_top_authors(self, obj):
+        counts = sorted(obj.books_per_author.items(), key=lambda item: -item[1])[:self.TOP_AUTHORS]
+        names = dict(Author.objects.filter(pk__in=[int(pk) for pk, _ in counts]).values_list('pk', 'name'))
+        return [{'id': int(pk), 'name': names.get(int(pk)), 'books': n} for pk, n in counts]
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    books = serializers.SerializerMethodField()
+    summary = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = (
+            'id', 'kind', 'isbn', 'title', 'offset', 'status', 'progress', 'total', 'processed',
+            'add_to_library', 'summary', 'book_ids', 'books', 'error', 'created_at', 'updated_at',
+        )
+        read_only_fields = fields
+
+    def get_summary(self, obj):
+        # importaciones masivas: número de filas por estado
+        if obj.kind != ImportKind.BULK:
+            return None
+        counts = dict(obj.items.order_by().values_list('status').annotate(n=Count('id')))
+        return {status: counts.get(status, 0) for status in ImportItemStatus.values}
+
+    def get_books(self, obj):
+        if obj.status != ImportStatus.DONE or not obj.book_ids:
+            return []
+        books = Book.objects.filter(pk__in=obj.book_ids).select_related('author').in_bulk()
+        ordered = [books[pk] for pk in obj.book_ids if pk in books]
+        return BookSerializer(ordered, many=True, context=self.context).data
@@ -1,11 +1,17 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from urllib.parse import quote
+
 import requests
-from datetime import datetime
-from django.core.files.base import ContentFile
-from django.utils.text import slugify
-import unicodedata
 
-from .models import Author, Book
+from .models import Author, Book, BookIdentifier, EnrichmentStatus, IdentifierKind, author_name_key, normalize_name
+from .queue import enqueue
+from .search import update_search_vectors
+from . import identifiers, images, lookup_cache, upstream
 
 # Constants for external APIs
 GOOGLE_BOOKS_API_URL = 'https://www.googleapis.com/books/v1/volumes'
@@ -14,54 +20,144 @@ OPEN_LIBRARY_AUTHORS_URL = 'https://openlibrary.org/search/authors.json'
 OPEN_LIBRARY_COVERS_URL = 'https://covers.openlibrary.org'
 WIKIPEDIA_API_URL = 'https://{lang}.wikipedia.org/api/rest_v1/page/summary/'
 WIKIPEDIA_OPENSEARCH_URL = 'https://{lang}.wikipedia.org/w/api.php'
+WIKIPEDIA_NOT_FOUND_TYPE = 'https://mediawiki.org/wiki/HyperSwitch/errors/not_found'
+
+# Máximo de peticiones externas simultáneas durante una importación
+IMPORT_MAX_WORKERS = 8
+
+# ISBN por consulta agrupada a Google Books (`isbn:A OR isbn:B ...`) y volúmenes pedidos en cada una
+ISBN_BATCH_SIZE = 10
+ISBN_BATCH_MAX_RESULTS = 40
+
+# Reintentos del enriquecimiento de autores (backoff exponencial)
+ENRICHMENT_RETRY_BASE = timedelta(hours=1)
+ENRICHMENT_RETRY_MAX = timedelta(days=30)
+ENRICHMENT_LEASE = timedelta(minutes=10)
+AUTHOR_ENRICHMENT_FIELDS = [
+    'biography', 'photo', 'photo_variants', 'enrichment_attempted_at', 'openlibrary_status',
+    'wikipedia_status', 'enrichment_failures', 'enrichment_next_retry_at', 'updated_at',
+]
 
 def import_single_by_query(query_isbn: str):
-    params = {'q': f'isbn:{query_isbn}', 'maxResults': 1, 'printType': 'books'}
-    resp = requests.get(GOOGLE_BOOKS_API_URL, params=params, timeout=10)
-    resp.raise_for_status()
-    payload = resp.json()
+    isbn = identifiers.normalize_isbn(query_isbn)
+    if isbn:
+        # libro ya registrado: sin ninguna llamada externa
+        known = identifiers.resolve([(IdentifierKind.ISBN13, isbn)])
+        if known:
+            return next(iter(known.values()))
+    payload = _google_books_search(isbn_search_params(isbn or query_isbn))
     items = payload.get('items') or []
     if not items:
         return None
-    return _create_or_get_from_volume(items[0])
+    books = _import_volumes(items[:1])
+    return books[0] if books else None
 
-def import_multiple_by_title(title: str, offset: int = 0):
+def import_multiple_by_title(title: str, offset: int = 0, progress=None):
     params = {'q': f'intitle:{title}', 'maxResults': 5, 'startIndex': offset, 'printType': 'books'}
-    resp = requests.get(GOOGLE_BOOKS_API_URL, params=params, timeout=10)
-    resp.raise_for_status()
-    payload = resp.json()
+    try:
+        payload = _google_books_search(params)
+    except upstream.UpstreamUnavailable as e:
+        # Google Books caído o sin cupo: se sirve lo que tenga Open Library
+        logging.warning(e)
+        payload = {}
     items = payload.get('items') or []
-    books = []
-    for volume in items:
-        book = _create_or_get_from_volume(volume)
-        if book:
-            books.append(book)
+    books = _import_volumes(items, progress=progress)
     if not books:
-        books = _import_from_openlibrary_by_title(title, offset=offset)
+        books = _import_from_openlibrary_by_title(title, offset=offset, progress=progress)
     return books
 
-def _import_from_openlibrary_by_title(title: str, offset: int = 0):
+def _google_books_search(params: dict) -> dict:
+    return lookup_cache.get_json(
+        'google_books', GOOGLE_BOOKS_API_URL, params=params,
+        is_negative=lambda data: not data.get('items'), raise_errors=True,
+    ) or {}
+
+def isbn_search_params(isbn: str) -> dict:
+    return {'q': f'isbn:{isbn}', 'maxResults': 1, 'printType': 'books'}
+
+def lookup_isbns(isbns) -> dict:
+    """Busca varios ISBN-13 con consultas agrupadas `isbn:A OR isbn:B` de hasta ISBN_BATCH_SIZE, en paralelo.
+
+    Devuelve {isbn: volumen} de los encontrados y deja cada uno en la caché de su consulta individual.
+    Los que no aparecen (o los de un lote que falla) se omiten: el llamante los busca uno a uno.
+    """
+    isbns = sorted(set(isbns))
+    batches = [isbns[start:start + ISBN_BATCH_SIZE] for start in range(0, len(isbns), ISBN_BATCH_SIZE)]
+    payloads = _run_concurrently({
+        index: (_google_books_search, ({
+            'q': ' OR '.join(f'isbn:{isbn}' for isbn in batch),
+            'maxResults': ISBN_BATCH_MAX_RESULTS,
+            'printType': 'books',
+        },))
+        for index, batch in enumerate(batches) if len(batch) > 1
+    })
+    found = {}
+    for index, batch in enumerate(batches):
+        if len(batch) == 1:
+            continue
+        wanted = set(batch)
+        for volume in (payloads.get(index) or {}).get('items') or []:
+            for kind, value in identifiers.volume_identifiers(volume):
+                if kind == IdentifierKind.ISBN13 and value in wanted and value not in found:
+                    found[value] = volume
+                    lookup_cache.store_json(
+                        'google_books', GOOGLE_BOOKS_API_URL, {'totalItems': 1, 'items': [volume]},
+                        params=isbn_search_params(value),
+                    )
+    return found
+
+def _run_concurrently(calls: dict, progress=None):
+    """Ejecuta las llamadas de red {clave: (func, args)} en paralelo y devuelve {clave: resultado}.
+
+    Las funciones no deben tocar la base de datos: las escrituras se hacen después en el hilo llamante.
+    """
+    results = {}
+    if not calls:
+        return results
+    with ThreadPoolExecutor(max_workers=min(len(calls), IMPORT_MAX_WORKERS)) as pool:
+        futures = {pool.submit(func, *args): key for key, (func, args) in calls.items()}
+        for done, future in enumerate(as_completed(futures), start=1):
+            key = futures[future]
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                logging.exception(e)
+                results[key] = None
+            if progress:
+                progress(done, len(futures))
+    return results
+
+def _import_from_openlibrary_by_title(title: str, offset: int = 0, progress=None):
     try:
-        res = requests.get(OPEN_LIBRARY_SEARCH_URL, params={'title': title, 'offset': offset}, timeout=10)
-        res.raise_for_status()
-        data = res.json()
-        docs = data.get('docs') or []
-        results = []
-        for doc in docs[:5]:
-            book_title = doc.get('title') or title
-            author_name = (doc.get('author_name') or [None])[0]
-            cover_id = doc.get('cover_i')
-            first_year = doc.get('first_publish_year')
+        data = lookup_cache.get_json(
+            'openlibrary_search', OPEN_LIBRARY_SEARCH_URL, params={'title': title, 'offset': offset},
+            is_negative=lambda d: not d.get('docs'), raise_errors=True,
+        ) or {}
+        docs = (data.get('docs') or [])[:5]
+        doc_identifiers = [identifiers.openlibrary_identifiers(doc) for doc in docs]
+        resolved = identifiers.resolve(i for ids in doc_identifiers for i in ids)
+        pending = [
+            index for index, ids in enumerate(doc_identifiers) if identifiers.first_match(ids, resolved) is None
+        ]
 
-            author_obj = None
-            if author_name:
-                author_obj, _ = Author.objects.get_or_create(name=author_name)
-                maybe_enrich_author_from_openlibrary(author_obj)
+        author_names = {(docs[index].get('author_name') or [None])[0] for index in pending} - {None}
+        authors = _existing_authors(author_names)
+        calls = _author_fetch_calls(author_names, authors)
+        for index in pending:
+            doc = docs[index]
+            cover_id = doc.get('cover_i')
+            if cover_id:
+                ol_cover_url = f'{OPEN_LIBRARY_COVERS_URL}/b/id/{cover_id}-L.jpg'
+                calls[('cover', index)] = (images.fetch_renditions, (ol_cover_url,))
+        fetched = _run_concurrently(calls, progress=progress)
 
+        def build(index):
+            doc = docs[index]
+            first_year = doc.get('first_publish_year')
             book = Book(
-                title=book_title,
-                author=author_obj,
-                isbn=None,
+                title=doc.get('title') or title,
+                author=authors.get((doc.get('author_name') or [None])[0]),
+                isbn=next((value for kind, value in doc_identifiers[index] if kind == IdentifierKind.ISBN13), None),
                 description=None,
             )
             if first_year:
@@ -69,190 +165,356 @@ def _import_from_openlibrary_by_title(title: str, offset: int = 0):
                     book.published_date = datetime.strptime(str(first_year), '%Y').date()
                 except ValueError:
                     pass
-            book.save()
-            if cover_id:
-                ol_cover_url = f'{OPEN_LIBRARY_COVERS_URL}/b/id/{cover_id}-L.jpg'
-                _download_and_attach_image(
-                    instance=book,
-                    field_name='cover',
-                    url=ol_cover_url,
-                    filename_hint=f"{slugify(book.title)}-{book.id}.jpg"
-                )
-            results.append(book)
-        return results
+            renditions = fetched.get(('cover', index))
+            if renditions:
+                images.attach(book, 'cover', renditions)
+            return book
+
+        with transaction.atomic():
+            authors = _save_authors(author_names, authors, fetched)
+            return _resolve_or_create_books(
+                [(ids, index) for index, ids in enumerate(doc_identifiers)], resolved, build,
+            )
     except Exception as e:
         logging.exception(e)
         return []
 
-def _create_or_get_from_volume(volume):
+def _parse_volume(volume):
     info = volume.get('volumeInfo', {})
-    isbn = None
-    for ident in info.get('industryIdentifiers', []) or []:
-        if ident.get('type') in ('ISBN_13', 'ISBN_10'):
-            isbn = ident.get('identifier')
-            break
-    if isbn:
-        existing = Book.objects.filter(isbn=isbn).first()
-        if existing:
-            return existing
-
-    author_obj = None
+    ids = identifiers.volume_identifiers(volume)
+    isbn = next((value for kind, value in ids if kind == IdentifierKind.ISBN13), None)
+    if isbn is None:
+        # ISBN que no supera la validación: se conserva tal cual, sin identificador canónico
+        isbn = next((ident.get('identifier') for ident in info.get('industryIdentifiers', []) or []
+                     if ident.get('type') in ('ISBN_13', 'ISBN_10')), None)
     authors_list = info.get('authors') or []
-    if authors_list:
-        author_name = authors_list[0]
-        author_obj, _ = Author.objects.get_or_create(name=author_name)
-        maybe_enrich_author_from_openlibrary(author_obj)
-
-    book = Book(
-        title=info.get('title') or 'Desconocido',
-        author=author_obj,
-        isbn=isbn,
-        description=info.get('description')
-    )
+    published_date = None
     published = info.get('publishedDate')
     if published:
         for fmt in ('%Y-%m-%d', '%Y-%m', '%Y'):
             try:
-                dt = datetime.strptime(published, fmt)
-                book.published_date = dt.date()
+                published_date = datetime.strptime(published, fmt).date()
                 break
             except ValueError:
                 continue
-    book.save()
-    _attach_best_cover(book=book, info=info, isbn=isbn)
-    return book
+    return {
+        'info': info,
+        'isbn': isbn,
+        'identifiers': ids,
+        'title': info.get('title') or 'Desconocido',
+        'author_name': authors_list[0] if authors_list else None,
+        'description': info.get('description'),
+        'published_date': published_date,
+    }
 
-def _download_and_attach_image(instance, field_name: str, url: str, filename_hint: str):
-    try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        content = r.content
-    except Exception as e:
-        logging.exception(e)
+def _import_volumes(volumes, progress=None):
+    """Importa volúmenes de Google Books: primero todas las consultas externas en paralelo,
+    después todas las escrituras en una única transacción."""
+    parsed = [_parse_volume(volume) for volume in volumes]
+    # libros ya registrados (por ISBN-13 o id de volumen) en una sola consulta, antes de descargar nada
+    resolved = identifiers.resolve(i for p in parsed for i in p['identifiers'])
 
-def maybe_enrich_author_from_openlibrary(author: Author):
-    if author.biography and author.photo:
-        return
-    try:
-        rs = requests.get(OPEN_LIBRARY_AUTHORS_URL, params={'q': author.name}, timeout=10)
-        rs.raise_for_status()
-        data = rs.json()
-        docs = data.get('docs') or []
-        if not docs:
-            return
-        def _norm(s: str) -> str:
-            return ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn').casefold().strip()
-        target = _norm(author.name)
-        best = None
-        for d in docs:
-            nm = d.get('name') or d.get('alternate_names', [None])[0]
-            if not nm:
-                continue
-            if _norm(nm) == target:
-                best = d
-                break
-        if not best:
-            best = docs[0]
-        olid = best.get('key')
-
-        if olid:
-            detail_url = f'https://openlibrary.org/authors/{olid.split("/")[-1]}.json'
-            rd = requests.get(detail_url, timeout=10)
-            if rd.ok:
-                detail = rd.json()
-                bio = detail.get('bio')
-                if isinstance(bio, dict):
-                    bio = bio.get('value')
-                if bio and not author.biography:
-                    author.biography = bio
-
-        photo_id = None
-        photos = best.get('photos') or []
-        if photos:
-            photo_id = photos[0]
-        if photo_id and not author.photo:
-            photo_url = f'{OPEN_LIBRARY_COVERS_URL}/a/id/{photo_id}-L.jpg'
-            _download_and_attach_image(
-                instance=author,
-                field_name='photo',
-                url=photo_url,
-                filename_hint=f"{slugify(author.name)}.jpg"
-            )
-        author.save()
-    except Exception as e:
-        logging.exception(e)
-    if not author.biography or not author.photo:
-        maybe_enrich_author_from_wikipedia(author)
+    pending = [
+        (index, p) for index, p in enumerate(parsed) if identifiers.first_match(p['identifiers'], resolved) is None
+    ]
+    author_names = {p['author_name'] for _, p in pending} - {None}
+    authors = _existing_authors(author_names)
+    calls = _author_fetch_calls(author_names, authors)
+    for index, p in pending:
+        calls[('cover', index)] = (_fetch_best_cover, (p['info'], p['isbn']))
+    fetched = _run_concurrently(calls, progress=progress)
 
-def maybe_enrich_author_from_wikipedia(author: Author):
-    try:
-        name = author.name
-        data = None
-        for lang in ('es', 'en'):
-            url = WIKIPEDIA_API_URL.format(lang=lang) + requests.utils.quote(name)
-            r = requests.get(url, timeout=8, headers={'Accept': 'application/json'})
-            if r.ok:
-                data = r.json()
-                if data.get('type') != 'https://mediawiki.org/wiki/HyperSwitch/errors/not_found':
-                    break
-                else:
-                    data = None
-            if data is None:
-                sr_url = WIKIPEDIA_OPENSEARCH_URL.format(lang=lang)
-                sr = requests.get(sr_url, params={'action': 'opensearch', 'search': name, 'limit': 1, 'namespace': 0, 'format': 'json'}, timeout=8)
-                if sr.ok:
-                    sdata = sr.json()
-                    titles = sdata[1] if isinstance(sdata, list) and len(sdata) > 1 else []
-                    if titles:
-                        title = titles[0]
-                        rr_url = WIKIPEDIA_API_URL.format(lang=lang) + requests.utils.quote(title)
-                        rr = requests.get(rr_url, timeout=8, headers={'Accept': 'application/json'})
-                        if rr.ok:
-                            data = rr.json()
-                            break
-        if not data:
-            return
-        extract = data.get('extract')
-        if extract and not author.biography:
-            author.biography = extract[:5000]
-        thumb = data.get('thumbnail') or {}
-        thumb_url = thumb.get('source')
-        if thumb_url and not author.photo:
-            _download_and_attach_image(
-                instance=author,
-                field_name='photo',
-                url=thumb_url,
-                filename_hint=f"{slugify(author.name)}.jpg"
-            )
-        author.save()
-    except Exception as e:
-        logging.exception(e)
+    def build(index):
+        p = parsed[index]
+        book = Book(
+            title=p['title'],
+            author=authors.get(p['author_name']),
+            isbn=p['isbn'],
+            description=p['description'],
+            published_date=p['published_date'],
+        )
+        renditions = fetched.get(('cover', index))
+        if renditions:
+            images.attach(book, 'cover', renditions)
+        return book
+
+    with transaction.atomic():
+        authors = _save_authors(author_names, authors, fetched)
+        return _resolve_or_create_books(
+            [(p['identifiers'], index) for index, p in enumerate(parsed)], resolved, build,
+        )
+
+def _resolve_or_create_books(entries, resolved: dict, build) -> list:
+    """Para cada entrada (identificadores, datos) devuelve el libro ya registrado o uno nuevo
+    construido con `build(datos)`; los nuevos se insertan juntos con `upsert_books`."""
+    pending = {}
+    chosen = []
+    for ids, data in entries:
+        book = identifiers.first_match(ids, resolved)
+        if book is None:
+            book = build(data)
+            resolved.update((identifier, book) for identifier in ids)
+            pending[id(book)] = (book, list(ids))
+        elif book.pk is None:
+            # repetido dentro del mismo lote: se suman sus identificadores al libro pendiente
+            known = pending[id(book)][1]
+            known.extend(identifier for identifier in ids if identifier not in known)
+        else:
+            # otra edición o volumen de un libro ya registrado
+            identifiers.attach([(book, ids)])
+        chosen.append(book)
+    saved = dict(zip(pending, upsert_books(pending.values())))
+    return [saved.get(id(book), book) for book in chosen]
+
+def _existing_authors(names):
+    keys = {name: author_name_key(name) for name in names}
+    by_key = {author.name_key: author for author in Author.objects.filter(name_key__in=set(keys.values()))}
+    return {name: by_key[key] for name, key in keys.items() if key in by_key}
+
+def upsert_authors(names) -> dict:
+    """Devuelve {nombre: Author} creando los que falten con INSERT ... ON CONFLICT DO NOTHING sobre `name_key`.
+
+    Si otro proceso inserta el mismo autor a la vez, gana uno y ambos leen esa fila: sin duplicados
+    y sin bloquear filas existentes.
+    """
+    authors = _existing_authors(names)
+    missing = {author_name_key(name): name for name in names if name not in authors}
+    missing.pop('', None)
+    if missing:
+        # en orden de clave para que dos inserciones concurrentes no se bloqueen mutuamente
+        Author.objects.bulk_create(
+            [Author(name=name[:200], name_key=key) for key, name in sorted(missing.items())],
+            ignore_conflicts=True,
+        )
+        authors.update(_existing_authors(set(names) - authors.keys()))
+    return authors
+
+def upsert_books(candidates) -> list:
+    """Inserta los libros nuevos [(Book, identificadores), ...] y devuelve los libros resultantes.
+
+    Los identificadores se registran con ON CONFLICT DO NOTHING sobre la restricción única; si otro
+    proceso registró antes alguno de ellos, el libro recién insertado se descarta en favor del suyo.
+    """
+    candidates = list(candidates)
+    if not candidates:
+        return []
+    Book.objects.bulk_create([book for book, _ in candidates])
+    rows = sorted(
+        ((kind, value, book) for book, ids in candidates for kind, value in ids),
+        key=lambda row: (row[0], row[1]),
+    )
+    BookIdentifier.objects.bulk_create(
+        [BookIdentifier(book=book, kind=kind, value=value) for kind, value, book in rows], ignore_conflicts=True,
+    )
+    owners = identifiers.resolve((kind, value) for kind, value, _ in rows)
+
+    books, discarded, reassigned = [], [], []
+    for book, ids in candidates:
+        winner = next((owners[i] for i in ids if i in owners and owners[i].pk != book.pk), None)
+        if winner is None:
+            books.append(book)
+        else:
+            discarded.append(book.pk)
+            reassigned.append((winner, ids))
+            books.append(winner)
+    if discarded:
+        Book.objects.filter(pk__in=discarded).delete()
+        identifiers.attach(reassigned)
+    update_search_vectors(book_ids=[book.pk for book in books if book.pk not in discarded])
+    return books
+
+def _author_fetch_calls(names, authors):
+    calls = {}
+    for name in names:
+        author = authors.get(name)
+        if author is not None and not author_enrichment_due(author):
+            continue
+        need_bio = not (author and author.biography)
+        need_photo = not (author and author.photo)
+        calls[('author', name)] = (_fetch_author_details, (name, need_bio, need_photo))
+    return calls
+
+def _save_authors(names, authors, fetched):
+    authors.update(upsert_authors(set(names) - authors.keys()))
+    for name in names:
+        details = fetched.get(('author', name))
+        if name in authors and details is not None:
+            _apply_author_details(authors[name], details)
+    return authors
+
+def _fetch_openlibrary_author(name: str) -> dict:
+    data = lookup_cache.get_json(
+        'openlibrary_authors', OPEN_LIBRARY_AUTHORS_URL, params={'q': name},
+        is_negative=lambda d: not d.get('docs'), raise_errors=True,
+    ) or {}
+    docs = data.get('docs') or []
+    if not docs:
+        return {}
+    target = normalize_name(name)
+    best = None
+    for d in docs:
+        nm = d.get('name') or d.get('alternate_names', [None])[0]
+        if not nm:
+            continue
+        if normalize_name(nm) == target:
+            best = d
+            break
+    if not best:
+        best = docs[0]
+
+    result = {}
+    olid = best.get('key')
+    if olid:
+        detail_url = f'https://openlibrary.org/authors/{olid.split("/")[-1]}.json'
+        detail = lookup_cache.get_json('openlibrary_authors', detail_url)
+        if detail:
+            bio = detail.get('bio')
+            if isinstance(bio, dict):
+                bio = bio.get('value')
+            if bio:
+                result['biography'] = bio
+
+    photos = best.get('photos') or []
+    if photos:
+        result['photo_url'] = f'{OPEN_LIBRARY_COVERS_URL}/a/id/{photos[0]}-L.jpg'
+    return result
+
+def _wikipedia_missing(data) -> bool:
+    return data.get('type') == WIKIPEDIA_NOT_FOUND_TYPE
+
+def _fetch_wikipedia_author(name: str) -> dict:
+    data = None
+    failure = None
+    for lang in ('es', 'en'):
+        try:
+            data = _fetch_wikipedia_summary(name, lang)
+        except requests.RequestException as e:
+            # cada idioma es un proveedor distinto: si uno falla o está caído se prueba el siguiente
+            failure, data = e, None
+            continue
+        if data:
+            break
+    if not data:
+        if failure is not None:
+            raise failure
+        return {}
+    result = {}
+    extract = data.get('extract')
+    if extract:
+        result['biography'] = extract[:5000]
+    thumb_url = (data.get('thumbnail') or {}).get('source')
+    if thumb_url:
+        result['photo_url'] = thumb_url
+    return result
+
+def _fetch_wikipedia_summary(name: str, lang: str):
+    """Resumen de la página del autor en la Wikipedia de `lang` (o de la primera sugerencia de su buscador).
+
+    Los errores se propagan para distinguir "no existe" (None) de "no se ha podido consultar".
+    """
+    url = WIKIPEDIA_API_URL.format(lang=lang) + quote(name)
+    data = lookup_cache.get_json(
+        'wikipedia', url, headers={'Accept': 'application/json'}, is_negative=_wikipedia_missing, raise_errors=True,
+    )
+    if data and not _wikipedia_missing(data):
+        return data
+    sr_url = WIKIPEDIA_OPENSEARCH_URL.format(lang=lang)
+    sdata = lookup_cache.get_json(
+        'wikipedia', sr_url, params={'action': 'opensearch', 'search': name, 'limit': 1, 'namespace': 0, 'format': 'json'},
+        is_negative=lambda d: not (isinstance(d, list) and len(d) > 1 and d[1]), raise_errors=True,
+    )
+    titles = sdata[1] if isinstance(sdata, list) and len(sdata) > 1 else []
+    if not titles:
+        return None
+    rr_url = WIKIPEDIA_API_URL.format(lang=lang) + quote(titles[0])
+    return lookup_cache.get_json(
+        'wikipedia', rr_url, headers={'Accept': 'application/json'}, is_negative=_wikipedia_missing, raise_errors=True,
+    )
+
+def _fetch_author_details(name: str, need_bio: bool = True, need_photo: bool = True) -> dict:
+    """Reúne biografía y foto (ya descargada) de Open Library y, si falta algo, de Wikipedia.
+
+    En `outcomes` se devuelve el resultado de cada fuente consultada.
+    """
+    details = {'outcomes': {}}
+    sources = (('openlibrary', _fetch_openlibrary_author), ('wikipedia', _fetch_wikipedia_author))
+    for source_name, source in sources:
+        try:
+            found = source(name)
+        except Exception as e:
+            logging.exception(e)
+            details['outcomes'][source_name] = EnrichmentStatus.ERROR
+            continue
+        details['outcomes'][source_name] = EnrichmentStatus.FOUND if found else EnrichmentStatus.NOT_FOUND
+        if need_bio and found.get('biography') and 'biography' not in details:
+            details['biography'] = found['biography']
+        if need_photo and found.get('photo_url') and 'photo' not in details:
+            renditions = images.fetch_renditions(found['photo_url'])
+            if renditions:
+                details['photo'] = renditions
+        if (not need_bio or 'biography' in details) and (not need_photo or 'photo' in details):
+            break
+    return details
+
+def _apply_author_details(author: Author, details: dict):
+    if details.get('biography') and not author.biography:
+        author.biography = details['biography']
+    if details.get('photo') and not author.photo:
+        images.attach(author, 'photo', details['photo'])
+    _record_enrichment(author, details.get('outcomes') or {})
+    author.save(update_fields=AUTHOR_ENRICHMENT_FIELDS)
 
-def _attach_best_cover(book: Book, info: dict, isbn: str | None):
+def _record_enrichment(author: Author, outcomes: dict):
+    now = timezone.now()
+    author.enrichment_attempted_at = now
+    if 'openlibrary' in outcomes:
+        author.openlibrary_status = outcomes['openlibrary']
+    if 'wikipedia' in outcomes:
+        author.wikipedia_status = outcomes['wikipedia']
+    if author.needs_enrichment:
+        # backoff exponencial: 1h, 2h, 4h... hasta un máximo de 30 días
+        author.enrichment_failures = min(author.enrichment_failures + 1, 32)
+        delay = min(ENRICHMENT_RETRY_BASE * 2 ** (author.enrichment_failures - 1), ENRICHMENT_RETRY_MAX)
+        author.enrichment_next_retry_at = now + delay
+    else:
+        author.enrichment_failures = 0
+        author.enrichment_next_retry_at = None
+
+def author_enrichment_due(author: Author) -> bool:
+    if not author.needs_enrichment:
+        return False
+    return author.enrichment_next_retry_at is None or author.enrichment_next_retry_at <= timezone.now()
+
+def schedule_author_enrichment(author: Author) -> bool:
+    """Encola el enriquecimiento del autor si le toca; devuelve True si se ha encolado."""
+    if not author_enrichment_due(author):
+        return False
+    now = timezone.now()
+    # reservamos el intento para que lecturas concurrentes no encolen la misma tarea
+    claimed = Author.objects.filter(pk=author.pk).filter(
+        Q(enrichment_next_retry_at__isnull=True) | Q(enrichment_next_retry_at__lte=now)
+    ).update(enrichment_next_retry_at=now + ENRICHMENT_LEASE)
+    if not claimed:
+        return False
+    enqueue('enrich_author', author_id=author.pk)
+    return True
+
+def enrich_author(author: Author):
+    details = _fetch_author_details(author.name, need_bio=not author.biography, need_photo=not author.photo)
+    _apply_author_details(author, details)
+
+def _fetch_best_cover(info: dict, isbn: str | None):
+    """Devuelve las versiones de la mejor portada disponible o None.
+
+    Con `default=false` Open Library responde 404 si no hay portada, así que basta un GET.
+    """
     if isbn:
-        for size in ('-XL', '-L', '-M', '-S'):
-            ol_url = f'{OPEN_LIBRARY_COVERS_URL}/b/isbn/{isbn}{size}.jpg'
-            try:
-                head = requests.head(ol_url, timeout=5)
-                if head.ok and head.headers.get('Content-Type', '').startswith('image/'):
-                    _download_and_attach_image(
-                        instance=book,
-                        field_name='cover',
-                        url=ol_url,
-                        filename_hint=f"{slugify(book.title)}-{book.id}{size}.jpg"
-                    )
-                    return
-            except Exception as e:
-                logging.exception(e)
-                continue
+        renditions = images.fetch_renditions(f'{OPEN_LIBRARY_COVERS_URL}/b/isbn/{isbn}-L.jpg?default=false')
+        if renditions:
+            return renditions
     image_links = info.get('imageLinks') or {}
     for key in ('extraLarge', 'large', 'medium', 'small', 'thumbnail', 'smallThumbnail'):
         url = image_links.get(key)
         if url:
-            _download_and_attach_image(
-                instance=book,
-                field_name='cover',
-                url=url,
-                filename_hint=f"{slugify(book.title)}-{book.id}.jpg"
-            )
-            return
+            return images.fetch_renditions(url)
+    return None
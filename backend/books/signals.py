@@ -0,0 +1,151 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import activity, fragments, reading_stats
+from .models import ActivityVerb, Author, Book, IdentifierKind, Review, UserBook
+from .queue import enqueue
+from .identifiers import attach, normalize_isbn
+from .ratings import rating_changed
+from .search import update_search_vectors
+
+# campos que forman parte del vector de búsqueda
+BOOK_SEARCH_FIELDS = {'title', 'author', 'description'}
+
+
+@receiver(post_save, sender=Book)
+def refresh_book_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not BOOK_SEARCH_FIELDS.intersection(update_fields):
+        return
+    update_search_vectors(book_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Book)
+def register_book_isbn(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'isbn' not in update_fields:
+        return
+    isbn = normalize_isbn(instance.isbn)
+    if isbn:
+        attach([(instance, [(IdentifierKind.ISBN13, isbn)])])
+
+
+@receiver(post_save, sender=Author)
+def refresh_author_books_search_vector(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    update_search_vectors(author_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book_fragments(sender, instance, **kwargs):
+    fragments.invalidate(Book, [instance.pk])
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_author_fragments(sender, instance, **kwargs):
+    # el autor va anidado en los fragmentos de sus libros
+    fragments.invalidate(Author, [instance.pk])
+    fragments.invalidate(Book, Book.objects.filter(author=instance.pk).values_list('pk', flat=True))
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, **kwargs):
+    previous = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values_list('book_id', 'rating').first()
+    instance._previous_rating = previous
+
+
+@receiver(pre_save, sender=UserBook)
+def remember_previous_entry(sender, instance, **kwargs):
+    # una sola consulta para la nota del libro y el resumen de la biblioteca
+    row = reading_stats.stored_entry(instance.pk) if instance.pk else None
+    instance._previous_rating = (row['book_id'], row['rating']) if row else None
+    instance._previous_entry = reading_stats.stored_state(row)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=UserBook)
+def update_book_rating_on_save(sender, instance, **kwargs):
+    rating_changed(getattr(instance, '_previous_rating', None), (instance.book_id, instance.rating))
+    instance._previous_rating = (instance.book_id, instance.rating)
+
+
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=UserBook)
+def update_book_rating_on_delete(sender, instance, **kwargs):
+    rating_changed((instance.book_id, instance.rating), None)
+
+
+@receiver(post_save, sender=UserBook)
+def library_entry_saved(sender, instance, **kwargs):
+    # resumen de la biblioteca y actividad para los seguidores, a partir del mismo estado anterior
+    previous = getattr(instance, '_previous_entry', None)
+    state = reading_stats.entry_state(instance)
+    reading_stats.entries_changed(instance.user_id, [previous], [state])
+    verb = activity.library_entry_verb(previous, state)
+    if verb:
+        activity.record(instance.user_id, verb, instance.book_id, rating=instance.rating)
+    instance._previous_entry = state
+
+
+def _deleting_user(origin):
+    # al borrar el usuario se borra también su resumen: no hay nada que descontar
+    User = get_user_model()
+    return isinstance(origin, User) or getattr(origin, 'model', None) is User
+
+
+@receiver(pre_delete, sender=UserBook)
+def remember_deleted_entry(sender, instance, origin=None, **kwargs):
+    if not _deleting_user(origin):
+        instance._deleted_entry = reading_stats.entry_state(instance)
+
+
+@receiver(post_delete, sender=UserBook)
+def update_reading_stats_on_delete(sender, instance, **kwargs):
+    state = getattr(instance, '_deleted_entry', None)
+    if state is not None:
+        reading_stats.entries_changed(instance.user_id, removed=[state])
+
+
+@receiver(post_save, sender=Review)
+def review_activity(sender, instance, created, **kwargs):
+    if created:
+        activity.record(instance.user_id, ActivityVerb.REVIEWED, instance.book_id, review=instance, rating=instance.rating)
+
+
+@receiver(m2m_changed, sender=get_user_model().following.through)
+def following_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        related = instance.followers if reverse else instance.following
+        instance._feed_cleared_ids = set(related.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_feed_cleared_ids', set())
+    elif action not in ('post_add', 'post_remove'):
+        return
+    if not pk_set:
+        return
+    added = action == 'post_add'
+    if not reverse:
+        enqueue('follow_changed', follower_id=instance.pk, followed_ids=sorted(pk_set), added=added)
+    else:
+        # user.followers.add(...): `instance` es el seguido
+        for follower_id in sorted(pk_set):
+            enqueue('follow_changed', follower_id=follower_id, followed_ids=[instance.pk], added=added)
+
+
+@receiver(pre_save, sender=get_user_model())
+def remember_previous_privacy(sender, instance, update_fields=None, **kwargs):
+    instance._previous_privacy = None
+    if instance.pk and (update_fields is None or 'privacy_level' in update_fields):
+        instance._previous_privacy = sender.objects.filter(pk=instance.pk).values_list('privacy_level', flat=True).first()
+
+
+@receiver(post_save, sender=get_user_model())
+def privacy_level_changed(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_privacy', None)
+    if not created and previous is not None and previous != instance.privacy_level:
+        enqueue('privacy_changed', user_id=instance.pk)
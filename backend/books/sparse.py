@@ -0,0 +1,148 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _split(value: str) -> list[str]:
+    return [part.strip() for part in (value or '').split(',') if part.strip()]
+
+
+def requested(context) -> dict | None:
+    """Campos pedidos en la petición: {'fields': {ruta: {campos}}, 'expand': {rutas} o None}, o None sin parámetros.
+
+    `fields=id,title,book.title,book.author.name` elige campos (también anidados, separados por puntos);
+    `expand=book,book.author` indica qué objetos anidados se incluyen: los demás se sustituyen por su id.
+    """
+    if '_sparse' in context:
+        return context['_sparse']
+    request = context.get('request')
+    spec = None
+    if request is not None and request.method in SAFE_METHODS:
+        params = getattr(request, 'query_params', request.GET)
+        fields, expand = _split(params.get(FIELDS_PARAM)), params.get(EXPAND_PARAM)
+        if fields or expand is not None:
+            spec = {'fields': {}, 'expand': None}
+            expanded = set()
+            for item in fields:
+                parts = item.split('.')
+                for depth in range(len(parts)):
+                    spec['fields'].setdefault('.'.join(parts[:depth]), set()).add(parts[depth])
+                # pedir un campo de un objeto anidado lo expande
+                expanded.update('.'.join(parts[:depth]) for depth in range(1, len(parts)))
+            if expand is not None:
+                # `expand=` vacío: ningún objeto anidado, solo sus ids
+                for item in _split(expand):
+                    parts = item.split('.')
+                    expanded.update('.'.join(parts[:depth]) for depth in range(1, len(parts) + 1))
+                spec['expand'] = expanded
+    context['_sparse'] = spec
+    return spec
+
+
+def _path(serializer) -> str:
+    names = []
+    node = serializer
+    while node is not None:
+        if node.field_name:
+            names.append(node.field_name)
+        node = node.parent
+    return '.'.join(reversed(names))
+
+
+class SparseFieldsMixin:
+    """Serializador que respeta `fields=` y `expand=` (ver `requested`), también cuando va anidado."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        spec = requested(self.context)
+        if spec is None:
+            return fields
+        path = _path(self)
+        names = spec['fields'].get(path)
+        if names is not None:
+            fields = {name: field for name, field in fields.items() if name in names or field.write_only}
+        if spec['expand'] is not None:
+            for name, field in fields.items():
+                child = f'{path}.{name}' if path else name
+                if isinstance(field, serializers.BaseSerializer) and not field.write_only and child not in spec['expand']:
+                    fields[name] = serializers.PrimaryKeyRelatedField(
+                        read_only=True, source=field.source, many=isinstance(field, serializers.ListSerializer),
+                    )
+        return fields
+
+
+def _plan(serializer, prefix=''):
+    """Columnas (para only()) y relaciones (para select_related()) que necesita el serializador, o None."""
+    columns = {prefix + serializer.Meta.model._meta.pk.name}
+    relations = set()
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        image_field = getattr(field, 'image_field', None)
+        if image_field:
+            columns.add(f'{prefix}{image_field}_variants')
+            continue
+        if isinstance(field, serializers.ListSerializer) or isinstance(field, ManyRelatedField):
+            return None
+        if isinstance(field, serializers.ModelSerializer):
+            relations.add(prefix + field.source)
+            columns.add(prefix + field.source)
+            nested = _plan(field, f'{prefix}{field.source}__')
+            if nested is None:
+                return None
+            columns |= nested[0]
+            relations |= nested[1]
+            continue
+        if field.source == '*' or isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)):
+            return None
+        source = prefix + field.source.replace('.', '__')
+        if isinstance(field, serializers.RelatedField) and not isinstance(field, serializers.PrimaryKeyRelatedField):
+            # p. ej. StringRelatedField: necesita el objeto relacionado completo
+            relations.add(source)
+        columns.add(source)
+    return columns, relations
+
+
+def _is_field(model, path: str) -> bool:
+    for name in path.split('__'):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        model = field.related_model
+    return True
+
+
+def restrict_queryset(queryset, serializer, extra=()):
+    """Limita la consulta a las columnas y relaciones que va a leer el serializador."""
+    plan = _plan(serializer)
+    if plan is None:
+        return queryset
+    columns, relations = plan
+    for name in extra:
+        relation = name.rpartition('__')[0]
+        if (not relation or relation in relations) and _is_field(queryset.model, name):
+            columns.add(name)
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only(*columns)
+
+
+class SparseQuerysetMixin:
+    """Vistas con `fields=`/`expand=`: la consulta solo trae lo que se va a serializar.
+
+    `sparse_extra_fields` son columnas que la vista lee aunque no se serialicen (p. ej. `updated_at` del ETag).
+    """
+    sparse_extra_fields = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if requested(self.get_serializer_context()) is None:
+            return queryset
+        keyset = [field.lstrip('-') for field in getattr(self, 'keyset_ordering', ())]
+        return restrict_queryset(queryset, self.get_serializer(), [*self.sparse_extra_fields, *keyset])
@@ -0,0 +1,101 @@
+import logging
+
+from django.contrib.auth import get_user_model
+
+from .models import Activity, Author, ImportJob, ImportStatus
+from .queue import task
+from . import activity, bulk_import, services, upstream
+
+
+@task('import_books')
+def run_import_job(job_id: str):
+    job = ImportJob.objects.filter(pk=job_id).first()
+    if job is None or job.status != ImportStatus.PENDING:
+        return
+    job.status = ImportStatus.RUNNING
+    job.save(update_fields=['status', 'updated_at'])
+
+    def report(done, total):
+        # dejamos el último tramo para la persistencia del resultado
+        job.progress = min(99, int(done * 100 / max(total, 1)))
+        job.save(update_fields=['progress', 'updated_at'])
+
+    try:
+        if job.isbn:
+            book = services.import_single_by_query(query_isbn=job.isbn)
+            books = [book] if book else []
+        else:
+            books = services.import_multiple_by_title(job.title, offset=job.offset, progress=report)
+    except upstream.UpstreamUnavailable as exc:
+        logging.warning(exc)
+        job.status = ImportStatus.FAILED
+        job.error = 'El servicio de búsqueda de libros no está disponible ahora mismo. Inténtalo más tarde.'
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        return
+    except Exception as exc:
+        logging.exception(exc)
+        job.status = ImportStatus.FAILED
+        job.error = 'Ocurrió un error al importar el libro.'
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        return
+
+    job.book_ids = [book.id for book in books]
+    job.progress = 100
+    if books:
+        job.status = ImportStatus.DONE
+    else:
+        job.status = ImportStatus.FAILED
+        job.error = 'No se encontraron resultados'
+    job.save(update_fields=['book_ids', 'progress', 'status', 'error', 'updated_at'])
+
+
+@task('bulk_import_books')
+def run_bulk_import_job(job_id: str):
+    job = ImportJob.objects.filter(pk=job_id).first()
+    # RUNNING también: una importación interrumpida se retoma desde sus filas pendientes
+    if job is None or job.status not in (ImportStatus.PENDING, ImportStatus.RUNNING):
+        return
+    try:
+        bulk_import.run_job(job)
+    except Exception as exc:
+        logging.exception(exc)
+        job.status = ImportStatus.FAILED
+        job.error = 'Ocurrió un error durante la importación.'
+        job.save(update_fields=['status', 'error', 'updated_at'])
+
+
+@task('enrich_author')
+def run_author_enrichment(author_id: int):
+    author = Author.objects.filter(pk=author_id).first()
+    if author is None or not author.needs_enrichment:
+        return
+    services.enrich_author(author)
+
+
+@task('fan_out_activity')
+def run_activity_fan_out(activity_id: int):
+    instance = Activity.objects.select_related('actor').filter(pk=activity_id).first()
+    if instance is not None:
+        activity.fan_out(instance)
+
+
+@task('fan_out_activities')
+def run_activities_fan_out(actor_id: int, activity_ids: list):
+    actor = get_user_model().objects.filter(pk=actor_id).first()
+    activities = list(Activity.objects.filter(pk__in=activity_ids, actor_id=actor_id).order_by('pk'))
+    if actor is not None and activities:
+        activity.fan_out_many(actor, activities)
+
+
+@task('follow_changed')
+def run_follow_changed(follower_id: int, followed_ids: list, added: bool):
+    follower = get_user_model().objects.filter(pk=follower_id).first()
+    if follower is not None:
+        activity.follow_changed(follower, followed_ids, added)
+
+
+@task('privacy_changed')
+def run_privacy_changed(user_id: int):
+    user = get_user_model().objects.filter(pk=user_id).first()
+    if user is not None:
+        activity.privacy_changed(user)
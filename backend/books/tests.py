@@ -0,0 +1,1331 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import requests
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from mybookconnect.storage import ContentAddressedStorage, get_image_storage
+
+from . import bulk_import, fragments, identifiers, images, lookup_cache, queue, reading_stats, recommendations, services, upstream
+from .models import (
+    Activity, ActivityVerb, Author, Book, BookSimilarity, EnrichmentStatus, IdentifierKind, ImportStatus, Review,
+    TimelineEntry, UserBook, UserReadingStats,
+)
+from .renderers import ORJSONRenderer
+
+User = get_user_model()
+
+
+class QueryCountTestCase(TestCase):
+    """Comprueba que el número de consultas de un listado no crece con el número de filas."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('lector', 'lector@example.com', 'clave-segura-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.created = 0
+
+    def create_books(self, count):
+        books = []
+        for _ in range(count):
+            self.created += 1
+            author = Author.objects.create(name=f'Autor {self.created}')
+            books.append(Book.objects.create(title=f'Libro {self.created}', author=author, isbn=f'97800000{self.created:05d}'))
+        return books
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url, populate, small=2, large=12):
+        populate(small)
+        baseline = self.count_queries(url)
+        populate(large - small)
+        self.assertEqual(
+            self.count_queries(url), baseline,
+            f'{url}: el número de consultas crece con el número de filas',
+        )
+
+
+class BookQueryCountTests(QueryCountTestCase):
+
+    def test_books_list(self):
+        self.assertConstantQueries('/api/v1/books/books/', self.create_books)
+
+    def test_books_search(self):
+        self.assertConstantQueries('/api/v1/books/books/?q=Libro', self.create_books)
+
+    def test_authors_list(self):
+        self.assertConstantQueries('/api/v1/books/authors/', self.create_books)
+
+    def test_user_books_list(self):
+        def populate(count):
+            for book in self.create_books(count):
+                UserBook.objects.create(user=self.user, book=book, is_read=True, rating=8)
+        self.assertConstantQueries('/api/v1/books/user/books/?page_size=50', populate)
+
+    def test_reviews_list(self):
+        def populate(count):
+            for book in self.create_books(count):
+                Review.objects.create(user=self.user, book=book, rating=7, text='Muy bueno')
+        self.assertConstantQueries('/api/v1/books/reviews/', populate)
+
+    def test_book_detail(self):
+        book = self.create_books(1)[0]
+        # autenticación + libro con su autor
+        self.assertLessEqual(self.count_queries(f'/api/v1/books/books/{book.pk}/'), 2)
+
+    def test_user_book_detail(self):
+        entry = UserBook.objects.create(user=self.user, book=self.create_books(1)[0])
+        self.assertLessEqual(self.count_queries(f'/api/v1/books/user/books/{entry.pk}/'), 2)
+
+
+class KeysetPaginationTests(QueryCountTestCase):
+
+    def collect(self, url, direction='next'):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            page = [item['id'] for item in response.data['results']]
+            ids = ids + page if direction == 'next' else page + ids
+            url = response.data[direction]
+        return ids
+
+    def test_walks_every_book_once_in_both_directions(self):
+        books = self.create_books(7)
+        # misma fecha de creación en varios libros: el id desempata
+        Book.objects.filter(pk__in=[b.pk for b in books[:4]]).update(created_at=books[0].created_at)
+        expected = list(Book.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+        forward = self.collect('/api/v1/books/books/?page_size=3')
+        self.assertEqual(forward, expected)
+
+        last_page = self.client.get('/api/v1/books/books/?page_size=3')
+        while last_page.data['next']:
+            last_page = self.client.get(last_page.data['next'])
+        backward = [item['id'] for item in last_page.data['results']]
+        backward = self.collect(last_page.data['previous'], direction='previous') + backward
+        self.assertEqual(backward, expected)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/v1/books/books/?cursor=basura').status_code, 404)
+
+
+class BookSearchTests(QueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        zafon = Author.objects.create(name='Carlos Ruiz Zafón')
+        self.shadow = Book.objects.create(title='La sombra del viento', author=zafon, isbn='9788408163435')
+        self.other = Book.objects.create(title='Los pilares de la Tierra', isbn='9788401328510')
+
+    def search(self, q):
+        response = self.client.get('/api/v1/books/books/', {'q': q})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item['id'] for item in response.data['results']]
+
+    def test_matches_title_and_author(self):
+        self.assertEqual(self.search('viento'), [self.shadow.pk])
+        self.assertEqual(self.search('Ruiz'), [self.shadow.pk])
+
+    def test_matches_isbn_with_hyphens(self):
+        self.assertEqual(self.search('978-84-013-2851-0'), [self.other.pk])
+
+    def test_author_rename_is_searchable(self):
+        Author.objects.filter(pk=self.shadow.author_id).update(name='Otro nombre')
+        author = Author.objects.get(pk=self.shadow.author_id)
+        author.name = 'Arturo Pérez-Reverte'
+        author.save()
+        self.assertEqual(self.search('Reverte'), [self.shadow.pk])
+
+    def test_user_library_search(self):
+        UserBook.objects.create(user=self.user, book=self.shadow)
+        UserBook.objects.create(user=self.user, book=self.other)
+        response = self.client.get('/api/v1/books/user/books/', {'search': 'pilares'})
+        self.assertEqual([item['book']['id'] for item in response.data['results']], [self.other.pk])
+
+
+class BookRatingTests(QueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.book, self.other = self.create_books(2)
+        self.reader = User.objects.create_user('otra', 'otra@example.com', 'clave-segura-123')
+
+    def assertRating(self, book, average, count):
+        book.refresh_from_db()
+        self.assertEqual(book.rating_count, count)
+        self.assertEqual(book.average_rating, average)
+
+    def test_reviews_and_library_ratings_are_aggregated(self):
+        review = Review.objects.create(user=self.user, book=self.book, rating=8)
+        entry = UserBook.objects.create(user=self.reader, book=self.book, rating=6)
+        self.assertRating(self.book, 7.0, 2)
+
+        review.rating = 10
+        review.save()
+        entry.rating = None
+        entry.save()
+        self.assertRating(self.book, 10.0, 1)
+
+        review.book = self.other
+        review.save()
+        self.assertRating(self.book, None, 0)
+        self.assertRating(self.other, 10.0, 1)
+
+        review.delete()
+        self.assertRating(self.other, None, 0)
+
+    def test_rebuild_command(self):
+        Review.objects.create(user=self.user, book=self.book, rating=9)
+        UserBook.objects.create(user=self.reader, book=self.book, rating=4)
+        Book.objects.update(rating_sum=0, rating_count=0, average_rating=None)
+        call_command('rebuild_book_ratings', stdout=StringIO())
+        self.assertRating(self.book, 6.5, 2)
+        self.assertRating(self.other, None, 0)
+
+    def test_order_and_filter_by_rating(self):
+        third = self.create_books(1)[0]
+        Review.objects.create(user=self.user, book=self.book, rating=5)
+        Review.objects.create(user=self.user, book=self.other, rating=9)
+        Review.objects.create(user=self.user, book=third, rating=7)
+
+        response = self.client.get('/api/v1/books/books/', {'ordering': '-rating', 'page_size': 2})
+        ids = [item['id'] for item in response.data['results']]
+        ids += [item['id'] for item in self.client.get(response.data['next']).data['results']]
+        self.assertEqual(ids, [self.other.pk, third.pk, self.book.pk])
+
+        response = self.client.get('/api/v1/books/books/', {'min_rating': 7})
+        self.assertEqual({item['id'] for item in response.data['results']}, {self.other.pk, third.pk})
+
+
+GOODREADS_CSV = '''Book Id,Title,Author,ISBN,ISBN13,My Rating,Exclusive Shelf,Owned Copies
+1,Dune,Frank Herbert,"=""0441172717""","=""9780441172719""",5,read,1
+2,Known Book,Someone,"=""""","=""9780000000002""",0,to-read,0
+3,Missing,Nobody,"=""""","=""9780000000095""",3,read,0
+'''
+
+
+@override_settings(BOOKS_TASK_QUEUE={'BACKEND': 'inline'})
+class ImportJobTests(QueryCountTestCase):
+    """Contrato de ImportBookView: 202 con el trabajo y su `status_url`, que refleja cómo termina."""
+
+    def start(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/books/books/import/', data, format='json')
+        self.assertEqual(response.status_code, 202, response.content)
+        self.assertEqual(response.data['status'], ImportStatus.PENDING)
+        return self.client.get(response.data['status_url'])
+
+    def test_successful_import(self):
+        book = self.create_books(1)[0]
+        with mock.patch('books.services.import_single_by_query', return_value=book) as lookup:
+            status = self.start({'isbn': '9780441172719'})
+        lookup.assert_called_once_with(query_isbn='9780441172719')
+        self.assertEqual(status.status_code, 200)
+        self.assertEqual((status.data['status'], status.data['progress']), (ImportStatus.DONE, 100))
+        self.assertEqual([item['id'] for item in status.data['books']], [book.pk])
+
+    def test_failed_imports_report_error(self):
+        with mock.patch('books.services.import_multiple_by_title', return_value=[]):
+            status = self.start({'title': 'Nada'}).data
+        self.assertEqual((status['status'], status['error']), (ImportStatus.FAILED, 'No se encontraron resultados'))
+
+        with mock.patch('books.services.import_single_by_query', side_effect=RuntimeError('caído')):
+            status = self.start({'isbn': '9780441172719'}).data
+        self.assertEqual((status['status'], status['error']), (ImportStatus.FAILED, 'Ocurrió un error al importar el libro.'))
+
+        with mock.patch('books.services.import_single_by_query', side_effect=upstream.UpstreamUnavailable('caído')):
+            status = self.start({'isbn': '9780441172719'}).data
+        self.assertEqual(status['status'], ImportStatus.FAILED)
+        self.assertIn('no está disponible', status['error'])
+
+    def test_validation_and_ownership(self):
+        self.assertEqual(self.client.post('/api/v1/books/books/import/', {}, format='json').status_code, 400)
+        with mock.patch('books.services.import_single_by_query', return_value=None):
+            job_id = self.start({'isbn': '9780441172719'}).data['id']
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('otra', 'otra@example.com', 'clave-segura-123'))
+        self.assertEqual(other.get(f'/api/v1/books/books/import/{job_id}/').status_code, 404)
+
+
+class TaskQueueBackendTests(TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.done = threading.Event()
+        queue.task('test_record')(self.record)
+        self.addCleanup(queue._TASKS.pop, 'test_record', None)
+
+    def record(self, **kwargs):
+        self.calls.append(kwargs)
+        self.done.set()
+
+    @override_settings(BOOKS_TASK_QUEUE={'BACKEND': 'inline'})
+    def test_inline_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            queue.enqueue('test_record', value=1)
+            self.assertEqual(self.calls, [])
+        self.assertIsInstance(queue.get_queue(), queue.InlineQueue)
+        self.assertEqual(self.calls, [{'value': 1}])
+
+    @override_settings(BOOKS_TASK_QUEUE={'BACKEND': 'thread', 'WORKERS': 1})
+    def test_thread_pool(self):
+        self.assertIsInstance(queue.get_queue(), queue.ThreadQueue)
+        queue.get_queue().push('test_record', {'value': 2})
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.calls, [{'value': 2}])
+
+    @override_settings(BOOKS_TASK_QUEUE={'BACKEND': 'redis', 'URL': 'redis://localhost:6379/0', 'QUEUE_NAME': 'test:tasks'})
+    def test_redis_list(self):
+        with mock.patch('redis.Redis.from_url') as from_url:
+            backend = queue.get_queue()
+        client = from_url.return_value
+        self.assertIsInstance(backend, queue.RedisQueue)
+        backend.push('test_record', {'value': 3})
+        name, message = client.rpush.call_args.args
+        self.assertEqual(name, 'test:tasks')
+
+        stop = threading.Event()
+
+        def blpop(queue_name, timeout):
+            if stop.is_set():
+                return None
+            stop.set()
+            return (queue_name.encode(), message.encode())
+        client.blpop.side_effect = blpop
+        backend.work(stop_event=stop, poll_timeout=0)
+        self.assertEqual(self.calls, [{'value': 3}])
+
+
+# las importaciones se ejecutan en el propio proceso: con la cola de Redis nadie las recogería
+@override_settings(BOOKS_TASK_QUEUE={'BACKEND': 'inline'})
+class BulkImportTests(QueryCountTestCase):
+
+    def fake_lookup(self, isbn, title, author_name):
+        if isbn != '9780441172719':
+            return None
+        return {'volumeInfo': {
+            'title': 'Dune', 'authors': ['Frank Herbert'],
+            'industryIdentifiers': [{'type': 'ISBN_13', 'identifier': isbn}],
+        }}
+
+    def setUp(self):
+        super().setUp()
+        self.known = Book.objects.create(title='Known Book', isbn='9780000000002')
+        patches = [
+            mock.patch('books.bulk_import._lookup', side_effect=self.fake_lookup),
+            mock.patch('books.services.lookup_isbns', return_value={}),
+            mock.patch('books.services._fetch_best_cover', return_value=None),
+            mock.patch('books.services.schedule_author_enrichment'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_goodreads_csv_import(self):
+        upload = SimpleUploadedFile('goodreads.csv', GOODREADS_CSV.encode(), content_type='text/csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/books/books/import/bulk/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 202, response.content)
+
+        job = self.client.get(response.data['status_url']).data
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual((job['total'], job['processed']), (3, 3))
+        self.assertEqual(job['summary'], {'pending': 0, 'imported': 1, 'existing': 1, 'not_found': 1})
+
+        dune = Book.objects.get(isbn='9780441172719')
+        self.assertEqual(dune.author.name, 'Frank Herbert')
+        entries = {entry.book_id: entry for entry in UserBook.objects.filter(user=self.user)}
+        self.assertEqual(set(entries), {dune.pk, self.known.pk})
+        self.assertTrue(entries[dune.pk].is_read and entries[dune.pk].owned)
+        self.assertEqual(entries[dune.pk].rating, 10)
+        self.assertTrue(entries[self.known.pk].wishlist)
+        dune.refresh_from_db()
+        self.assertEqual((dune.rating_count, dune.average_rating), (1, 10.0))
+
+    def test_import_updates_reading_stats_and_activity(self):
+        # las entradas se crean con bulk_create, sin señales: el resumen y la actividad los escribe la importación
+        follower = User.objects.create_user('seguidor', 'seguidor@example.com', 'clave-segura-123')
+        follower.following.add(self.user)
+        upload = SimpleUploadedFile('goodreads.csv', GOODREADS_CSV.encode(), content_type='text/csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/v1/books/books/import/bulk/', {'file': upload}, format='multipart')
+
+        dune = Book.objects.get(isbn='9780441172719')
+        stats = UserReadingStats.objects.get(user=self.user)
+        expected = reading_stats.compute_summaries([self.user.pk])[self.user.pk]
+        self.assertEqual({field: getattr(stats, field) for field in expected}, expected)
+        self.assertEqual((stats.total, stats.read, stats.wishlist), (2, 1, 1))
+
+        activities = {(a.verb, a.book_id, a.rating) for a in Activity.objects.filter(actor=self.user)}
+        self.assertEqual(activities, {(ActivityVerb.READ, dune.pk, 10), (ActivityVerb.WISHLISTED, self.known.pk, None)})
+        for owner in (self.user, follower):
+            self.assertEqual(TimelineEntry.objects.filter(owner=owner).count(), 2)
+
+    def test_book_added_by_hand_during_import_is_kept(self):
+        manual = UserBook.objects.create(user=self.user, book=self.known, owned=True)
+        upload = SimpleUploadedFile('goodreads.csv', GOODREADS_CSV.encode(), content_type='text/csv')
+        # la entrada se crea entre la comprobación de las existentes y la inserción del lote
+        with mock.patch('books.bulk_import.UserBook.objects.filter', side_effect=[UserBook.objects.none()]), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/books/books/import/bulk/', {'file': upload}, format='multipart')
+
+        job = self.client.get(response.data['status_url']).data
+        self.assertEqual(job['status'], 'done')
+        dune = Book.objects.get(isbn='9780441172719')
+        self.assertEqual(UserBook.objects.filter(user=self.user).count(), 2)
+        manual.refresh_from_db()
+        self.assertTrue(manual.owned and not manual.wishlist)
+        self.assertTrue(UserBook.objects.get(user=self.user, book=dune).is_read)
+
+        stats = UserReadingStats.objects.get(user=self.user)
+        expected = reading_stats.compute_summaries([self.user.pk])[self.user.pk]
+        self.assertEqual({field: getattr(stats, field) for field in expected}, expected)
+        self.assertEqual(Activity.objects.filter(actor=self.user, book=self.known).count(), 1)
+        self.assertEqual(Activity.objects.filter(actor=self.user, book=dune).count(), 1)
+
+    def test_resumes_pending_items(self):
+        rows = bulk_import.parse_isbn_list('978-0-441-17271-9\n9780000000002')
+        job = bulk_import.create_job(self.user, rows)
+        # simula una interrupción tras el primer lote
+        bulk_import._import_chunk(job, list(job.items.all()[:1]))
+        job.status = ImportStatus.RUNNING
+        job.save()
+
+        bulk_import.run_job(job, chunk_size=1)
+        self.assertEqual(job.processed, 2)
+        self.assertEqual(bulk_import._lookup.call_count, 1)
+        self.assertEqual(UserBook.objects.filter(user=self.user).count(), 2)
+
+    def test_rejects_empty_list(self):
+        response = self.client.post('/api/v1/books/books/import/bulk/', {'isbns': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+def volume(isbn, title='Libro'):
+    return {'id': f'v{isbn}', 'volumeInfo': {'title': title, 'industryIdentifiers': [{'type': 'ISBN_13', 'identifier': isbn}]}}
+
+
+class UpstreamLookupTests(TestCase):
+
+    def setUp(self):
+        cache = caches['lookups']
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def response(self, data, status=200):
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(data).encode()
+        return response
+
+    def test_concurrent_identical_lookups_share_one_request(self):
+        release = threading.Event()
+
+        def slow_get(url, **kwargs):
+            release.wait(5)
+            return self.response({'items': [volume('9780441172719')]})
+
+        results = []
+        with mock.patch('books.upstream.get', side_effect=slow_get) as get:
+            threads = [
+                threading.Thread(target=lambda: results.append(services._google_books_search({'q': 'isbn:9780441172719'})))
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            time.sleep(0.2)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result['items'][0]['id'] == 'v9780441172719' for result in results))
+
+    def test_waits_for_lookup_running_in_another_process(self):
+        params = {'q': 'isbn:9780441172719'}
+        key = lookup_cache.make_key('google_books', services.GOOGLE_BOOKS_API_URL, params)
+        cache = caches['lookups']
+        cache.add(f'{key}:lock', 'otro-proceso')
+        threading.Timer(0.2, lambda: cache.set(key, {'items': [volume('9780441172719')]})).start()
+        with mock.patch('books.upstream.get') as get:
+            self.assertEqual(services._google_books_search(params)['items'][0]['id'], 'v9780441172719')
+        get.assert_not_called()
+
+    def test_errors_are_not_cached_and_release_the_lock(self):
+        with mock.patch('books.upstream.get', return_value=self.response({}, status=503)):
+            self.assertIsNone(lookup_cache.get_json('wikipedia', 'https://es.wikipedia.org/x'))
+        key = lookup_cache.make_key('wikipedia', 'https://es.wikipedia.org/x')
+        self.assertIsNone(caches['lookups'].get(f'{key}:lock'))
+        with mock.patch('books.upstream.get', return_value=self.response({'extract': 'Bio'})) as get:
+            self.assertEqual(lookup_cache.get_json('wikipedia', 'https://es.wikipedia.org/x'), {'extract': 'Bio'})
+        self.assertEqual(get.call_count, 1)
+
+    @override_settings(BOOKS_LOOKUP_CACHE={'ALIAS': 'lookups', 'TTLS': {'wikipedia': 1000}, 'NEGATIVE_TTL': 10})
+    def test_not_found_and_empty_responses_use_negative_ttl(self):
+        cache = caches['lookups']
+        responses = {
+            'https://es.wikipedia.org/a': self.response({}, status=404),
+            'https://es.wikipedia.org/b': self.response([]),
+            'https://es.wikipedia.org/c': self.response(['ok']),
+        }
+        with mock.patch('books.upstream.get', side_effect=lambda url, **kwargs: responses[url]) as get, \
+                mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            for _ in range(2):
+                for url in responses:
+                    lookup_cache.get_json('wikipedia', url, is_negative=lambda data: not data)
+        self.assertEqual(get.call_count, 3)
+        timeouts = {call.args[0]: call.kwargs['timeout'] for call in cache_set.call_args_list}
+        self.assertEqual(
+            [timeouts[lookup_cache.make_key('wikipedia', url)] for url in responses], [10, 10, 1000],
+        )
+        self.assertIsNone(lookup_cache.get_json('wikipedia', 'https://es.wikipedia.org/a'))
+
+    def test_network_errors_return_none_unless_raise_errors(self):
+        url = 'https://es.wikipedia.org/x'
+        for error in (requests.ConnectionError, requests.Timeout, upstream.UpstreamUnavailable):
+            with mock.patch('books.upstream.get', side_effect=error):
+                self.assertIsNone(lookup_cache.get_json('wikipedia', url))
+                with self.assertRaises(error):
+                    lookup_cache.get_json('wikipedia', url, raise_errors=True)
+
+    def test_hit_and_miss_counters(self):
+        lookup_cache.reset_stats()
+        with mock.patch('books.upstream.get', return_value=self.response({'extract': 'Bio'})):
+            for _ in range(3):
+                lookup_cache.get_json('wikipedia', 'https://es.wikipedia.org/x')
+        self.assertEqual(lookup_cache.stats()['wikipedia'], {'hits': 2, 'misses': 1, 'hit_ratio': 0.667})
+        self.assertEqual(lookup_cache.stats()['google_books']['hit_ratio'], None)
+
+    def test_isbn_lookups_are_batched(self):
+        isbns = ['9780441172719', '9780000000002', '9780306406157']
+        payload = {'items': [volume(isbns[0], 'Dune'), volume(isbns[2])]}
+        with mock.patch('books.upstream.get', return_value=self.response(payload)) as get:
+            found = services.lookup_isbns(isbns)
+        self.assertEqual(set(found), {isbns[0], isbns[2]})
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(get.call_args.kwargs['params']['q'].count(' OR '), 2)
+        # la consulta individual del mismo ISBN ya está en caché
+        with mock.patch('books.upstream.get') as get:
+            self.assertEqual(services._google_books_search(services.isbn_search_params(isbns[0]))['items'][0]['id'], f'v{isbns[0]}')
+        get.assert_not_called()
+
+
+def upstream_settings(**host_config):
+    return {
+        'DEFAULT': {
+            'RETRIES': 0, 'RATE': None, 'BURST': 1, 'MAX_WAIT': 0, 'FAILURES': 2, 'FAILURE_WINDOW': 60, 'COOLDOWN': 60,
+            **host_config,
+        },
+        'LIMITS': {'BACKEND': 'local'},
+    }
+
+
+class UpstreamGuardTests(TestCase):
+    url = 'https://openlibrary.org/search.json'
+
+    def ok(self):
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+    @override_settings(BOOKS_UPSTREAM=upstream_settings(COOLDOWN=0.2))
+    def test_circuit_breaker_fails_fast_and_probes(self):
+        client = upstream.get_client()
+        with mock.patch.object(client.session, 'request', side_effect=requests.ConnectTimeout) as request:
+            for _ in range(2):
+                with self.assertRaises(requests.ConnectTimeout):
+                    upstream.get(self.url)
+            with self.assertRaises(upstream.UpstreamUnavailable):
+                upstream.get(self.url)
+        self.assertEqual(request.call_count, 2)
+        self.assertFalse(upstream.available(self.url))
+        # los demás proveedores no se ven afectados
+        self.assertTrue(upstream.available('https://es.wikipedia.org/x'))
+
+        time.sleep(0.25)
+        with mock.patch.object(client.session, 'request', return_value=self.ok()) as request:
+            self.assertEqual(upstream.get(self.url).status_code, 200)
+            upstream.get(self.url)
+        self.assertEqual(request.call_count, 2)
+        self.assertTrue(upstream.available(self.url))
+
+    @override_settings(BOOKS_UPSTREAM=upstream_settings(COOLDOWN=0.2))
+    def test_failed_probe_reopens_circuit(self):
+        client = upstream.get_client()
+        with mock.patch.object(client.session, 'request', return_value=mock.Mock(status_code=503)):
+            upstream.get(self.url)
+            upstream.get(self.url)
+            time.sleep(0.25)
+            upstream.get(self.url)
+        self.assertFalse(upstream.available(self.url))
+
+    @override_settings(BOOKS_UPSTREAM=upstream_settings(RATE=1, BURST=2))
+    def test_rate_limit(self):
+        client = upstream.get_client()
+        with mock.patch.object(client.session, 'request', return_value=self.ok()) as request:
+            upstream.get(self.url)
+            upstream.get(self.url)
+            with self.assertRaises(upstream.UpstreamUnavailable):
+                upstream.get(self.url)
+        self.assertEqual(request.call_count, 2)
+
+    def status(self, code):
+        response = requests.Response()
+        response.status_code = code
+        response.raw = io.BytesIO()
+        return response
+
+    @override_settings(BOOKS_UPSTREAM=upstream_settings(RETRIES=2, BACKOFF=0, RATE=1, BURST=2, FAILURES=10))
+    def test_each_retry_takes_a_token(self):
+        client = upstream.get_client()
+        with mock.patch.object(client.session, 'request', side_effect=lambda *a, **k: self.status(503)) as request:
+            with self.assertRaises(upstream.UpstreamUnavailable):
+                upstream.get(self.url)
+        self.assertEqual(request.call_count, 2)
+
+    @override_settings(BOOKS_UPSTREAM=upstream_settings(RETRIES=2, BACKOFF=0, FAILURES=3))
+    def test_intermediate_errors_count_towards_the_breaker(self):
+        client = upstream.get_client()
+        with mock.patch.object(client.session, 'request', side_effect=lambda *a, **k: self.status(503)) as request:
+            self.assertEqual(upstream.get(self.url).status_code, 503)
+        self.assertEqual(request.call_count, 3)
+        self.assertFalse(upstream.available(self.url))
+
+    @override_settings(BOOKS_UPSTREAM=upstream_settings(FAILURES=3))
+    def test_flapping_upstream_still_trips(self):
+        client = upstream.get_client()
+        codes = iter([503, 200, 503, 200, 503])
+        with mock.patch.object(client.session, 'request', side_effect=lambda *a, **k: self.status(next(codes))):
+            for _ in range(5):
+                upstream.get(self.url)
+        self.assertFalse(upstream.available(self.url))
+
+    def test_title_import_degrades_to_openlibrary(self):
+        with mock.patch('books.services._google_books_search', side_effect=upstream.UpstreamUnavailable('caído')), \
+                mock.patch('books.services._import_from_openlibrary_by_title', return_value=['libro']) as fallback:
+            self.assertEqual(services.import_multiple_by_title('Dune'), ['libro'])
+        fallback.assert_called_once()
+
+    def test_wikipedia_tries_next_language(self):
+        def summary(name, lang):
+            if lang == 'es':
+                raise upstream.UpstreamUnavailable('es.wikipedia.org: circuito abierto')
+            return {'extract': 'Bio'}
+        with mock.patch('books.services._fetch_wikipedia_summary', side_effect=summary):
+            self.assertEqual(services._fetch_wikipedia_author('Frank Herbert'), {'biography': 'Bio'})
+
+
+def png_bytes(width=1000, height=1500):
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 30, 30)).save(out, 'PNG')
+    return out.getvalue()
+
+
+def streamed(chunks, content_type='image/png', content_length=None):
+    """Respuesta en streaming falsa: `chunks` puede incluir excepciones, que se lanzan al llegar a ellas."""
+    def iter_content(chunk_size):
+        for chunk in chunks:
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+
+    response = mock.MagicMock(status_code=200)
+    response.__enter__.return_value = response
+    response.headers = {'Content-Type': content_type}
+    if content_length is not None:
+        response.headers['Content-Length'] = str(content_length)
+    response.iter_content.side_effect = iter_content
+    return response
+
+
+class ImageTests(TestCase):
+
+    @staticmethod
+    @contextmanager
+    def track_spools():
+        """Guarda los SpooledTemporaryFile que se crean para comprobar después que se cerraron."""
+        spools = []
+        original = tempfile.SpooledTemporaryFile
+
+        def factory(**kwargs):
+            spools.append(original(**kwargs))
+            return spools[-1]
+
+        with mock.patch('tempfile.SpooledTemporaryFile', side_effect=factory):
+            yield spools
+
+    def test_downloads_in_chunks(self):
+        data = png_bytes(40, 60)
+        with mock.patch('books.upstream.get', return_value=streamed([data[:100], data[100:]])):
+            spool = images.download('https://example.com/portada.png')
+        with spool:
+            self.assertEqual(spool.read(), data)
+
+    def test_rejects_non_image_content_type(self):
+        with mock.patch('books.upstream.get', return_value=streamed([b'<html>'], content_type='text/html')):
+            with self.assertRaises(images.ImageRejected):
+                images.download('https://example.com/portada.png')
+
+    def test_byte_cap(self):
+        # declarado en Content-Length: ni se empieza a descargar
+        response = streamed([b'x' * 10], content_length=2000)
+        with mock.patch('books.upstream.get', return_value=response):
+            with self.assertRaises(images.ImageRejected):
+                images.download('https://example.com/portada.png', max_bytes=1000)
+        response.iter_content.assert_not_called()
+
+        # sin Content-Length: se corta al pasar el límite y se cierra el temporal
+        with mock.patch('books.upstream.get', return_value=streamed([b'x' * 600] * 3)), \
+                self.track_spools() as spools:
+            with self.assertRaises(images.ImageRejected):
+                images.download('https://example.com/portada.png', max_bytes=1000)
+        self.assertTrue(spools[0].closed)
+
+    def test_closes_spool_when_stream_breaks(self):
+        chunks = [b'x' * 100, requests.exceptions.ChunkedEncodingError('conexión cortada')]
+        with mock.patch('books.upstream.get', return_value=streamed(chunks)), \
+                self.track_spools() as spools:
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                images.download('https://example.com/portada.png')
+        self.assertTrue(spools[0].closed)
+
+    def test_builds_webp_renditions(self):
+        renditions = images.build_renditions(io.BytesIO(png_bytes(1000, 1500)))
+        self.assertEqual(set(renditions), {'S', 'M', 'L'})
+        for key, box in images.sizes().items():
+            with Image.open(io.BytesIO(renditions[key])) as img:
+                self.assertEqual(img.format, 'WEBP')
+                self.assertEqual(img.size, box)
+
+    def test_rejects_invalid_image(self):
+        with self.assertRaises(images.ImageRejected):
+            images.build_renditions(io.BytesIO(b'esto no es una imagen'))
+
+
+class ImageStorageTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media_root = tmp.name
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = ContentAddressedStorage()
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, names in os.walk(self.media_root) for name in names
+        )
+
+    def test_identical_content_is_stored_once(self):
+        sha = hashlib.sha256(b'misma imagen').hexdigest()
+        first = self.storage.save('S.webp', ContentFile(b'misma imagen'))
+        second = self.storage.save('portada.WEBP', ContentFile(b'misma imagen'))
+        self.assertEqual(first, f'images/{sha[:2]}/{sha[2:4]}/{sha}.webp')
+        self.assertEqual(second, first)
+        self.assertEqual(self.stored_files(), [first])
+
+    def test_concurrent_save_of_existing_content_keeps_the_name(self):
+        name = self.storage.save('S.webp', ContentFile(b'misma imagen'))
+        # otro proceso lo guardó entre la comprobación de exists() y la escritura
+        answers = iter([False])
+        real_exists = self.storage.exists
+        with mock.patch.object(self.storage, 'exists', side_effect=lambda path: next(answers, real_exists(path))):
+            self.assertEqual(self.storage.save('S.webp', ContentFile(b'misma imagen')), name)
+        self.assertEqual(self.stored_files(), [name])
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b'misma imagen')
+
+    def test_gc_removes_only_old_unreferenced_files(self):
+        storage = get_image_storage()
+        referenced = storage.save('L.webp', ContentFile(b'portada'))
+        variant = storage.save('S.webp', ContentFile(b'portada S'))
+        old_orphan = storage.save('L.webp', ContentFile(b'portada antigua'))
+        new_orphan = storage.save('L.webp', ContentFile(b'importando'))
+        Book.objects.create(
+            title='Libro', author=Author.objects.create(name='Autor'),
+            cover=referenced, cover_variants={'S': variant, 'L': referenced},
+        )
+        two_days_ago = time.time() - 48 * 3600
+        for name in (referenced, variant, old_orphan):
+            os.utime(storage.path(name), (two_days_ago, two_days_ago))
+
+        out = StringIO()
+        call_command('gc_images', '--dry-run', stdout=out)
+        self.assertIn(old_orphan, out.getvalue())
+        self.assertTrue(storage.exists(old_orphan))
+
+        call_command('gc_images', stdout=StringIO())
+        self.assertEqual(self.stored_files(), sorted([referenced, variant, new_orphan]))
+
+        call_command('gc_images', '--grace-hours', '0', stdout=StringIO())
+        self.assertEqual(self.stored_files(), sorted([referenced, variant]))
+
+
+@override_settings(BOOKS_TASK_QUEUE={'BACKEND': 'inline'})
+class AuthorEnrichmentTests(QueryCountTestCase):
+    not_found = {'outcomes': {'openlibrary': EnrichmentStatus.NOT_FOUND, 'wikipedia': EnrichmentStatus.NOT_FOUND}}
+
+    def test_backoff_grows_from_one_hour_to_thirty_days(self):
+        author = Author.objects.create(name='Autor sin datos')
+        delays = []
+        with mock.patch('books.services._fetch_author_details', return_value=self.not_found):
+            for _ in range(12):
+                services.enrich_author(author)
+                author.refresh_from_db()
+                delays.append((author.enrichment_next_retry_at - author.enrichment_attempted_at) / timedelta(hours=1))
+        self.assertEqual(delays, [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 720, 720])
+        self.assertEqual(author.enrichment_failures, 12)
+        self.assertEqual(author.wikipedia_status, EnrichmentStatus.NOT_FOUND)
+        self.assertFalse(services.author_enrichment_due(author))
+
+    def test_complete_author_stops_retrying(self):
+        author = Author.objects.create(name='Autor', enrichment_failures=3)
+        details = {
+            'biography': 'Biografía', 'photo': {'S': 'images/s.webp', 'L': 'images/l.webp'},
+            'outcomes': {'openlibrary': EnrichmentStatus.FOUND},
+        }
+        with mock.patch('books.services._fetch_author_details', return_value=details):
+            services.enrich_author(author)
+        author.refresh_from_db()
+        self.assertEqual(author.photo.name, 'images/l.webp')
+        self.assertEqual(author.enrichment_failures, 0)
+        self.assertIsNone(author.enrichment_next_retry_at)
+        self.assertFalse(services.author_enrichment_due(author))
+
+    def test_lease_prevents_duplicate_enqueues(self):
+        author = Author.objects.create(name='Autor')
+        stale = Author.objects.get(pk=author.pk)
+        with mock.patch('books.services.enqueue') as enqueue:
+            self.assertTrue(services.schedule_author_enrichment(author))
+            # otra lectura concurrente que cargó la fila antes de la reserva
+            self.assertFalse(services.schedule_author_enrichment(stale))
+            self.assertFalse(services.schedule_author_enrichment(Author.objects.get(pk=author.pk)))
+        enqueue.assert_called_once_with('enrich_author', author_id=author.pk)
+        author.refresh_from_db()
+        lease = (author.enrichment_next_retry_at - timezone.now()) / timedelta(minutes=1)
+        self.assertTrue(9 < lease <= 10, lease)
+
+        # reserva caducada (el worker no llegó a ejecutarla): se vuelve a encolar
+        Author.objects.filter(pk=author.pk).update(enrichment_next_retry_at=timezone.now() - timedelta(seconds=1))
+        author.refresh_from_db()
+        with mock.patch('books.services.enqueue') as enqueue:
+            self.assertTrue(services.schedule_author_enrichment(author))
+        enqueue.assert_called_once()
+
+    def test_author_read_makes_no_upstream_request(self):
+        author = Author.objects.create(name='Autor')
+        url = f'/api/v1/books/authors/{author.pk}/'
+        with mock.patch('books.upstream.get') as get, self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        get.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
+
+        # las fuentes externas solo se consultan desde la tarea encolada
+        with mock.patch('books.services._fetch_author_details', return_value=self.not_found) as fetch:
+            callbacks[0]()
+        fetch.assert_called_once_with('Autor', need_bio=True, need_photo=True)
+        author.refresh_from_db()
+        self.assertEqual(author.enrichment_failures, 1)
+
+        # dentro del backoff la lectura ni consulta ni encola
+        with mock.patch('books.upstream.get') as get, self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        get.assert_not_called()
+        self.assertEqual(callbacks, [])
+
+
+class BookIdentifierTests(QueryCountTestCase):
+
+    def test_normalize_isbn(self):
+        self.assertEqual(identifiers.normalize_isbn('0-441-17271-7'), '9780441172719')
+        self.assertEqual(identifiers.normalize_isbn('978-0-441-17271-9'), '9780441172719')
+        self.assertEqual(identifiers.normalize_isbn('080442957X'), '9780804429573')
+        self.assertIsNone(identifiers.normalize_isbn('9780441172710'))
+        self.assertIsNone(identifiers.normalize_isbn('no es un isbn'))
+
+    def test_known_isbn_skips_upstream(self):
+        book = Book.objects.create(title='Dune', isbn='978-0-441-17271-9')
+        with mock.patch('books.services._google_books_search') as search:
+            self.assertEqual(services.import_single_by_query('0441172717'), book)
+        search.assert_not_called()
+
+    def test_other_volume_of_known_book_is_not_duplicated(self):
+        book = Book.objects.create(title='Dune', isbn='9780441172719')
+        volume = {'id': 'vol-2', 'volumeInfo': {
+            'title': 'Dune (reedición)',
+            'industryIdentifiers': [{'type': 'ISBN_10', 'identifier': '0441172717'}],
+        }}
+        with mock.patch('books.services._fetch_best_cover', return_value=None):
+            self.assertEqual(services._import_volumes([volume, volume]), [book, book])
+        self.assertEqual(Book.objects.count(), 1)
+        self.assertEqual(identifiers.resolve([(IdentifierKind.GOOGLE_VOLUME, 'vol-2')]), {
+            (IdentifierKind.GOOGLE_VOLUME, 'vol-2'): book,
+        })
+
+    def test_merge_duplicate_books(self):
+        author = Author.objects.create(name='Frank Herbert')
+        keep = Book.objects.create(title='Dune', author=author, isbn='9780441172719')
+        by_isbn = Book.objects.create(title='Dune', isbn='0-441-17271-7', description='Arrakis')
+        by_title = Book.objects.create(title='DUNE', author=author)
+        other = User.objects.create_user('otra', 'otra@example.com', 'clave-segura-123')
+        UserBook.objects.create(user=self.user, book=keep, rating=6)
+        UserBook.objects.create(user=self.user, book=by_isbn, rating=10)
+        UserBook.objects.create(user=other, book=by_title, rating=8)
+        Review.objects.create(user=other, book=by_isbn, rating=4)
+        # vecinos calculados antes de la fusión: el de `neighbour` apunta a un duplicado
+        neighbour = Book.objects.create(title='Hijos de Dune', author=author)
+        UserBook.objects.create(user=self.user, book=neighbour, rating=9)
+        UserBook.objects.create(user=other, book=neighbour, rating=7)
+        BookSimilarity.objects.create(book=neighbour, similar=by_title, score=0.5, rank=1)
+        BookSimilarity.objects.create(book=by_isbn, similar=neighbour, score=0.5, rank=1)
+
+        call_command('merge_duplicate_books', '--by-title', stdout=StringIO())
+
+        self.assertEqual(list(Book.objects.exclude(pk=neighbour.pk).values_list('pk', flat=True)), [keep.pk])
+        # la actividad de los duplicados sigue en las cronologías, ahora con el libro conservado
+        self.assertEqual(Activity.objects.filter(book=keep).count(), 4)
+        self.assertEqual(Activity.objects.exclude(book__in=[keep, neighbour]).count(), 0)
+        self.assertEqual(
+            set(BookSimilarity.objects.values_list('book_id', 'similar_id')),
+            {(keep.pk, neighbour.pk), (neighbour.pk, keep.pk)},
+        )
+        keep.refresh_from_db()
+        self.assertEqual(keep.description, 'Arrakis')
+        self.assertEqual(UserBook.objects.get(user=self.user, book=keep).rating, 6)
+        self.assertTrue(UserBook.objects.filter(user=other, book=keep).exists())
+        self.assertEqual(Review.objects.get().book, keep)
+        self.assertEqual((keep.rating_count, keep.average_rating), (3, 6.0))
+
+
+class UpsertTests(QueryCountTestCase):
+
+    def test_authors_are_unique_by_normalized_name(self):
+        zafon = Author.objects.create(name='Carlos Ruiz Zafón')
+        authors = services.upsert_authors({'carlos  ruiz zafon', 'Frank Herbert'})
+        self.assertEqual(authors['carlos  ruiz zafon'], zafon)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(services.upsert_authors({'FRANK HERBERT'})['FRANK HERBERT'], authors['Frank Herbert'])
+
+    def test_long_author_names_fit_the_key(self):
+        # 'ß' se normaliza a 'ss': la clave sería más larga que el propio nombre
+        name = 'Straße ' * 28
+        author = Author.objects.create(name=name[:200])
+        self.assertEqual(len(author.name_key), 200)
+        self.assertEqual(services.upsert_authors({name})[name], author)
+        self.assertEqual(Author.objects.count(), 1)
+        response = self.client.post('/api/v1/books/authors/', {'name': name[:200]}, format='json')
+        self.assertEqual((response.status_code, response.data['id']), (200, author.pk))
+
+    def test_api_returns_existing_author(self):
+        # el alta manual de libros (AddBook.tsx) crea u obtiene el autor antes de crear el libro
+        herbert = Author.objects.create(name='Frank Herbert')
+        response = self.client.post('/api/v1/books/authors/', {'name': 'frank herbert'}, format='json')
+        self.assertEqual((response.status_code, response.data['id']), (200, herbert.pk))
+
+        response = self.client.post('/api/v1/books/authors/', {'name': 'Ursula K. Le Guin'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Author.objects.count(), 2)
+
+    def test_api_author_creation_race_returns_the_winner(self):
+        # otra petición inserta el mismo autor entre la consulta y el INSERT
+        winner = Author.objects.create(name='Frank Herbert')
+        with mock.patch('books.views.Author.objects.filter', side_effect=[Author.objects.none()]):
+            response = self.client.post('/api/v1/books/authors/', {'name': 'frank herbert'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], winner.pk)
+        self.assertEqual(Author.objects.count(), 1)
+
+    def test_book_losing_identifier_race_is_discarded(self):
+        # otro proceso registró el mismo volumen entre la consulta y la inserción
+        winner = Book.objects.create(title='Dune')
+        identifiers.attach([(winner, [(IdentifierKind.GOOGLE_VOLUME, 'vol-1')])])
+        ids = [(IdentifierKind.GOOGLE_VOLUME, 'vol-1'), (IdentifierKind.ISBN13, '9780441172719')]
+
+        books = services.upsert_books([(Book(title='Dune'), ids)])
+        self.assertEqual(books, [winner])
+        self.assertEqual(Book.objects.count(), 1)
+        self.assertEqual(identifiers.resolve(ids), {identifier: winner for identifier in ids})
+
+
+class ConditionalGetTests(QueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.book = self.create_books(1)[0]
+        self.url = f'/api/v1/books/books/{self.book.pk}/'
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_book_detail_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Last-Modified', response)
+        with CaptureQueriesContext(connection) as ctx:
+            cached = self.revalidate(self.url, response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertLessEqual(len(ctx.captured_queries), 2)
+
+    def test_changes_invalidate_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        Review.objects.create(user=self.user, book=self.book, rating=9)
+        self.assertEqual(self.revalidate(self.url, etag).status_code, 200)
+
+        etag = self.client.get(self.url)['ETag']
+        author = self.book.author
+        author.name = 'Otro nombre'
+        author.save()
+        self.assertEqual(self.revalidate(self.url, etag).status_code, 200)
+
+    def test_list_not_modified_until_new_book(self):
+        response = self.client.get('/api/v1/books/books/')
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.revalidate('/api/v1/books/books/', response['ETag']).status_code, 304)
+        self.create_books(1)
+        self.assertEqual(self.revalidate('/api/v1/books/books/', response['ETag']).status_code, 200)
+
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'lookups': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-lookups'},
+}
+
+
+# caché propia del test: los fragmentos de otra ejecución no pueden satisfacer las aserciones
+@override_settings(CACHES=LOCMEM_CACHES, BOOKS_FRAGMENT_CACHE={'ALIAS': 'default', 'TTL': 60})
+class FragmentCacheTests(QueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        caches[fragments.DEFAULT_ALIAS].clear()
+        self.books = self.create_books(3)
+        for book in self.books:
+            UserBook.objects.create(user=self.user, book=book)
+
+    def render_counts(self, url):
+        cache = caches[fragments.DEFAULT_ALIAS]
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                mock.patch('books.serializers.ImageVariantsField.to_representation', return_value={}) as render:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, get_many.call_count, render.call_count
+
+    def test_list_reuses_fragments_with_one_multi_get(self):
+        # portada y foto del autor de cada libro; la biblioteca reutiliza los fragmentos del catálogo
+        for url, expected in (('/api/v1/books/books/', 6), ('/api/v1/books/user/books/', 0)):
+            first, gets, rendered = self.render_counts(url)
+            self.assertEqual(gets, 1)
+            self.assertEqual(rendered, expected)
+            second, gets, rendered = self.render_counts(url)
+            self.assertEqual((gets, rendered), (1, 0))
+            self.assertEqual(first.json()['results'], second.json()['results'])
+
+    def test_author_change_invalidates_books(self):
+        self.client.get('/api/v1/books/user/books/')
+        author = self.books[0].author
+        author.name = 'Nombre nuevo'
+        author.save()
+        results = self.client.get('/api/v1/books/user/books/').json()['results']
+        names = {entry['book']['author']['name'] for entry in results}
+        self.assertIn('Nombre nuevo', names)
+
+    def test_rating_update_is_not_served_stale(self):
+        url = f'/api/v1/books/books/{self.books[0].pk}/'
+        self.assertIsNone(self.client.get(url).json()['average_rating'])
+        Review.objects.create(user=self.user, book=self.books[0], rating=7)
+        self.assertEqual(self.client.get(url).json()['average_rating'], 7)
+
+
+class FastRenderingTests(QueryCountTestCase):
+    urls = ('/api/v1/books/books/', '/api/v1/books/user/books/', '/api/v1/books/reviews/')
+
+    def setUp(self):
+        super().setUp()
+        books = self.create_books(3)
+        books[0].cover_variants = {'S': 'covers/s.webp'}
+        books[0].published_date = '2001-02-03'
+        books[0].save()
+        Book.objects.create(title='Sin autor')
+        for book in books:
+            UserBook.objects.create(user=self.user, book=book, rating=8, notes='nota')
+            Review.objects.create(user=self.user, book=book, rating=6, text='texto')
+
+    def test_flat_serializers_match_model_serializers(self):
+        for url in self.urls:
+            expected = self.client.get(url).json()
+            with override_settings(BOOKS_FAST_RENDERING={'ENABLED': True}):
+                self.assertEqual(self.client.get(url).json(), expected, url)
+
+    def test_flat_keyset_cursor_and_search(self):
+        with override_settings(BOOKS_FAST_RENDERING={'ENABLED': True}):
+            first = self.client.get('/api/v1/books/books/?page_size=2').json()
+            second = self.client.get(first['next']).json()
+            searched = self.client.get('/api/v1/books/books/?q=Libro').json()
+        self.assertEqual(len(first['results']) + len(second['results']), 4)
+        self.assertTrue(searched['results'])
+
+    def test_flat_lists_keep_constant_queries(self):
+        with override_settings(BOOKS_FAST_RENDERING={'ENABLED': True}):
+            self.assertLessEqual(self.count_queries('/api/v1/books/reviews/'), 3)
+
+    def test_orjson_renderer(self):
+        data = {'id': 1, 'rating': 7.5, 'title': 'Título', 'none': None}
+        self.assertEqual(ORJSONRenderer().render(data), '{"id":1,"rating":7.5,"title":"Título","none":null}'.encode())
+        self.assertIn(b'\n', ORJSONRenderer().render(data, 'application/json; indent=4'))
+
+
+class SparseFieldsetTests(QueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for book in self.create_books(3):
+            book.description = 'x' * 5000
+            book.save()
+            UserBook.objects.create(user=self.user, book=book, rating=8)
+            Review.objects.create(user=self.user, book=book, rating=6, text='texto')
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), ' '.join(query['sql'] for query in ctx.captured_queries)
+
+    def test_library_fields_prune_output_and_query(self):
+        data, sql = self.get('/api/v1/books/user/books/?fields=id,rating,book.title,book.author.name')
+        entry = data['results'][0]
+        self.assertEqual(set(entry), {'id', 'rating', 'book'})
+        self.assertEqual(set(entry['book']), {'title', 'author'})
+        self.assertEqual(set(entry['book']['author']), {'name'})
+        self.assertNotIn('description', sql)
+        self.assertNotIn('biography', sql)
+        self.assertConstantQueries('/api/v1/books/user/books/?fields=id,book.title', lambda n: [
+            UserBook.objects.create(user=self.user, book=book) for book in self.create_books(n)
+        ])
+
+    def test_empty_expand_returns_ids(self):
+        data, sql = self.get('/api/v1/books/reviews/?fields=id,user,book&expand=')
+        review = data['results'][0]
+        self.assertIsInstance(review['book'], int)
+        self.assertEqual(review['user'], self.user.username)
+        self.assertNotIn('books_book', sql.split('FROM', 1)[0])
+
+        data, sql = self.get('/api/v1/books/books/?expand=')
+        self.assertIsInstance(data['results'][0]['author'], int)
+        self.assertIn('description', data['results'][0])
+
+    def test_detail_and_cache_keep_full_payload(self):
+        book = Book.objects.first()
+        url = f'/api/v1/books/books/{book.pk}/'
+        sparse = self.client.get(f'{url}?fields=title')
+        self.assertEqual(sparse.json(), {'title': book.title})
+        self.assertEqual(self.revalidate(f'{url}?fields=title', sparse['ETag']).status_code, 304)
+        full = self.client.get(url).json()
+        self.assertIn('description', full)
+        self.assertNotEqual(self.client.get(url)['ETag'], sparse['ETag'])
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+
+class ReadingStatsTests(QueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.books = self.create_books(3)
+        self.books[0].published_date = '1999-05-01'
+        self.books[0].save()
+
+    def assertStatsMatchLibrary(self):
+        stored = UserReadingStats.objects.get(user=self.user)
+        expected = reading_stats.compute_summaries([self.user.pk])[self.user.pk]
+        self.assertEqual({field: getattr(stored, field) for field in expected}, expected)
+
+    def test_incremental_updates_match_rebuild(self):
+        for book in self.books:
+            response = self.client.post('/api/v1/books/user/books/', {'book_id': book.pk, 'rating': 8, 'owned': True})
+            self.assertEqual(response.status_code, 201, response.content)
+        entry = UserBook.objects.get(user=self.user, book=self.books[1])
+        self.client.patch(f'/api/v1/books/user/books/{entry.pk}/', {'is_read': True, 'rating': 3, 'owned': False})
+        self.client.delete(f'/api/v1/books/user/books/{UserBook.objects.get(book=self.books[2]).pk}/')
+        self.assertStatsMatchLibrary()
+
+        stats = self.client.get('/api/v1/books/user/stats/').json()
+        self.assertEqual((stats['total'], stats['read'], stats['unread'], stats['owned']), (2, 1, 1, 1))
+        self.assertEqual(stats['rating_histogram']['8'], 1)
+        self.assertEqual(stats['rating_histogram']['3'], 1)
+        self.assertEqual(stats['average_rating'], 5.5)
+        self.assertEqual(stats['books_per_year'], {'1999': 1})
+        self.assertEqual({author['id'] for author in stats['top_authors']}, {self.books[0].author_id, self.books[1].author_id})
+
+        # borrar el libro arrastra la entrada de la biblioteca
+        self.books[0].delete()
+        self.assertStatsMatchLibrary()
+
+    def test_stats_endpoint_reads_single_row(self):
+        for book in self.books:
+            UserBook.objects.create(user=self.user, book=book, wishlist=True)
+        # resumen + nombres de los autores más leídos
+        self.assertLessEqual(self.count_queries('/api/v1/books/user/stats/'), 2)
+        self.assertEqual(self.client.get('/api/v1/books/user/stats/').json()['wishlist'], 3)
+
+    def test_rebuild_command_and_user_deletion(self):
+        for book in self.books:
+            UserBook.objects.create(user=self.user, book=book, is_digital=True)
+        UserReadingStats.objects.filter(user=self.user).update(total=0, digital=0, books_per_author={})
+        call_command('rebuild_reading_stats', stdout=StringIO())
+        self.assertStatsMatchLibrary()
+        self.user.delete()
+        self.assertFalse(UserReadingStats.objects.exists())
+
+    def test_empty_library(self):
+        stats = self.client.get('/api/v1/books/user/stats/').json()
+        self.assertEqual(stats['total'], 0)
+        self.assertIsNone(stats['average_rating'])
+
+
+# el reparto a las cronologías son tareas: se ejecutan en el propio proceso
+@override_settings(BOOKS_TASK_QUEUE={'BACKEND': 'inline'})
+class ActivityFeedTests(QueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.friend = User.objects.create_user('amiga', 'amiga@example.com', 'clave-segura-123')
+        self.books = self.create_books(2)
+
+    def act(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            return action()
+
+    def feed(self, url='/api/v1/books/feed/'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def verbs(self):
+        return [(item['actor']['username'], item['verb']) for item in self.feed()['results']]
+
+    def test_followers_receive_activity(self):
+        self.act(lambda: self.user.following.add(self.friend))
+        self.act(lambda: Review.objects.create(user=self.friend, book=self.books[0], rating=9, text='Muy bueno'))
+        self.act(lambda: UserBook.objects.create(user=self.friend, book=self.books[1], is_read=True))
+        self.act(lambda: UserBook.objects.create(user=self.user, book=self.books[0], wishlist=True))
+        self.assertEqual(self.verbs(), [
+            ('lector', ActivityVerb.WISHLISTED), ('amiga', ActivityVerb.READ), ('amiga', ActivityVerb.REVIEWED),
+        ])
+        review = self.feed()['results'][2]
+        self.assertEqual((review['review'], review['rating'], review['book']['id']), ('Muy bueno', 9, self.books[0].pk))
+
+        self.act(lambda: self.user.following.remove(self.friend))
+        self.assertEqual(self.verbs(), [('lector', ActivityVerb.WISHLISTED)])
+
+    def test_privacy_level(self):
+        self.friend.privacy_level = 'friends'
+        self.friend.save()
+        self.act(lambda: self.user.following.add(self.friend))
+        self.act(lambda: Review.objects.create(user=self.friend, book=self.books[0], rating=7))
+        self.assertEqual(self.verbs(), [])
+        # seguimiento mutuo: ya son amigos y se trae la actividad reciente
+        self.act(lambda: self.friend.following.add(self.user))
+        self.assertEqual(self.verbs(), [('amiga', ActivityVerb.REVIEWED)])
+
+        self.friend.privacy_level = 'private'
+        self.act(self.friend.save)
+        self.assertEqual(self.verbs(), [])
+
+    def test_feed_reads_one_page(self):
+        def populate(count):
+            for _ in range(count):
+                other = User.objects.create_user(f'u{self.created}', f'u{self.created}@example.com', 'clave-segura-123')
+                self.act(lambda: self.user.following.add(other))
+                for book in self.create_books(2):
+                    self.act(lambda: UserBook.objects.create(user=other, book=book, rating=5))
+        self.assertConstantQueries('/api/v1/books/feed/?page_size=5', populate)
+
+        first = self.feed('/api/v1/books/feed/?page_size=5')
+        self.assertEqual(len(first['results']), 5)
+        self.assertIsNotNone(first['next'], 'la cronología debería tener una segunda página')
+        second = self.feed(first['next'])
+        ids = [item['id'] for item in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 10)
+
+
+class RecommendationTests(QueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.books = self.create_books(4)
+        self.readers = [
+            User.objects.create_user(f'r{i}', f'r{i}@example.com', 'clave-segura-123') for i in range(3)
+        ]
+        for reader in self.readers[:2]:
+            UserBook.objects.create(user=reader, book=self.books[0], rating=9)
+            UserBook.objects.create(user=reader, book=self.books[1], rating=8)
+        UserBook.objects.create(user=self.readers[2], book=self.books[2], is_read=True)
+        UserBook.objects.create(user=self.readers[2], book=self.books[3], wishlist=True)
+        UserBook.objects.create(user=self.user, book=self.books[0], rating=10)
+
+    def ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item['book']['id'] for item in response.json()]
+
+    def test_similar_books_and_recommendations(self):
+        call_command('build_book_similarity', stdout=StringIO())
+        self.assertEqual(self.ids(f'/api/v1/books/books/{self.books[0].pk}/similar/'), [self.books[1].pk])
+        # un solo lector en común: no llega al mínimo
+        self.assertEqual(self.ids(f'/api/v1/books/books/{self.books[2].pk}/similar/'), [])
+        self.assertEqual(self.ids('/api/v1/books/user/recommendations/'), [self.books[1].pk])
+
+        UserBook.objects.create(user=self.user, book=self.books[1], is_read=True)
+        self.assertEqual(self.ids('/api/v1/books/user/recommendations/'), [])
+        self.assertEqual(self.client.get('/api/v1/books/books/999999/similar/').status_code, 404)
+
+    def test_incremental_refresh(self):
+        call_command('build_book_similarity', stdout=StringIO())
+        untouched = BookSimilarity.objects.get(book=self.books[0]).computed_at
+        other = User.objects.create_user('otra', 'otra@example.com', 'clave-segura-123')
+        UserBook.objects.create(user=other, book=self.books[2], rating=7)
+        UserBook.objects.create(user=other, book=self.books[3], rating=6)
+        call_command('build_book_similarity', '--incremental', stdout=StringIO())
+        self.assertEqual(self.ids(f'/api/v1/books/books/{self.books[2].pk}/similar/'), [self.books[3].pk])
+        self.assertEqual(BookSimilarity.objects.get(book=self.books[0]).computed_at, untouched)
+
+    def test_endpoints_read_precomputed_rows(self):
+        def populate(count):
+            for book in self.create_books(count):
+                for reader in self.readers[:2]:
+                    UserBook.objects.create(user=reader, book=book, rating=7)
+            recommendations.build_similarities()
+        self.assertConstantQueries(f'/api/v1/books/books/{self.books[0].pk}/similar/', populate)
+        self.assertConstantQueries('/api/v1/books/user/recommendations/', populate)
@@ -0,0 +1,151 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InvalidHeader
+from urllib3.util.retry import Retry
+
+# UpstreamUnavailable se importa también desde aquí: es el error de las peticiones que no se llegan a hacer
+from .upstream_limits import UpstreamUnavailable, make_guard  # noqa
+
+# Valores por defecto; se sobrescriben con settings.BOOKS_UPSTREAM['DEFAULT'] y ['HOSTS'][host]
+DEFAULT_HOST_CONFIG = {
+    'TIMEOUT': (3.05, 10),  # (conexión, lectura) en segundos
+    'POOL_SIZE': 10,
+    'RETRIES': 2,
+    'BACKOFF': 0.5,
+    # token bucket compartido: RATE peticiones por segundo, ráfagas de hasta BURST; sin ficha en
+    # MAX_WAIT segundos la petición falla al instante (RATE None: sin límite)
+    'RATE': 10,
+    'BURST': 20,
+    'MAX_WAIT': 1,
+    # circuit breaker: FAILURES fallos en FAILURE_WINDOW segundos lo abren durante COOLDOWN segundos
+    'FAILURES': 5,
+    'FAILURE_WINDOW': 60,
+    'COOLDOWN': 30,
+}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_METHODS = frozenset({'GET', 'HEAD'})
+# espera máxima entre reintentos, también si Retry-After pide más
+MAX_RETRY_DELAY = 30
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class UpstreamClient:
+    """Sesión HTTP compartida para las APIs externas (Google Books, Open Library, Wikipedia).
+
+    Cada host tiene su propio pool de conexiones keep-alive, timeout y política de reintentos
+    con backoff exponencial ante 429/5xx, además de su límite de peticiones y circuit breaker
+    (books/upstream_limits.py): con el proveedor caído se lanza UpstreamUnavailable sin esperar al timeout.
+    Los reintentos los hace `request` (no urllib3) para que cada intento gaste su ficha y cuente en el circuito.
+    """
+
+    def __init__(self, config: dict | None = None):
+        config = config or {}
+        self.default = {**DEFAULT_HOST_CONFIG, **config.get('DEFAULT', {})}
+        self.hosts = {
+            host: {**self.default, **host_config}
+            for host, host_config in (config.get('HOSTS') or {}).items()
+        }
+        self.guard = make_guard(config.get('LIMITS'))
+        self.session = requests.Session()
+        if config.get('USER_AGENT'):
+            self.session.headers['User-Agent'] = config['USER_AGENT']
+        self.session.mount('https://', self._adapter(self.default))
+        self.session.mount('http://', self._adapter(self.default))
+        for host, host_config in self.hosts.items():
+            self.session.mount(f'https://{host}/', self._adapter(host_config))
+
+    @staticmethod
+    def _adapter(host_config: dict) -> HTTPAdapter:
+        return HTTPAdapter(pool_connections=1, pool_maxsize=host_config['POOL_SIZE'], max_retries=0)
+
+    def host_config(self, url: str) -> dict:
+        return self.hosts.get(urlsplit(url).hostname or '', self.default)
+
+    @staticmethod
+    def _retry_delay(config: dict, attempt: int, response=None) -> float:
+        delay = config['BACKOFF'] * 2 ** (attempt - 1)
+        retry_after = response is not None and response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                delay = max(delay, Retry().parse_retry_after(retry_after))
+            except InvalidHeader:
+                pass
+        return min(delay, MAX_RETRY_DELAY)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        host = urlsplit(url).hostname or ''
+        config = self.host_config(url)
+        kwargs.setdefault('timeout', config['TIMEOUT'])
+        attempts = config['RETRIES'] + 1 if method.upper() in RETRY_METHODS else 1
+        response = None
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(self._retry_delay(config, attempt, response))
+            # sin ficha o con el circuito abierto no se reintenta: UpstreamUnavailable
+            probe = self.guard.acquire(host, config)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self.guard.record(host, config, ok=False, probe=probe)
+                if attempt == attempts - 1:
+                    raise
+                response = None
+                continue
+            failed = response.status_code in RETRY_STATUSES
+            self.guard.record(host, config, ok=not failed, probe=probe)
+            if not failed or attempt == attempts - 1:
+                return response
+            response.close()
+        return response
+
+    def available(self, url: str) -> bool:
+        """False mientras el circuito del host está abierto."""
+        return self.guard.available(urlsplit(url).hostname or '')
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('allow_redirects', False)
+        return self.request('HEAD', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def get_client() -> UpstreamClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = UpstreamClient(getattr(settings, 'BOOKS_UPSTREAM', {}))
+    return _client
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return get_client().get(url, **kwargs)
+
+
+def head(url: str, **kwargs) -> requests.Response:
+    return get_client().head(url, **kwargs)
+
+
+def available(url: str) -> bool:
+    return get_client().available(url)
+
+
+@receiver(setting_changed)
+def _reset_client(setting, **kwargs):
+    global _client
+    if setting == 'BOOKS_UPSTREAM' and _client is not None:
+        _client.close()
+        _client = None
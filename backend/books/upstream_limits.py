@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+
+import requests
+
+# Token bucket atómico en Redis: repone `rate` fichas por segundo hasta `burst` y reserva una.
+# Devuelve los segundos que hay que esperar a que llegue la ficha reservada, o -1 si serían más de `max_wait`.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens < 1 then
+    wait = (1 - tokens) / rate
+    if wait > max_wait then
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+        redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+        return '-1'
+    end
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((burst + max_wait * rate) / rate) + 1)
+return tostring(wait)
+"""
+
+
+def refill(tokens: float, elapsed: float, rate: float, burst: float, max_wait: float):
+    """Mismo cálculo que TOKEN_BUCKET_SCRIPT: devuelve (fichas que quedan, espera) o (fichas, None) sin cupo."""
+    tokens = min(burst, tokens + max(0.0, elapsed) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    wait = (1 - tokens) / rate
+    if wait > max_wait:
+        return tokens, None
+    return tokens - 1, wait
+
+
+class LocalLimits:
+    """Estado en la memoria del proceso (tests o despliegues sin Redis): cada proceso tiene sus propios límites."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.values = {}
+
+    def _alive(self, key, now):
+        value = self.values.get(key)
+        if value is not None and value[1] <= now:
+            del self.values[key]
+            return None
+        return value
+
+    def take(self, key: str, rate: float, burst: float, max_wait: float):
+        with self.lock:
+            now = time.monotonic()
+            tokens, updated = self.buckets.get(key, (burst, now))
+            tokens, wait = refill(tokens, now - updated, rate, burst, max_wait)
+            self.buckets[key] = (tokens, now)
+            return wait
+
+    def present(self, *keys) -> list[bool]:
+        with self.lock:
+            now = time.monotonic()
+            return [self._alive(key, now) is not None for key in keys]
+
+    def add(self, key: str, ttl: float) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            if self._alive(key, now) is not None:
+                return False
+            self.values[key] = (1, now + ttl)
+            return True
+
+    def set(self, key: str, ttl: float):
+        with self.lock:
+            self.values[key] = (1, time.monotonic() + ttl)
+
+    def incr(self, key: str, ttl: float) -> int:
+        with self.lock:
+            now = time.monotonic()
+            value = self._alive(key, now)
+            count = value[0] + 1 if value else 1
+            self.values[key] = (count, value[1] if value else now + ttl)
+            return count
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.values.pop(key, None)
+
+
+class RedisLimits:
+    """Estado compartido en Redis por todos los procesos web y workers."""
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.bucket = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def take(self, key: str, rate: float, burst: float, max_wait: float):
+        wait = float(self.bucket(keys=[key], args=[rate, burst, max_wait]))
+        return None if wait < 0 else wait
+
+    def present(self, *keys) -> list[bool]:
+        return [value is not None for value in self.client.mget(keys)]
+
+    def add(self, key: str, ttl: float) -> bool:
+        return bool(self.client.set(key, 1, nx=True, px=int(ttl * 1000)))
+
+    def set(self, key: str, ttl: float):
+        self.client.set(key, 1, px=int(ttl * 1000))
+
+    def incr(self, key: str, ttl: float) -> int:
+        pipe = self.client.pipeline()
+        pipe.incr(key)
+        pipe.pexpire(key, int(ttl * 1000), nx=True)
+        return pipe.execute()[0]
+
+    def delete(self, *keys):
+        self.client.delete(*keys)
+
+
+class UpstreamUnavailable(requests.RequestException):
+    """El proveedor no se consulta: su circuito está abierto o no queda cupo en su límite de peticiones."""
+
+
+class ProviderGuard:
+    """Límite de peticiones (token bucket) y circuit breaker de cada proveedor (host).
+
+    El circuito se abre tras FAILURES fallos (timeouts, errores de conexión, 429/5xx) en FAILURE_WINDOW
+    segundos y durante COOLDOWN segundos las peticiones fallan al instante. Después deja pasar una sola
+    de prueba: si va bien se cierra y si falla vuelve a abrirse.
+    Si el almacén del estado no responde, las peticiones pasan sin límites.
+    """
+
+    def __init__(self, store, prefix: str = 'upstream'):
+        self.store = store
+        self.prefix = prefix
+
+    def _keys(self, host: str) -> dict:
+        base = f'{self.prefix}:{host}'
+        return {name: f'{base}:{name}' for name in ('bucket', 'open', 'tripped', 'probe', 'failures')}
+
+    def available(self, host: str) -> bool:
+        try:
+            return not self.store.present(self._keys(host)['open'])[0]
+        except Exception as e:
+            logging.exception(e)
+            return True
+
+    def acquire(self, host: str, config: dict) -> bool:
+        """Reserva el paso de una petición a `host`; espera su ficha si llega en MAX_WAIT segundos.
+
+        Devuelve True si es la petición de prueba del circuito medio abierto.
+        """
+        keys = self._keys(host)
+        probe = False
+        try:
+            is_open, tripped = self.store.present(keys['open'], keys['tripped'])
+            if is_open:
+                raise UpstreamUnavailable(f'{host}: circuito abierto')
+            if tripped:
+                probe = self.store.add(keys['probe'], config['COOLDOWN'])
+                if not probe:
+                    raise UpstreamUnavailable(f'{host}: esperando el resultado de la petición de prueba')
+            wait = 0
+            if config.get('RATE'):
+                wait = self.store.take(keys['bucket'], config['RATE'], config['BURST'], config['MAX_WAIT'])
+                if wait is None:
+                    if probe:
+                        self.store.delete(keys['probe'])
+                    raise UpstreamUnavailable(f'{host}: límite de peticiones alcanzado')
+        except UpstreamUnavailable:
+            raise
+        except Exception as e:
+            logging.exception(e)
+            return False
+        if wait:
+            time.sleep(wait)
+        return probe
+
+    def record(self, host: str, config: dict, ok: bool, probe: bool = False):
+        """Anota el resultado de una petición. Los fallos caducan con FAILURE_WINDOW: un acierto suelto
+        entre errores no reinicia la cuenta; solo el de la petición de prueba cierra el circuito."""
+        keys = self._keys(host)
+        try:
+            if ok:
+                if probe:
+                    self.store.delete(keys['tripped'], keys['probe'])
+                return
+            failures = self.store.incr(keys['failures'], config['FAILURE_WINDOW'])
+            if probe or failures >= config['FAILURES']:
+                logging.warning('Circuito abierto para %s durante %ss', host, config['COOLDOWN'])
+                self.store.set(keys['open'], config['COOLDOWN'])
+                # tras el enfriamiento, una sola petición de prueba decide si se cierra
+                self.store.set(keys['tripped'], config['COOLDOWN'] * 10)
+                self.store.delete(keys['failures'], keys['probe'])
+        except Exception as e:
+            logging.exception(e)
+
+
+def make_guard(config: dict | None) -> ProviderGuard:
+    config = config or {}
+    if config.get('BACKEND') == 'redis':
+        store = RedisLimits(config['URL'])
+    else:
+        store = LocalLimits()
+    return ProviderGuard(store, config.get('PREFIX', 'upstream'))
@@ -1,18 +1,25 @@
 from django.urls import path
 from .views import (
     BookListCreateView, BookDetailView,
-    UserBookListCreateView, UserBookDetailView,
+    UserBookListCreateView, UserBookDetailView, UserReadingStatsView, FeedView,
+    SimilarBooksView, RecommendationsView,
     ReviewListCreateView, AuthorListCreateView, AuthorDetailView,
-    ImportBookView
+    ImportBookView, BulkImportView, ImportJobDetailView
 )
 
 urlpatterns = [
     path('books/', BookListCreateView.as_view(), name='books-list'),
     path('books/<int:pk>/', BookDetailView.as_view(), name='books-detail'),
+    path('books/<int:pk>/similar/', SimilarBooksView.as_view(), name='books-similar'),
     path('authors/', AuthorListCreateView.as_view(), name='authors-list'),
     path('authors/<int:pk>/', AuthorDetailView.as_view(), name='authors-detail'),
     path('user/books/', UserBookListCreateView.as_view(), name='user-books'),
     path('user/books/<int:pk>/', UserBookDetailView.as_view(), name='user-book-detail'),
+    path('user/stats/', UserReadingStatsView.as_view(), name='user-stats'),
+    path('user/recommendations/', RecommendationsView.as_view(), name='user-recommendations'),
+    path('feed/', FeedView.as_view(), name='feed'),
     path('reviews/', ReviewListCreateView.as_view(), name='reviews'),
     path('books/import/', ImportBookView.as_view(), name='books-import'),
+    path('books/import/bulk/', BulkImportView.as_view(), name='books-import-bulk'),
+    path('books/import/<uuid:job_id>/', ImportJobDetailView.as_view(), name='books-import-status'),
 ]
@@ -1,58 +1,118 @@
 import logging
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.urls import reverse
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.views import APIView
 
-from .models import Author, Book, Review, UserBook
-from .serializers import AuthorSerializer, BookSerializer, ReviewSerializer, UserBookSerializer
-from . import services
+from .flat import FlatBookSerializer, FlatListMixin, FlatReviewSerializer, FlatUserBookSerializer
+from .http_cache import ConditionalGetMixin
+from .pagination import KeysetPagination
+from .search import search_books
+from .sparse import SparseQuerysetMixin
 
+from .models import Author, Book, ImportJob, Review, TimelineEntry, UserBook, UserReadingStats, author_name_key
+from .serializers import (
+    AuthorSerializer, BookSerializer, ImportJobSerializer, ReviewSerializer, SimilarBookSerializer, TimelineEntrySerializer,
+    UserBookSerializer, UserReadingStatsSerializer,
+)
+from .queue import enqueue
+from . import bulk_import, recommendations, services
 
-class BookListCreateView(generics.ListCreateAPIView):
+
+class BookListCreateView(FlatListMixin, SparseQuerysetMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = BookSerializer
+    flat_serializer_class = FlatBookSerializer
+    # versiones del ETag (books/http_cache.py)
+    sparse_extra_fields = ('updated_at', 'author__updated_at')
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
+    # ordenaciones admitidas -> clave del cursor (todas servidas por un índice)
+    orderings = {
+        '-created_at': ('-created_at', '-id'),
+        'created_at': ('created_at', 'id'),
+        '-rating': ('-average_rating', '-id'),
+        'rating': ('average_rating', 'id'),
+    }
 
     def get_queryset(self):
-        queryset = Book.objects.all()
-        q = self.request.query_params.get('q')
+        queryset = Book.objects.select_related('author')
+        params = self.request.query_params
+
+        min_rating = params.get('min_rating')
+        if min_rating:
+            try:
+                queryset = queryset.filter(average_rating__gte=float(min_rating))
+            except ValueError:
+                pass
+
+        q = (params.get('q') or '').strip()
         if q:
-            return queryset.filter(Q(title__icontains=q) | Q(isbn__icontains=q))
+            # resultados ordenados por relevancia; el cursor pagina sobre (rank, id)
+            self.keyset_ordering = ('-rank', '-id')
+            return search_books(queryset, q)
+
+        ordering = params.get('ordering')
+        if ordering in self.orderings:
+            self.keyset_ordering = self.orderings[ordering]
+            if 'average_rating' in self.keyset_ordering[0]:
+                # el cursor no admite NULL: al ordenar por nota solo entran libros con alguna nota
+                queryset = queryset.filter(average_rating__isnull=False)
         return queryset
 
     def perform_create(self, serializer):
         serializer.save()
 
 
-class AuthorListCreateView(generics.ListCreateAPIView):
+class AuthorListCreateView(SparseQuerysetMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
+    sparse_extra_fields = ('updated_at',)
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-id',)
+
+    def create(self, request, *args, **kwargs):
+        # crear u obtener: con un autor del mismo nombre normalizado se devuelve ese (200) en lugar de duplicarlo
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        key = author_name_key(serializer.validated_data['name'])
+        author = Author.objects.filter(name_key=key).first()
+        if author is None:
+            try:
+                with transaction.atomic():
+                    author = serializer.save()
+                return Response(serializer.data, status=status.HTTP_201_CREATED)
+            except IntegrityError:
+                # otra petición lo ha creado a la vez
+                author = Author.objects.get(name_key=key)
+        return Response(self.get_serializer(author).data)
 
 
-class AuthorDetailView(generics.RetrieveAPIView):
+class AuthorDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
     def retrieve(self, request, *args, **kwargs):
         instance: Author = self.get_object()
-        if not instance.biography or not instance.photo:
-            try:
-                services.maybe_enrich_author_from_openlibrary(instance)
-                if not instance.biography or not instance.photo:
-                    services.maybe_enrich_author_from_wikipedia(instance)
-            except Exception as e:
-                logging.exception(e)
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        # la lectura es solo de BD; el enriquecimiento pendiente se hace en segundo plano
+        try:
+            services.schedule_author_enrichment(instance)
+        except Exception as e:
+            logging.exception(e)
+        return self.conditional_response(
+            request, [instance], lambda: Response(self.get_serializer(instance).data),
+        )
 
 
-class BookDetailView(generics.RetrieveAPIView):
-    queryset = Book.objects.all()
+class BookDetailView(SparseQuerysetMixin, ConditionalGetMixin, generics.RetrieveAPIView):
+    queryset = Book.objects.select_related('author')
     serializer_class = BookSerializer
+    sparse_extra_fields = ('updated_at', 'author__updated_at')
     permission_classes = (permissions.IsAuthenticated,)
 
 
@@ -62,13 +122,14 @@ class UserBookPagination(PageNumberPagination):
     page_query_param = 'page'
 
 
-class UserBookListCreateView(generics.ListCreateAPIView):
+class UserBookListCreateView(FlatListMixin, SparseQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = UserBookSerializer
+    flat_serializer_class = FlatUserBookSerializer
     permission_classes = (permissions.IsAuthenticated,)
     pagination_class = UserBookPagination
 
     def get_queryset(self):
-        queryset = UserBook.objects.filter(user=self.request.user).select_related('book')
+        queryset = UserBook.objects.filter(user=self.request.user).select_related('book__author')
         params = self.request.query_params
 
         def parse_bool(value):
@@ -96,9 +157,9 @@ class UserBookListCreateView(generics.ListCreateAPIView):
             except ValueError:
                 pass
 
-        search = params.get('search') or params.get('q')
+        search = (params.get('search') or params.get('q') or '').strip()
         if search:
-            queryset = queryset.filter(book__title__icontains=search)
+            queryset = queryset.filter(book__in=search_books(Book.objects.all(), search).values('pk'))
 
         ordering = params.get('ordering')
         allowed = {
@@ -109,10 +170,10 @@ class UserBookListCreateView(generics.ListCreateAPIView):
             'is_digital', '-is_digital',
             'owned', '-owned',
         }
-        if ordering in allowed:
-            queryset = queryset.order_by(ordering)
-        else:
-            queryset = queryset.order_by('-updated_at')
+        if ordering not in allowed:
+            ordering = '-updated_at'
+        # desempate por id en el mismo sentido, para que los índices (user, campo, id) sirvan el orden
+        queryset = queryset.order_by(ordering, '-id' if ordering.startswith('-') else 'id')
 
         return queryset
 
@@ -120,23 +181,70 @@ class UserBookListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class UserBookDetailView(generics.RetrieveUpdateDestroyAPIView):
+class UserBookDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = UserBookSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
-        return get_object_or_404(UserBook, pk=self.kwargs['pk'], user=self.request.user)
+        queryset = self.filter_queryset(UserBook.objects.select_related('book__author'))
+        return get_object_or_404(queryset, pk=self.kwargs['pk'], user=self.request.user)
+
+
+class UserReadingStatsView(generics.RetrieveAPIView):
+    # una sola fila precalculada (books/reading_stats.py); sin biblioteca todavía, un resumen vacío
+    serializer_class = UserReadingStatsSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_object(self):
+        user = self.request.user
+        return UserReadingStats.objects.filter(user=user).first() or UserReadingStats(user=user)
+
+
+class SimilarBooksView(generics.ListAPIView):
+    """Libros parecidos, leídos del índice precalculado por `manage.py build_book_similarity`."""
+    serializer_class = SimilarBookSerializer
+    permission_classes = (permissions.IsAuthenticated,)
 
+    def get_queryset(self):
+        get_object_or_404(Book.objects.only('pk'), pk=self.kwargs['pk'])
+        return recommendations.similar_books(self.kwargs['pk'])
+
+
+class RecommendationsView(generics.ListAPIView):
+    """Libros que no están en la biblioteca del usuario, parecidos a los que ha leído o puntuado bien."""
+    serializer_class = SimilarBookSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return recommendations.recommendations(self.request.user)
+
+
+class FeedView(generics.ListAPIView):
+    """Actividad de los usuarios seguidos: una página de la cronología ya repartida (books/activity.py)."""
+    serializer_class = TimelineEntrySerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        return TimelineEntry.objects.filter(owner=self.request.user).select_related(
+            'activity__actor', 'activity__book__author', 'activity__review',
+        )
 
-class ReviewListCreateView(generics.ListCreateAPIView):
+
+class ReviewListCreateView(FlatListMixin, SparseQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = ReviewSerializer
+    flat_serializer_class = FlatReviewSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
+        queryset = Review.objects.select_related('user', 'book__author')
         book_id = self.request.query_params.get('book')
         if book_id:
-            return Review.objects.filter(book_id=book_id)
-        return Review.objects.all()
+            return queryset.filter(book_id=book_id)
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -148,22 +256,51 @@ class ImportBookView(APIView):
     def post(self, request):
         query_isbn = (request.data.get('isbn') or '').strip()
         query_title = (request.data.get('title') or request.data.get('q') or '').strip()
-        offset = request.data.get('offset', 0)
+        try:
+            offset = max(int(request.data.get('offset', 0) or 0), 0)
+        except (TypeError, ValueError):
+            offset = 0
 
         if not query_isbn and not query_title:
             return Response({'detail': 'Proporcione isbn o title'}, status=400)
 
+        job = ImportJob.objects.create(
+            user=request.user,
+            isbn=query_isbn,
+            title='' if query_isbn else query_title,
+            offset=offset,
+        )
+        enqueue('import_books', job_id=str(job.id))
+        data = ImportJobSerializer(job, context={'request': request}).data
+        data['status_url'] = request.build_absolute_uri(reverse('books-import-status', args=[job.id]))
+        return Response(data, status=202)
+
+
+class BulkImportView(APIView):
+    """Importa una lista de ISBN (`isbns`) o un CSV de Goodreads/hoja de cálculo (`file`)."""
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        add_to_library = str(request.data.get('add_to_library', 'true')).lower() not in ('0', 'false', 'no')
         try:
-            if query_isbn:
-                book = services.import_single_by_query(query_isbn=query_isbn)
-                if not book:
-                    return Response({'detail': 'No se encontraron resultados'}, status=404)
-                return Response(BookSerializer(book).data, status=201)
-            
-            books = services.import_multiple_by_title(query_title, offset=offset)
-            if not books:
-                return Response({'detail': 'No se encontraron resultados'}, status=404)
-            return Response(BookSerializer(books, many=True).data, status=201)
-        except Exception as exc:
-            logging.exception(exc)
-            return Response({'detail': 'Ocurrió un error al importar el libro.'}, status=500)
+            upload = request.FILES.get('file')
+            if upload is not None:
+                rows = bulk_import.parse_library_csv(upload)
+            else:
+                rows = bulk_import.parse_isbn_list(request.data.get('isbns'))
+            job = bulk_import.create_job(request.user, rows, add_to_library=add_to_library)
+        except bulk_import.BulkImportError as e:
+            return Response({'detail': str(e)}, status=400)
+
+        enqueue('bulk_import_books', job_id=str(job.id))
+        data = ImportJobSerializer(job, context={'request': request}).data
+        data['status_url'] = request.build_absolute_uri(reverse('books-import-status', args=[job.id]))
+        return Response(data, status=202)
+
+
+class ImportJobDetailView(generics.RetrieveAPIView):
+    serializer_class = ImportJobSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_object(self):
+        return get_object_or_404(ImportJob, pk=self.kwargs['job_id'], user=self.request.user)
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -24,6 +25,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
@@ -124,6 +126,128 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Modo de respuesta rápido: listados de libros, biblioteca y reseñas construidos desde .values()
+# (books/flat.py) y JSON generado con orjson (books/renderers.py). Comparar con `manage.py bench_rendering`.
+BOOKS_FAST_RENDERING = {
+    'ENABLED': os.getenv('BOOKS_FAST_RENDERING', '0') == '1',
+}
+if BOOKS_FAST_RENDERING['ENABLED']:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'books.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:5173').split(' ')
 CORS_ALLOW_CREDENTIALS = True
+
+
+# Redis (servicio `cache` de docker-compose)
+REDIS_URL = os.getenv('REDIS_URL', 'redis://cache:6379/0')
+# `manage.py test`: cachés y límites de las APIs externas en memoria, sin compartir estado con el Redis real
+TESTING = sys.argv[1:2] == ['test']
+
+# Cola de tareas en segundo plano (importaciones de libros)
+# BACKEND: 'redis' (worker `manage.py run_task_worker`), 'thread' (pool en el proceso web) o 'inline' (tests)
+BOOKS_TASK_QUEUE = {
+    'BACKEND': os.getenv('BOOKS_TASK_QUEUE_BACKEND', 'redis'),
+    'URL': REDIS_URL,
+    'QUEUE_NAME': 'books:tasks',
+    'WORKERS': int(os.getenv('BOOKS_TASK_WORKERS', 4)),
+}
+
+# Cliente HTTP compartido para las APIs externas de metadatos (books/upstream.py)
+# TIMEOUT: (conexión, lectura); POOL_SIZE: conexiones keep-alive por host; RETRIES/BACKOFF ante 429/5xx
+# RATE/BURST/MAX_WAIT: token bucket por host (peticiones por segundo, ráfaga, espera máxima de una ficha)
+# FAILURES/FAILURE_WINDOW/COOLDOWN: circuit breaker por host (books/upstream_limits.py)
+# LIMITS: dónde se guarda ese estado, 'redis' (compartido por todos los procesos) o 'local' (por proceso)
+BOOKS_UPSTREAM = {
+    'USER_AGENT': 'MyBookConnect/1.0 (+https://github.com/Zaton81/MyBookConnect)',
+    'DEFAULT': {
+        'TIMEOUT': (3.05, 10), 'POOL_SIZE': 10, 'RETRIES': 2, 'BACKOFF': 0.5,
+        'RATE': 10, 'BURST': 20, 'MAX_WAIT': 1, 'FAILURES': 5, 'FAILURE_WINDOW': 60, 'COOLDOWN': 30,
+    },
+    'HOSTS': {
+        # cuota de Google Books: 1000 peticiones cada 100 s por proyecto
+        'www.googleapis.com': {'TIMEOUT': (3.05, 10), 'RATE': 8, 'BURST': 20},
+        'openlibrary.org': {'TIMEOUT': (3.05, 10), 'RATE': 3, 'BURST': 10},
+        'covers.openlibrary.org': {'TIMEOUT': (3.05, 10), 'POOL_SIZE': 16, 'RATE': 10, 'BURST': 30},
+        'es.wikipedia.org': {'TIMEOUT': (3.05, 8), 'RATE': 20, 'BURST': 40},
+        'en.wikipedia.org': {'TIMEOUT': (3.05, 8), 'RATE': 20, 'BURST': 40},
+    },
+    'LIMITS': {
+        'BACKEND': os.getenv('BOOKS_UPSTREAM_LIMITS_BACKEND', 'local' if TESTING else 'redis'),
+        'URL': REDIS_URL,
+        'PREFIX': 'mbc-upstream',
+    },
+}
+
+# Cachés (Redis del servicio `cache`). `lookups` guarda las respuestas de las APIs externas;
+# el tamaño lo acota Redis (maxmemory + volatile-lru en docker-compose).
+# BOOKS_CACHE_BACKEND=locmem (por defecto en los tests o sin REDIS_URL): en la memoria de cada proceso
+BOOKS_CACHE_BACKEND = os.getenv('BOOKS_CACHE_BACKEND', 'locmem' if TESTING or not os.getenv('REDIS_URL') else 'redis')
+if BOOKS_CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'mbc',
+        },
+        'lookups': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'mbc-lookups',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'mbc',
+        },
+        'lookups': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'mbc-lookups',
+            'OPTIONS': {'MAX_ENTRIES': 10_000},
+        },
+    }
+
+# Caché persistente de Google Books / Open Library / Wikipedia (books/lookup_cache.py), TTL en segundos.
+# LOCK_TIMEOUT/LOCK_WAIT: cerrojo con el que un solo proceso hace cada consulta y lo que esperan los demás
+BOOKS_LOOKUP_CACHE = {
+    'ALIAS': 'lookups',
+    'TTLS': {
+        'google_books': 60 * 60 * 24 * 7,
+        'openlibrary_search': 60 * 60 * 24 * 7,
+        'openlibrary_authors': 60 * 60 * 24 * 30,
+        'wikipedia': 60 * 60 * 24 * 30,
+    },
+    'NEGATIVE_TTL': 60 * 60 * 24,
+    'LOCK_TIMEOUT': 30,
+    'LOCK_WAIT': 15,
+}
+
+# Cabeceras de caché HTTP del catálogo (books/http_cache.py): argumentos de patch_cache_control.
+# Las respuestas dependen del token del usuario, así que por defecto solo las cachea el navegador.
+BOOKS_HTTP_CACHE = {
+    'CACHE_CONTROL': {
+        'private': True,
+        'max_age': int(os.getenv('BOOKS_HTTP_CACHE_MAX_AGE', 60)),
+    },
+}
+
+# Caché de la representación serializada de cada libro y autor (books/fragments.py), TTL en segundos.
+# Las señales de Book/Author borran los fragmentos y los de una versión anterior (`updated_at`) se ignoran.
+BOOKS_FRAGMENT_CACHE = {
+    'ALIAS': 'default',
+    'TTL': int(os.getenv('BOOKS_FRAGMENT_CACHE_TTL', 60 * 60 * 24)),
+}
+
+# Ingesta de portadas y fotos de autor (books/images.py): descarga por bloques con límite de tamaño
+# y versiones WebP pregeneradas (caja máxima ancho x alto)
+BOOKS_IMAGES = {
+    'MAX_BYTES': 5 * 1024 * 1024,
+    'MAX_PIXELS': 40_000_000,
+    'SIZES': {'S': (80, 120), 'M': (200, 300), 'L': (400, 600)},
+    'QUALITY': 80,
+}
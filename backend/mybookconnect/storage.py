@@ -0,0 +1,55 @@
+import hashlib
+import os
+import uuid
+from contextlib import suppress
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Directorio (dentro de MEDIA_ROOT) de las imágenes direccionadas por contenido
+CAS_PREFIX = 'images'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Guarda cada fichero con el nombre de su hash SHA-256 (`images/ab/cd/<hash>.<ext>`).
+
+    Contenidos idénticos comparten un único fichero: si ya existe no se vuelve a escribir.
+    Los ficheros no se borran al cambiar de imagen; `manage.py gc_images` elimina los huérfanos.
+    """
+
+    def content_name(self, name, content):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        sha = digest.hexdigest()
+        ext = os.path.splitext(name or '')[1].lower()
+        return f'{CAS_PREFIX}/{sha[:2]}/{sha[2:4]}/{sha}{ext}', content
+
+    def save(self, name, content, max_length=None):
+        cas_name, content = self.content_name(name, content)
+        if self.exists(cas_name):
+            return cas_name
+        # se escribe con un nombre temporal y se mueve a su sitio: si otro proceso guarda a la vez el mismo
+        # contenido, el fichero que ya está es igual de válido y no se crea una copia con sufijo
+        tmp_name = self._save(f'{os.path.dirname(cas_name)}/.tmp-{uuid.uuid4().hex}', content)
+        try:
+            os.replace(self.path(tmp_name), self.path(cas_name))
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.remove(self.path(tmp_name))
+            raise
+        return cas_name
+
+
+_storage = None
+
+
+def get_image_storage():
+    global _storage
+    if _storage is None:
+        _storage = ContentAddressedStorage()
+    return _storage
@@ -0,0 +1,19 @@
+# Generated by Django 5.0 on 2026-10-18 07:30
+
+import mybookconnect.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_remove_user_is_private_user_birth_date_user_location_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=mybookconnect.storage.get_image_storage, upload_to='avatars/'),
+        ),
+    ]
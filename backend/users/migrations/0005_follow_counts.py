@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-18 08:10
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_follow_counts(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Follow = User.following.through
+    for column, field in (('to_user', 'followers_count'), ('from_user', 'following_count')):
+        for row in Follow.objects.order_by().values(column).annotate(n=Count('id')):
+            User.objects.filter(pk=row[column]).update(**{field: row['n']})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_alter_user_avatar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_follow_counts, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,8 @@ from django.db import models
 from django.core.validators import MinValueValidator
 from datetime import date
 
+from mybookconnect.storage import get_image_storage
+
 class PrivacyChoices(models.TextChoices):
     PUBLIC = 'public', 'Público'
     FRIENDS = 'friends', 'Solo amigos'
@@ -10,9 +12,12 @@ class PrivacyChoices(models.TextChoices):
 
 class User(AbstractUser):
     bio = models.TextField(max_length=500, blank=True)
-    avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    avatar = models.ImageField(upload_to='avatars/', storage=get_image_storage, null=True, blank=True)
     email = models.EmailField(unique=True, blank=False, null=False)
     following = models.ManyToManyField('self', symmetrical=False, related_name='followers', blank=True)
+    # contadores mantenidos al cambiar `following` (users/signals.py), para no contar la relación en cada perfil
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
     
     # Nuevos campos
     birth_date = models.DateField(null=True, blank=True, 
@@ -13,9 +13,18 @@ class UserSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'username', 'first_name', 'last_name', 'email', 'bio', 'avatar',
             'birth_date', 'location', 'privacy_level',
-            'following', 'followers'
+            'following', 'followers_count', 'following_count'
         )
-        read_only_fields = ('id', 'followers')
+        read_only_fields = ('id', 'followers_count', 'following_count')
+        # las listas completas se paginan en followers/ y following/; aquí solo se escribe a quién se sigue
+        extra_kwargs = {'following': {'write_only': True}}
+
+
+class FollowSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'first_name', 'last_name', 'avatar')
+        read_only_fields = fields
 
 class UserCreateSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
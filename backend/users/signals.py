@@ -1,4 +1,5 @@
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_save, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
@@ -12,4 +13,39 @@ def create_user_profile(sender, instance, created, **kwargs):
     """
     if created:
         # Aquí puedes agregar lógica adicional cuando se crea un usuario
-        pass
\ No newline at end of file
+        pass
+
+
+@receiver(m2m_changed, sender=User.following.through)
+def update_follow_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # clear() no informa de qué filas borra: se guardan antes
+        related = instance.followers if reverse else instance.following
+        instance._cleared_follow_ids = set(related.values_list('pk', flat=True))
+        return
+    if action == 'pre_remove':
+        # remove() informa de todos los ids recibidos, también de los que no estaban en la relación
+        related = instance.followers if reverse else instance.following
+        instance._removed_follow_ids = set(related.filter(pk__in=pk_set).values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set, delta = getattr(instance, '_cleared_follow_ids', set()), -1
+    elif action == 'post_remove':
+        pk_set, delta = getattr(instance, '_removed_follow_ids', set()), -1
+    elif action == 'post_add':
+        delta = 1
+    else:
+        return
+    if not pk_set:
+        return
+    # user.followers.add(...) llega con reverse: `instance` es el seguido y pk_set sus seguidores
+    own, others = ('followers_count', 'following_count') if reverse else ('following_count', 'followers_count')
+    User.objects.filter(pk=instance.pk).update(**{own: F(own) + delta * len(pk_set)})
+    User.objects.filter(pk__in=pk_set).update(**{others: F(others) + delta})
+
+
+@receiver(pre_delete, sender=User)
+def release_follow_counts(sender, instance, **kwargs):
+    # el borrado en cascada de la relación no lanza m2m_changed
+    User.objects.filter(followers=instance).update(followers_count=F('followers_count') - 1)
+    User.objects.filter(following=instance).update(following_count=F('following_count') - 1)
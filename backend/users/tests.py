@@ -1,3 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
-# Create your tests here.
+User = get_user_model()
+
+
+class FollowCountTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('lector', 'lector@example.com', 'clave-segura-123')
+        self.others = [
+            User.objects.create_user(f'usuario{i}', f'usuario{i}@example.com', 'clave-segura-123') for i in range(5)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def counts(self, user):
+        user.refresh_from_db()
+        return user.followers_count, user.following_count
+
+    def test_counters_follow_m2m_changes(self):
+        self.user.following.add(*self.others[:3])
+        self.others[4].followers.add(self.user, self.others[0])
+        self.assertEqual(self.counts(self.user), (0, 4))
+        self.assertEqual(self.counts(self.others[4]), (2, 0))
+        self.assertEqual(self.counts(self.others[0]), (1, 1))
+
+        self.user.following.remove(self.others[0])
+        self.assertEqual(self.counts(self.user), (0, 3))
+        self.user.following.clear()
+        self.assertEqual(self.counts(self.user), (0, 0))
+        self.assertEqual(self.counts(self.others[4]), (1, 0))
+        self.others[0].delete()
+        self.assertEqual(self.counts(self.others[4]), (0, 0))
+
+    def test_removing_users_not_followed_keeps_counts(self):
+        self.user.following.add(self.others[0])
+        # remove() recibe también ids que no estaban en la relación
+        self.user.following.remove(self.others[0], self.others[1])
+        self.user.following.remove(self.others[2])
+        self.others[3].followers.remove(self.user)
+        self.assertEqual(self.counts(self.user), (0, 0))
+        for other in self.others:
+            self.assertEqual(self.counts(other), (0, 0))
+
+    def test_profile_returns_counts_only(self):
+        for other in self.others:
+            other.following.add(self.user)
+        # force_authenticate sirve el objeto en memoria; con un token se carga de la base de datos
+        self.user.refresh_from_db()
+        with CaptureQueriesContext(connection) as ctx:
+            profile = self.client.get('/api/v1/auth/profile/').json()
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual((profile['followers_count'], profile['following_count']), (5, 0))
+        self.assertNotIn('followers', profile)
+        self.assertNotIn('following', profile)
+
+        response = self.client.patch(
+            '/api/v1/auth/profile/update/', {'following': [self.others[0].pk, self.others[1].pk]}, format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['following_count'], 2)
+
+    def test_paginated_lists(self):
+        for other in self.others:
+            other.following.add(self.user)
+        self.user.following.add(self.others[0])
+        page = self.client.get('/api/v1/auth/followers/?page_size=2').json()
+        self.assertEqual(len(page['results']), 2)
+        second = self.client.get(page['next']).json()
+        self.assertNotIn(page['results'][0]['id'], [user['id'] for user in second['results']])
+        self.assertNotIn('email', page['results'][0])
+        following = self.client.get('/api/v1/auth/following/').json()['results']
+        self.assertEqual([user['id'] for user in following], [self.others[0].pk])
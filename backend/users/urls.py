@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import UserRegistrationView, UserProfileView, UserUpdateView
+from .views import UserRegistrationView, UserProfileView, UserUpdateView, FollowersView, FollowingView
 
 urlpatterns = [
     path('register/', UserRegistrationView.as_view(), name='register'),
     path('profile/', UserProfileView.as_view(), name='profile'),
     path('profile/update/', UserUpdateView.as_view(), name='profile-update'),
+    path('followers/', FollowersView.as_view(), name='followers'),
+    path('following/', FollowingView.as_view(), name='following'),
 ]
\ No newline at end of file
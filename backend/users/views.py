@@ -2,7 +2,8 @@ from rest_framework import generics, permissions
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from .serializers import UserSerializer, UserCreateSerializer
+from books.pagination import KeysetPagination
+from .serializers import FollowSerializer, UserSerializer, UserCreateSerializer
 
 User = get_user_model()
 
@@ -31,4 +32,22 @@ class UserUpdateView(generics.UpdateAPIView):
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
+        # los contadores se actualizan en la base de datos al cambiar `following`
+        instance.refresh_from_db(fields=['followers_count', 'following_count'])
         return Response(serializer.data)
+
+
+class FollowersView(generics.ListAPIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = FollowSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-id',)
+
+    def get_queryset(self):
+        return User.objects.filter(following=self.request.user)
+
+
+class FollowingView(FollowersView):
+
+    def get_queryset(self):
+        return User.objects.filter(followers=self.request.user)
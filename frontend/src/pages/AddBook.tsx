@@ -35,7 +35,7 @@ export function AddBook() {
           signal,
         });
         const data = await res.json();
-        const localResults = Array.isArray(data) ? data : [];
+        const localResults = Array.isArray(data) ? data : data?.results || [];
         if (localResults.length > 0) {
           setSearchResults(localResults);
           setHasMoreResults(false);
@@ -57,8 +57,18 @@ export function AddBook() {
       });
 
       if (importRes.ok) {
-        const importData = await importRes.json();
-        const created = Array.isArray(importData) ? importData : [importData];
+        let job = await importRes.json();
+        // La importación se ejecuta en segundo plano: consultamos su estado hasta que termine
+        while (job.status === 'pending' || job.status === 'running') {
+          await new Promise(resolve => setTimeout(resolve, 1000));
+          const statusRes = await fetch(`${apiUrl}/api/v1/books/books/import/${job.id}/`, {
+            headers: { Authorization: `Bearer ${token}` },
+            signal,
+          });
+          if (!statusRes.ok) break;
+          job = await statusRes.json();
+        }
+        const created = job.status === 'done' ? job.books || [] : [];
         setSearchResults(prev => currentOffset === 0 ? created : [...prev, ...created]);
         setHasMoreResults(created.length === 5);
       } else {
@@ -9,8 +9,10 @@ export interface User {
   birth_date?: string;
   location?: string;
   privacy_level: 'public' | 'friends' | 'private';
+  // solo escritura: las listas completas están en /auth/followers/ y /auth/following/
   following?: number[];
-  followers?: number[];
+  followers_count?: number;
+  following_count?: number;
 }
 
 export interface AuthState {